@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+DEFAULT_SNAPSHOT_PATH = os.path.join("data", "processed", "advice_snapshot.json")
+
+# Snapshot file layout (JSON):
+#   format_version   SNAPSHOT_FORMAT_VERSION
+#   version          content version, see AdviceSnapshot
+#   created_at       Unix time the advice was loaded from its source
+#   source           where the advice was loaded from, e.g. "database"
+#   advice           {diagnosis: {"advice": ..., "source": ...}}
+SNAPSHOT_FORMAT_VERSION = 1
+
+class AdviceSnapshot:
+    """
+    Immutable in-memory map of health advice by diagnosis.
+
+    The version is a hash of the content, so the same advice loaded from the database
+    or from a snapshot file has the same version, and reloading unchanged advice can
+    be recognized without comparing every entry.
+    """
+
+    def __init__(self, advice, source=None, created_at=None):
+        """
+        Builds a snapshot.
+
+        Args:
+            advice (dict): Health advice and its source keyed by diagnosis.
+            source (str, optional): Where the advice was loaded from. Defaults to None.
+            created_at (float, optional): Unix time the advice was loaded. Defaults to now.
+        """
+        entries = {str(diagnosis): (value["advice"], value["source"]) for diagnosis, value in advice.items()}
+        content = json.dumps(sorted(entries.items()), ensure_ascii=False, separators=(",", ":"))
+        self._advice = MappingProxyType(entries)
+        self.version = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+        self.source = source
+        self.created_at = time.time() if created_at is None else created_at
+
+    @classmethod
+    def from_rows(cls, rows, source=None):
+        """
+        Builds a snapshot from (diagnosis, advice, source) rows of the health_advice table.
+
+        Args:
+            rows (iterable): The rows.
+            source (str, optional): Where the rows were loaded from. Defaults to None.
+
+        Returns:
+            AdviceSnapshot: The snapshot.
+        """
+        return cls({row[0]: {"advice": row[1], "source": row[2]} for row in rows}, source=source)
+
+    def __len__(self):
+        return len(self._advice)
+
+    def __contains__(self, diagnosis):
+        return str(diagnosis) in self._advice
+
+    def get(self, diagnosis):
+        """
+        Returns the advice for a diagnosis.
+
+        Args:
+            diagnosis (str): The diagnosis.
+
+        Returns:
+            dict: Health advice and its source, or None if there is none.
+        """
+        entry = self._advice.get(str(diagnosis))
+        if entry is None:
+            return None
+        return {"advice": entry[0], "source": entry[1]}
+
+    def get_many(self, diagnoses):
+        """
+        Returns the advice for several diagnoses.
+
+        Args:
+            diagnoses (iterable): The diagnoses.
+
+        Returns:
+            dict: Health advice keyed by diagnosis; diagnoses without advice are left out.
+        """
+        advice = {}
+        for diagnosis in set(diagnoses):
+            value = self.get(diagnosis)
+            if value is not None:
+                advice[diagnosis] = value
+        return advice
+
+    def to_dict(self):
+        """
+        Returns the snapshot in the snapshot file layout.
+
+        Returns:
+            dict: The snapshot.
+        """
+        return {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "version": self.version,
+            "created_at": self.created_at,
+            "source": self.source,
+            "advice": {diagnosis: {"advice": advice, "source": source}
+                       for diagnosis, (advice, source) in sorted(self._advice.items())},
+        }
+
+def write_snapshot(snapshot, path):
+    """
+    Writes a snapshot file.
+
+    The file is written to a temporary name and renamed into place, so readers never
+    see a partially written snapshot.
+
+    Args:
+        snapshot (AdviceSnapshot): The snapshot.
+        path (str): Path of the snapshot file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot.to_dict(), f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def read_snapshot(path):
+    """
+    Reads a snapshot file written by write_snapshot().
+
+    The version is recomputed from the content, so hand-edited files get a new version.
+
+    Args:
+        path (str): Path of the snapshot file.
+
+    Returns:
+        AdviceSnapshot: The snapshot.
+
+    Raises:
+        ValueError: If the file is not a snapshot of a supported version.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {SNAPSHOT_FORMAT_VERSION} advice snapshot")
+    return AdviceSnapshot(data["advice"], source=data.get("source") or path, created_at=data.get("created_at"))
+
+class AdviceStore:
+    """
+    Holds the current AdviceSnapshot and replaces it when the advice changes.
+
+    The snapshot is loaded lazily on first use or by a background warm-up thread. A watcher
+    thread reloads it every poll interval, and reload() does so immediately; a snapshot with
+    new content is swapped in with a single reference assignment, so readers always see one
+    complete version of the advice.
+    """
+
+    def __init__(self, load, poll_interval=300.0, retry_interval=10.0):
+        """
+        Initializes the store without loading the advice.
+
+        Args:
+            load (callable): Function returning a new AdviceSnapshot, or None if no advice source
+                             is configured.
+            poll_interval (float, optional): How often the watcher reloads the advice, in seconds. Defaults to 300.
+            retry_interval (float, optional): Minimum time between load attempts while no snapshot
+                                              is loaded, in seconds. Defaults to 10.
+        """
+        self.load = load
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._last_attempt = None
+        self._last_error = None
+        self._loaded_at = None
+        self._swaps = 0
+        self._watcher = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    @property
+    def current(self):
+        """
+        AdviceSnapshot: The current snapshot without loading it, or None if none is loaded.
+        """
+        return self._snapshot
+
+    def get(self):
+        """
+        Returns the current snapshot, loading it first if necessary.
+
+        Returns:
+            AdviceSnapshot: The current snapshot, or None if the advice could not be loaded.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        # While no advice can be loaded, e.g. when no source is configured, callers return
+        # without taking the lock until the retry interval has passed
+        last_attempt = self._last_attempt
+        if last_attempt is not None and time.monotonic() - last_attempt < self.retry_interval:
+            return None
+        with self._lock:
+            if self._snapshot is None and (self._last_attempt is None
+                                           or time.monotonic() - self._last_attempt >= self.retry_interval):
+                self._load()
+            return self._snapshot
+
+    def reload(self):
+        """
+        Loads the advice and swaps it in if it changed.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            return self._load()
+
+    def warm_up(self, background=True):
+        """
+        Loads the advice ahead of the first request.
+
+        Args:
+            background (bool, optional): Load in a daemon thread instead of blocking. Defaults to True.
+
+        Returns:
+            threading.Thread: The warm-up thread, or None if the advice was loaded in the foreground.
+        """
+        if not background:
+            self.get()
+            return None
+        thread = threading.Thread(target=self.get, name="advice-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def start_watching(self):
+        """
+        Starts the watcher thread, unless it is already running or poll_interval is not positive.
+        """
+        with self._lock:
+            if self.poll_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="advice-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        """
+        Stops the watcher thread.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.join(1)
+
+    def info(self):
+        """
+        Returns details about the served advice.
+
+        Returns:
+            dict: Whether a snapshot is loaded, its version, source, number of entries and
+                  creation time, the load time, number of swaps and the last load error.
+        """
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "source": snapshot.source if snapshot else None,
+            "entries": len(snapshot) if snapshot else 0,
+            "created_at": snapshot.created_at if snapshot else None,
+            "loaded_at": self._loaded_at,
+            "swaps": self._swaps,
+            "last_error": self._last_error,
+        }
+
+    def _watch(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error reloading health advice: {e}")
+
+    def _load(self):
+        """
+        Loads the advice and swaps it in if it changed. Requires the lock.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        self._last_attempt = time.monotonic()
+        try:
+            snapshot = self.load()
+        except Exception as e:
+            self._last_error = f"{type(e).__name__}: {e}"
+            print(f"Error loading health advice: {e}")
+            return False
+        if snapshot is None or (self._snapshot is not None and snapshot.version == self._snapshot.version):
+            return False
+
+        if self._snapshot is not None:
+            self._swaps += 1
+        self._snapshot = snapshot
+        self._loaded_at = time.time()
+        self._last_error = None
+        return True
+
+def main(argv=None):
+    """
+    Command-line entry point: exports the health_advice table as a snapshot file for offline serving.
+
+    Example:
+        python -m app.advice -o data/processed/advice_snapshot.json
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Export health advice as a snapshot file.")
+    parser.add_argument("-o", "--output", default=DEFAULT_SNAPSHOT_PATH, help="Path of the snapshot file.")
+    args = parser.parse_args(argv)
+
+    from app.startup import load_environment
+    load_environment()
+    from app.utils import db
+    snapshot = AdviceSnapshot.from_rows(db.load_advice(), source="database")
+    write_snapshot(snapshot, args.output)
+    print(f"Wrote {len(snapshot)} diagnoses (version {snapshot.version}) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+import asyncio
+import os
+import time
+from app.breaker import CircuitOpenError
+from app.geo import HospitalIndex
+from app.metrics import metrics
+from app.utils import (HOSPITAL_SIGNATURE_QUERY, OFFLINE_MODE, RETRY_STATUSES, ExternalAPI, _cache_advice,
+                       advice_cache, advice_store, api, get_datapack, merge_hospitals, normalize_address,
+                       parse_location)
+
+# Overall time budget of one hospital search, in seconds
+HOSPITAL_SEARCH_DEADLINE = float(os.environ.get("HOSPITAL_SEARCH_DEADLINE", 8))
+
+async def create_postgres_pool(min_size=1, max_size=10):
+    """
+    Opens an asyncpg connection pool configured from environment variables.
+
+    Args:
+        min_size (int, optional): Number of connections opened up front. Defaults to 1.
+        max_size (int, optional): Maximum number of connections. Defaults to 10.
+
+    Returns:
+        asyncpg.Pool: The new pool.
+    """
+    import asyncpg
+    return await asyncpg.create_pool(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        min_size=min_size,
+        max_size=max_size
+    )
+
+class AsyncDatabase:
+    """
+    Handles database operations from coroutines.
+
+    Queries run on an asyncpg-style connection pool opened on first use, so a request
+    waiting on the database costs a suspended coroutine rather than a thread. Queries
+    use $1, $2, ... placeholders. Hospital searches are answered from an in-memory
+    HospitalIndex that is kept in sync with the table, as in Database.
+    """
+    def __init__(self, create_pool=create_postgres_pool, max_connections=None, timeout=None,
+                 hospital_refresh_interval=None, hospital_signature_query=HOSPITAL_SIGNATURE_QUERY):
+        """
+        Initializes the database without opening any connection.
+
+        Args:
+            create_pool (callable, optional): Coroutine function taking min_size and max_size and returning
+                                              a pool whose acquire() yields connections with an async fetch().
+                                              Defaults to an asyncpg pool configured from environment variables.
+            max_connections (int, optional): Maximum number of pooled connections.
+                                             Defaults to the DB_POOL_SIZE environment variable or 10.
+            timeout (float, optional): Maximum time to wait for a free connection, in seconds.
+                                       Defaults to the DB_POOL_TIMEOUT environment variable or 30.
+            hospital_refresh_interval (float, optional): How often to check the hospitals table for changes,
+                                                         in seconds. Defaults to the HOSPITAL_INDEX_REFRESH
+                                                         environment variable or 300.
+            hospital_signature_query (str, optional): Query returning one row that changes whenever the
+                                                      hospitals table does, see Database. Defaults to
+                                                      HOSPITAL_SIGNATURE_QUERY.
+        """
+        if max_connections is None:
+            max_connections = int(os.environ.get("DB_POOL_SIZE", 10))
+        if timeout is None:
+            timeout = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+        if hospital_refresh_interval is None:
+            hospital_refresh_interval = float(os.environ.get("HOSPITAL_INDEX_REFRESH", 300))
+        self._create_pool = create_pool
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.hospital_refresh_interval = hospital_refresh_interval
+        self.hospital_signature_query = hospital_signature_query
+        self.pool = None
+        self.hospital_index = None
+        self._pool_lock = asyncio.Lock()
+        self._hospital_lock = asyncio.Lock()
+        self._hospital_signature = None
+        self._hospital_checked_at = None
+
+    async def _fetch(self, query, *args):
+        """
+        Runs a query on a pooled connection and returns all rows.
+
+        Args:
+            query (str): The SQL query, using $1, $2, ... as parameter placeholders.
+            *args: The query parameters.
+
+        Returns:
+            list: The result rows.
+        """
+        if self.pool is None:
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await self._create_pool(min_size=1, max_size=self.max_connections)
+        async with self.pool.acquire(timeout=self.timeout) as conn:
+            return await conn.fetch(query, *args)
+
+    async def get_advice(self, diagnosis):
+        """
+        Retrieves health advice based on the diagnosis from the database.
+
+        Args:
+            diagnosis (str): The diagnosis.
+
+        Returns:
+            dict: Health advice and its source, or None if not found or an error occurred.
+        """
+        try:
+            with metrics.timer("advice_db"):
+                results = await self._fetch("SELECT advice, source FROM health_advice WHERE diagnosis = $1", diagnosis)
+            if results:
+                return {"advice": results[0][0], "source": results[0][1]}
+            return None
+        except Exception as e:
+            print(f"Error retrieving health advice: {e}")
+            return None
+
+    async def get_advice_many(self, diagnoses):
+        """
+        Retrieves health advice for several diagnoses in one query.
+
+        Args:
+            diagnoses (iterable): The diagnoses. Duplicates are looked up once.
+
+        Returns:
+            dict: Health advice and its source keyed by diagnosis. Diagnoses without
+                  advice are left out, and an empty dict is returned if an error occurred.
+        """
+        diagnoses = sorted({str(diagnosis) for diagnosis in diagnoses})
+        if not diagnoses:
+            return {}
+        placeholders = ", ".join(f"${i}" for i in range(1, len(diagnoses) + 1))
+        try:
+            with metrics.timer("advice_db"):
+                results = await self._fetch(
+                    f"SELECT diagnosis, advice, source FROM health_advice WHERE diagnosis IN ({placeholders})",
+                    *diagnoses)
+        except Exception as e:
+            print(f"Error retrieving health advice: {e}")
+            return {}
+        return {result[0]: {"advice": result[1], "source": result[2]} for result in results}
+
+    async def find_hospitals(self, latitude, longitude, limit=10, radius_km=None):
+        """
+        Finds nearby medical institutions based on the location.
+
+        Args:
+            latitude (float): The latitude of the location.
+            longitude (float): The longitude of the location.
+            limit (int, optional): Maximum number of institutions to return. Defaults to 10.
+            radius_km (float, optional): Only return institutions within this distance. Defaults to None (no limit).
+
+        Returns:
+            list: List of nearby medical institutions with their distance in kilometres, sorted by distance,
+                  or an empty list if none found or an error occurred.
+        """
+        try:
+            index = await self.get_hospital_index()
+        except Exception as e:
+            print(f"Error retrieving hospitals: {e}")
+            return []
+        return index.nearest(latitude, longitude, k=limit, radius_km=radius_km)
+
+    async def load_hospitals(self):
+        """
+        Loads every hospital from the database.
+
+        Returns:
+            list: Hospitals with 'name', 'address', 'latitude' and 'longitude' fields.
+        """
+        results = await self._fetch("SELECT name, address, latitude, longitude FROM hospitals")
+        return [{"name": result[0], "address": result[1], "latitude": result[2], "longitude": result[3]}
+                for result in results]
+
+    async def get_hospital_index(self, force_refresh=False):
+        """
+        Returns the hospital index, loading it on first use and refreshing it when the table changed.
+
+        See Database.get_hospital_index(); concurrent callers wait for a single refresh.
+
+        Args:
+            force_refresh (bool, optional): Check for changes regardless of the interval. Defaults to False.
+
+        Returns:
+            HospitalIndex: The hospital index.
+        """
+        def fresh():
+            return (not force_refresh and self.hospital_index is not None
+                    and time.monotonic() - self._hospital_checked_at < self.hospital_refresh_interval)
+
+        if fresh():
+            return self.hospital_index
+        async with self._hospital_lock:
+            if fresh():
+                return self.hospital_index
+            try:
+                signature = None
+                if self.hospital_signature_query is not None:
+                    signature = tuple((await self._fetch(self.hospital_signature_query))[0])
+                # Building the index is CPU-bound, so it runs in a worker thread instead of blocking the event loop
+                if self.hospital_index is None:
+                    self.hospital_index = await asyncio.to_thread(HospitalIndex, await self.load_hospitals())
+                elif signature is None or signature != self._hospital_signature:
+                    await asyncio.to_thread(self.hospital_index.sync, await self.load_hospitals())
+                self._hospital_signature = signature
+            except Exception as e:
+                if self.hospital_index is None:
+                    raise
+                print(f"Error refreshing hospital index, serving the previous index: {e}")
+            self._hospital_checked_at = time.monotonic()
+            return self.hospital_index
+
+    async def close(self):
+        """
+        Closes the pooled database connections.
+        """
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            await pool.close()
+
+class AsyncExternalAPI(ExternalAPI):
+    """
+    Handles interactions with external APIs from coroutines, using aiohttp.
+
+    Configuration, response caches, circuit breaker and response parsing are those of
+    ExternalAPI; requests share one keep-alive aiohttp session, created on first use
+    in the running event loop, and are retried with exponential backoff.
+    """
+
+    def _get_session(self):
+        """
+        Returns the aiohttp session, creating it on first use inside the running event loop.
+
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        import aiohttp
+        if self.session is None or self.session.closed:
+            connect_timeout, read_timeout = self.timeout
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout))
+        return self.session
+
+    async def _get_json(self, path, params):
+        """
+        Sends a GET request through the circuit breaker and returns the decoded JSON body.
+
+        Args:
+            path (str): API path relative to base_url, e.g. "geocode/json".
+            params (dict): Query parameters; the API key is added automatically.
+
+        Returns:
+            dict: The decoded response.
+
+        Raises:
+            aiohttp.ClientError: If the request failed after retries.
+            asyncio.TimeoutError: If the last attempt timed out.
+            CircuitOpenError: If the circuit breaker rejected the request.
+        """
+        import aiohttp
+        self.breaker.before_call()
+        params = {key: str(value) for key, value in dict(params, key=self.api_key).items() if value is not None}
+        try:
+            for attempt in range(self.retries + 1):
+                last_attempt = attempt == self.retries
+                try:
+                    async with self._get_session().get(f"{self.base_url}/{path}", params=params) as response:
+                        if response.status in RETRY_STATUSES and not last_attempt:
+                            retry = True
+                        else:
+                            response.raise_for_status()
+                            data = await response.json(content_type=None)
+                            retry = False
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if last_attempt:
+                        raise
+                    retry = True
+                if not retry:
+                    break
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+        except BaseException:
+            # Includes cancellation by a deadline, which must not leave a half-open trial in flight
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return data
+
+    async def get_geocode(self, address):
+        """
+        Converts an address to geographic coordinates using Google Geocoding API.
+
+        Args:
+            address (str): The address to geocode.
+
+        Returns:
+            tuple: Latitude and longitude of the address, or None if an error occurred.
+        """
+        import aiohttp
+        key = normalize_address(address)
+        found, location = self.geocode_cache.lookup(key)
+        if found:
+            return location
+        try:
+            with metrics.timer("geocode"):
+                data = await self._get_json("geocode/json", {"address": address})
+            return self._geocode_result(key, data)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, CircuitOpenError) as e:
+            print(f"Error during Geocoding API request: {e}")
+            return None
+
+    async def find_nearby_hospitals(self, latitude, longitude, radius=5000):
+        """
+        Finds nearby hospitals using Google Places API.
+
+        Args:
+            latitude (float): The latitude of the location.
+            longitude (float): The longitude of the location.
+            radius (int): The search radius in meters.
+
+        Returns:
+            list: List of nearby hospitals, or an empty list if none found or an error occurred.
+        """
+        import aiohttp
+        key = self._places_key(latitude, longitude, radius)
+        found, hospitals = self.places_cache.lookup(key)
+        if found:
+            return list(hospitals)
+        try:
+            with metrics.timer("places"):
+                data = await self._get_json("place/nearbysearch/json",
+                                            {"location": f"{latitude},{longitude}", "radius": radius,
+                                             "type": "hospital"})
+            return self._places_result(key, data)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, CircuitOpenError) as e:
+            print(f"Error during Places API request: {e}")
+            return []
+
+    async def close(self):
+        """
+        Closes the pooled HTTP connections.
+        """
+        session, self.session = self.session, None
+        if session is not None:
+            await session.close()
+
+# Instantiate the async database and API; nothing is opened until first use. The API client
+# shares the synchronous client's response caches and circuit breaker, so both serve each
+# other's cached results and stop calling Google Maps together when it is failing
+aio_db = AsyncDatabase()
+aio_api = AsyncExternalAPI(breaker=api.breaker, geocode_cache=api.geocode_cache, places_cache=api.places_cache)
+
+async def geocode_async(address):
+    """
+    Converts an address or place name to geographic coordinates, like utils.geocode().
+
+    Args:
+        address (str): The address or place name.
+
+    Returns:
+        tuple: Latitude and longitude, or None if the address could not be geocoded.
+    """
+    pack = get_datapack()
+    location = pack.geocode(address) if pack else None
+    if location is None and not OFFLINE_MODE:
+        location = await aio_api.get_geocode(address)
+    return location
+
+async def get_health_advice_async(diagnosis):
+    """
+    Gets health advice based on the diagnosis, sharing the advice snapshot and the advice
+    cache with get_health_advice().
+
+    The snapshot is not loaded here, so the event loop never blocks on it; it is loaded
+    by the application's warm-up.
+
+    Args:
+        diagnosis (str): The diagnosis.
+
+    Returns:
+        dict: Health advice from the database, or None if there is none.
+    """
+    snapshot = advice_store.current
+    if snapshot is not None:
+        return snapshot.get(diagnosis)
+    found, advice = advice_cache.lookup(diagnosis)
+    if found:
+        return advice
+    advice = await aio_db.get_advice(diagnosis)
+    _cache_advice(diagnosis, advice)
+    return advice
+
+async def get_health_advice_many_async(diagnoses):
+    """
+    Gets health advice for several diagnoses with at most one database query.
+
+    Args:
+        diagnoses (iterable): The diagnoses.
+
+    Returns:
+        dict: Health advice keyed by diagnosis; diagnoses without advice are left out.
+    """
+    snapshot = advice_store.current
+    if snapshot is not None:
+        return snapshot.get_many(diagnoses)
+    advice = {}
+    missing = []
+    for diagnosis in set(diagnoses):
+        found, value = advice_cache.lookup(diagnosis)
+        if not found:
+            missing.append(diagnosis)
+        elif value is not None:
+            advice[diagnosis] = value
+    if missing:
+        fetched = await aio_db.get_advice_many(missing)
+        for diagnosis in missing:
+            value = fetched.get(str(diagnosis))
+            _cache_advice(diagnosis, value)
+            if value is not None:
+                advice[diagnosis] = value
+    return advice
+
+async def find_nearby_hospitals_async(location, timeout=None):
+    """
+    Finds nearby medical institutions based on the location, like utils.find_nearby_hospitals().
+
+    The hospital index is refreshed while the location is geocoded, and the local lookup
+    and the Places API search run concurrently. Places results that miss the deadline
+    are dropped, so a slow Places API only costs the remaining time budget.
+
+    Args:
+        location (str): The location (latitude,longitude), or an address or place name.
+        timeout (float, optional): Overall deadline of the search, in seconds.
+                                   Defaults to HOSPITAL_SEARCH_DEADLINE.
+
+    Returns:
+        list: List of nearby medical institutions sorted by distance in kilometres,
+              or an empty list if the location is invalid.
+
+    Raises:
+        asyncio.TimeoutError: If geocoding or the local lookup did not finish within the deadline.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (HOSPITAL_SEARCH_DEADLINE if timeout is None else timeout)
+    pack = get_datapack()
+    tasks = []
+    try:
+        if pack is None:
+            index_task = asyncio.ensure_future(aio_db.get_hospital_index())
+            tasks.append(index_task)
+
+        coordinates = parse_location(location)
+        if coordinates is None:
+            coordinates = await asyncio.wait_for(geocode_async(location), deadline - loop.time())
+            if coordinates is None:
+                print(f"Invalid location format: {location}")
+                return []
+        latitude, longitude = coordinates
+
+        places_task = None
+        if not OFFLINE_MODE:
+            places_task = asyncio.ensure_future(aio_api.find_nearby_hospitals(latitude, longitude))
+            tasks.append(places_task)
+        if pack is not None:
+            hospitals = pack.nearest(latitude, longitude)
+        else:
+            try:
+                index = await asyncio.wait_for(asyncio.shield(index_task), deadline - loop.time())
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                print(f"Error retrieving hospitals: {e}")
+                hospitals = []
+            else:
+                hospitals = index.nearest(latitude, longitude)
+
+        places = []
+        if places_task is not None:
+            try:
+                places = await asyncio.wait_for(asyncio.shield(places_task), deadline - loop.time())
+            except asyncio.TimeoutError:
+                print("Places API search missed the deadline, returning local hospitals only")
+        return merge_hospitals(latitude, longitude, hospitals, places)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Mark errors of abandoned lookups as retrieved
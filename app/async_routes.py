@@ -0,0 +1,170 @@
+import asyncio
+from quart import Blueprint, Response, request, jsonify
+from app.aio import find_nearby_hospitals_async, get_health_advice_async, get_health_advice_many_async
+from app.encoding import filter_probabilities
+from app.metrics import metrics
+from app.routes import (DEFAULT_ADVICE, batcher, registry, cache_diagnosis, can_access_records,
+                        diagnosis_cache, diagnosis_cache_key, health_records, observe, parse_filter_args,
+                        parse_history_args, predict_cached, record_consultation)
+from app.surveillance import HOSPITAL_SEARCH
+
+# Create a Blueprint for the async variant of the routes. The model registry and
+# the inference batcher are shared with the synchronous routes.
+bp = Blueprint('async_routes', __name__)
+
+# Diagnosis endpoint
+@bp.route('/diagnose', methods=['POST'])
+async def diagnose():
+    """
+    Endpoint to receive symptoms, and return diagnosis results and advice.
+
+    The request waits for its batch to be scored without holding a thread.
+
+    Returns:
+        JSON: Diagnosis and advice in JSON format.
+    """
+    try:
+        data = await request.get_json()
+        symptoms = data['symptoms']
+        user_id = data.get('user_id')
+        location = data.get('location')
+        try:
+            top_k, min_probability = parse_filter_args(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if user_id is not None and not can_access_records(request.headers, user_id):
+            return jsonify({"error": "Forbidden"}), 403
+
+        # The batcher fails the request with "Model not loaded" if no model is available
+        key = diagnosis_cache_key(symptoms, registry.get(), registry.version)
+        found, result = diagnosis_cache.lookup(key)
+        if not found:
+            result = await asyncio.wrap_future(batcher.submit(symptoms))
+            cache_diagnosis(key, result, registry.version)
+        diagnosis, probabilities = result
+
+        advice = await get_health_advice_async(diagnosis)
+        if advice is None:
+            advice = DEFAULT_ADVICE
+
+        record_consultation(user_id, symptoms, diagnosis, probabilities, advice)
+        observe(diagnosis, location)
+
+        probabilities = filter_probabilities(probabilities, top_k=top_k, min_probability=min_probability)
+        return jsonify({"diagnosis": diagnosis, "probabilities": probabilities, "advice": advice})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Batch diagnosis endpoint
+@bp.route('/diagnose/batch', methods=['POST'])
+async def diagnose_batch():
+    """
+    Endpoint to receive a list of symptom reports, and return diagnosis results and advice for each.
+
+    Returns:
+        JSON: A list of diagnosis and advice results in input order, in JSON format.
+    """
+    try:
+        data = await request.get_json()
+        symptoms_list = data['symptoms']
+        user_id = data.get('user_id')
+        location = data.get('location')
+        try:
+            top_k, min_probability = parse_filter_args(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if user_id is not None and not can_access_records(request.headers, user_id):
+            return jsonify({"error": "Forbidden"}), 403
+
+        if not isinstance(symptoms_list, list) or not all(isinstance(s, str) for s in symptoms_list):
+            return jsonify({"error": "'symptoms' must be a list of strings"}), 400
+
+        # Scoring is CPU-bound, so it runs in a worker thread instead of blocking the event loop
+        model = await asyncio.to_thread(registry.get)
+        if model:
+            predictions = await asyncio.to_thread(predict_cached, symptoms_list, model.predict_batch, registry)
+            advice = await get_health_advice_many_async(diagnosis for diagnosis, _ in predictions)
+
+            results = []
+            for symptoms, (diagnosis, probabilities) in zip(symptoms_list, predictions):
+                result_advice = advice.get(diagnosis, DEFAULT_ADVICE)
+                record_consultation(user_id, symptoms, diagnosis, probabilities, result_advice)
+                observe(diagnosis, location)
+                results.append({"diagnosis": diagnosis,
+                                "probabilities": filter_probabilities(probabilities, top_k=top_k,
+                                                                      min_probability=min_probability),
+                                "advice": result_advice})
+            return jsonify({"results": results})
+        else:
+            return jsonify({"error": "Model not loaded"}), 500
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Health record history endpoint
+@bp.route('/records/<user_id>', methods=['GET'])
+async def records_history(user_id):
+    """
+    Endpoint to return a page of a user's consultation history, newest first.
+
+    Returns:
+        JSON: The records and the cursor of the next page (null on the last page) in JSON format.
+    """
+    if not can_access_records(request.headers, user_id):
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        limit, before = parse_history_args(request.args)
+    except ValueError:
+        return jsonify({"error": "'limit' must be a positive integer"}), 400
+    try:
+        records, cursor = await asyncio.to_thread(health_records.history, user_id, limit=limit, before=before)
+        return jsonify({"records": records, "next": cursor})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Medical institution search endpoint
+@bp.route('/find_hospitals', methods=['POST'])
+async def find_hospitals():
+    """
+    Endpoint to receive location and return nearby medical institutions.
+
+    Geocoding, the local lookup and the Places API search run as coroutines under
+    an overall deadline (HOSPITAL_SEARCH_DEADLINE).
+
+    Returns:
+        JSON: List of nearby medical institutions in JSON format.
+    """
+    try:
+        data = await request.get_json()
+        location = data['location']
+        observe(HOSPITAL_SEARCH, location)
+
+        hospitals = await find_nearby_hospitals_async(location)
+
+        return jsonify({"hospitals": hospitals})
+    except asyncio.TimeoutError:
+        return jsonify({"error": "Hospital search timed out"}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Model information endpoint
+@bp.route('/model', methods=['GET'])
+async def model_info():
+    """
+    Endpoint to return the version and load time of the served model.
+
+    Returns:
+        JSON: Model registry information in JSON format.
+    """
+    return jsonify(registry.info())
+
+# Metrics endpoint
+@bp.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    """
+    Endpoint to return stage latencies, cache, pool and model metrics.
+
+    Returns:
+        Response: Metrics in the Prometheus text exposition format.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,183 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class InferenceBatcher:
+    """
+    Micro-batching scheduler in front of a DiagnosisModel.
+
+    Concurrent callers submit single symptom strings. A background worker gathers
+    them for up to max_wait_ms milliseconds, or until max_batch_size requests are
+    queued, scores the whole batch in one vectorized call and hands each caller
+    its own result.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5):
+        """
+        Initializes the batcher.
+
+        Args:
+            model (DiagnosisModel or callable): The model used to score batches, or a function returning
+                                                the current model (e.g. ModelRegistry.get), which is
+                                                called once per batch.
+            max_batch_size (int, optional): Maximum number of requests scored together. Defaults to 32.
+            max_wait_ms (float, optional): Maximum time to wait for more requests after the first one
+                                           arrives, in milliseconds. Defaults to 5.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self._batches = 0
+        self._requests = 0
+        self._max_batch = 0
+        self._last_batch = 0
+        self._batch_size_counts = {}
+
+    def submit(self, symptoms, top_k=None):
+        """
+        Queues symptoms for scoring without waiting for the result.
+
+        Args:
+            symptoms (str): Input symptoms.
+            top_k (int, optional): Number of most probable diagnoses to return. Defaults to None (all classes).
+
+        Returns:
+            concurrent.futures.Future: Resolves to a (diagnosis, probabilities) tuple.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("InferenceBatcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._worker.start()
+            self._queue.put((symptoms, top_k, future))
+        return future
+
+    def predict_with_proba(self, symptoms, top_k=None, timeout=None):
+        """
+        Scores symptoms as part of the next batch and waits for the result.
+
+        Has the same signature and return value as DiagnosisModel.predict_with_proba().
+
+        Args:
+            symptoms (str): Input symptoms.
+            top_k (int, optional): Number of most probable diagnoses to return. Defaults to None (all classes).
+            timeout (float, optional): Maximum time to wait for the result, in seconds. Defaults to None.
+
+        Returns:
+            tuple: The predicted diagnosis and a dictionary of probabilities.
+        """
+        return self.submit(symptoms, top_k=top_k).result(timeout=timeout)
+
+    def stats(self):
+        """
+        Returns queue-depth and batch-size metrics.
+
+        Returns:
+            dict: Current queue depth, number of batches and requests scored,
+                  mean, maximum and last batch size, and a histogram of batch sizes.
+        """
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "last_batch_size": self._last_batch,
+                "batch_size_counts": dict(self._batch_size_counts),
+                "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000.0},
+            }
+
+    def close(self, timeout=None):
+        """
+        Stops accepting requests and waits for queued requests to be scored.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for the worker, in seconds. Defaults to None.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            self._queue.put(None)
+        if worker is not None:
+            worker.join(timeout)
+
+    def _collect(self):
+        """
+        Blocks for the first request, then gathers more until the batch is full or the wait expires.
+
+        Returns:
+            tuple: The list of gathered requests and whether the close sentinel was seen.
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        """
+        Worker loop: collects and scores batches until closed.
+        """
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            if batch:
+                self._score(batch)
+
+    def _score(self, batch):
+        """
+        Scores one batch and resolves the futures of its callers.
+
+        Args:
+            batch (list): List of (symptoms, top_k, future) tuples.
+        """
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            # Score and rank the whole batch with the same model, even if it is swapped meanwhile
+            model = self.model() if callable(self.model) else self.model
+            if model is None:
+                raise RuntimeError("Model not loaded")
+            rows = model.score_batch([symptoms for symptoms, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+        else:
+            for row, (_, top_k, future) in zip(rows, batch):
+                try:
+                    future.set_result(model.rank_probabilities(row, top_k=top_k))
+                except Exception as e:
+                    future.set_exception(e)
+
+        size = len(batch)
+        with self._lock:
+            self._batches += 1
+            self._requests += size
+            self._max_batch = max(self._max_batch, size)
+            self._last_batch = size
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
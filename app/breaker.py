@@ -0,0 +1,119 @@
+import threading
+import time
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker for calls to an unreliable upstream service.
+
+    After failure_threshold consecutive failures the breaker opens and rejects
+    calls immediately for reset_timeout seconds. It then lets a single trial call
+    through (half-open); a success closes the breaker, a failure opens it again.
+    A trial call that reports neither within trial_timeout seconds is abandoned and
+    another one is let through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, trial_timeout=60.0, timer=time.monotonic):
+        """
+        Initializes a closed breaker.
+
+        Args:
+            failure_threshold (int, optional): Consecutive failures that open the breaker. Defaults to 5.
+            reset_timeout (float, optional): Time the breaker stays open before a trial call, in seconds.
+                                             Defaults to 30.
+            trial_timeout (float, optional): Time after which a trial call still in flight is abandoned,
+                                             in seconds. Defaults to 60.
+            timer (callable, optional): Clock used for the reset timeout. Defaults to time.monotonic.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._trial_started_at = None
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        """
+        str: The current state: "closed", "open" or "half_open".
+        """
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """
+        Checks whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a trial call already in flight.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and (not self._trial_in_flight
+                                            or self._timer() - self._trial_started_at >= self.trial_timeout):
+                self._trial_in_flight = True
+                self._trial_started_at = self._timer()
+                return
+            self._rejected += 1
+            raise CircuitOpenError("Circuit breaker is open")
+
+    def record_success(self):
+        """
+        Records a successful call and closes the breaker.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the breaker if the threshold is reached or a trial call failed.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._timer()
+            self._trial_in_flight = False
+
+    def stats(self):
+        """
+        Returns the breaker state and counters.
+
+        Returns:
+            dict: Current state, consecutive failures, times opened and rejected calls.
+        """
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+    def _current_state(self):
+        """
+        Returns the state, moving from open to half-open once the reset timeout elapsed. Requires the lock.
+        """
+        if self._state == self.OPEN and self._timer() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
@@ -0,0 +1,105 @@
+import argparse
+import itertools
+import json
+import os
+from app.models import DiagnosisModel
+
+RAW_DATA_DIR = os.path.join("data", "raw")
+PROCESSED_DATA_DIR = os.path.join("data", "processed")
+
+def iter_chunks(lines, chunk_size):
+    """
+    Splits an iterable of lines into lists of at most chunk_size items.
+
+    Args:
+        lines (iterable): The lines to split.
+        chunk_size (int): Maximum number of lines per chunk.
+
+    Yields:
+        list: The next chunk of lines.
+    """
+    iterator = iter(lines)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def score_reports(model, reports, top_k=None):
+    """
+    Scores a chunk of symptom reports in one vectorized model call.
+
+    Args:
+        model (DiagnosisModel): The model used for scoring.
+        reports (list): List of report dictionaries with a 'symptoms' field.
+        top_k (int, optional): Number of most probable diagnoses to keep per report. Defaults to None (all classes).
+
+    Returns:
+        list: The reports with 'diagnosis' and 'probabilities' fields added.
+    """
+    predictions = model.predict_batch([report["symptoms"] for report in reports], top_k=top_k)
+    results = []
+    for report, (diagnosis, probabilities) in zip(reports, predictions):
+        result = dict(report)
+        result["diagnosis"] = str(diagnosis)
+        result["probabilities"] = {str(label): float(p) for label, p in probabilities.items()}
+        results.append(result)
+    return results
+
+def score_file(model, input_path, output_path, chunk_size=1000, top_k=None):
+    """
+    Streams a JSONL file of symptom reports through the model and writes the results as JSONL.
+
+    Only one chunk of reports is held in memory at a time, so memory use does not
+    grow with the size of the input file. Blank lines are skipped.
+
+    Args:
+        model (DiagnosisModel): The model used for scoring.
+        input_path (str): Path to the JSONL input file; each line needs a 'symptoms' field.
+        output_path (str): Path to the JSONL output file.
+        chunk_size (int, optional): Number of reports scored per model call. Defaults to 1000.
+        top_k (int, optional): Number of most probable diagnoses to keep per report. Defaults to None (all classes).
+
+    Returns:
+        int: The number of reports scored.
+    """
+    count = 0
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(input_path, encoding="utf-8") as infile, open(output_path, "w", encoding="utf-8") as outfile:
+        lines = (line for line in infile if line.strip())
+        for chunk in iter_chunks(lines, chunk_size):
+            reports = [json.loads(line) for line in chunk]
+            for result in score_reports(model, reports, top_k=top_k):
+                outfile.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += len(reports)
+    return count
+
+def main(argv=None):
+    """
+    Command-line entry point for bulk offline scoring.
+
+    Example:
+        python -m app.bulk_score reports.jsonl --model diagnosis_model.joblib
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Score a JSONL file of symptom reports offline.")
+    parser.add_argument("input", help=f"Input JSONL file, relative to {RAW_DATA_DIR} unless it exists as given.")
+    parser.add_argument("-o", "--output", help=f"Output JSONL file. Defaults to the input file name in {PROCESSED_DATA_DIR}.")
+    parser.add_argument("-m", "--model", default="diagnosis_model.joblib", help="Path to the trained model.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Number of reports scored per model call.")
+    parser.add_argument("--top-k", type=int, default=None, help="Number of most probable diagnoses to keep per report.")
+    args = parser.parse_args(argv)
+
+    input_path = args.input if os.path.exists(args.input) else os.path.join(RAW_DATA_DIR, args.input)
+    output_path = args.output or os.path.join(PROCESSED_DATA_DIR, os.path.basename(input_path))
+
+    model = DiagnosisModel(model_path=args.model)
+    count = score_file(model, input_path, output_path, chunk_size=args.chunk_size, top_k=args.top_k)
+    print(f"Scored {count} reports from {input_path} into {output_path}")
+
+if __name__ == "__main__":
+    main()
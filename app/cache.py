@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    A thread-safe, size-bounded LRU cache whose entries expire after a time-to-live.
+
+    None is a valid cached value, so negative results can be cached as well; use
+    lookup() to tell a cached None from a miss.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600.0, timer=time.monotonic):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int, optional): Maximum number of entries; the least recently used
+                                      entry is evicted when it is exceeded. Defaults to 1024.
+            ttl (float, optional): Default time-to-live of an entry, in seconds.
+                                   None means entries never expire. Defaults to 3600.
+            timer (callable, optional): Clock used for expiry. Defaults to time.monotonic.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def lookup(self, key):
+        """
+        Looks up a key and marks it as most recently used.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            tuple: (True, value) on a hit, or (False, None) on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or self._timer() < expires_at:
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                del self._data[key]
+                self._expirations += 1
+            self._misses += 1
+            return False, None
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key, or default on a miss.
+
+        Args:
+            key: The cache key.
+            default (optional): Value returned on a miss. Defaults to None.
+        """
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache; may be None.
+            ttl (float, optional): Time-to-live for this entry, in seconds. Defaults to the cache's ttl.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._timer() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key=None):
+        """
+        Removes one entry, or every entry if no key is given.
+
+        Args:
+            key (optional): The cache key to remove. Defaults to None (clear the cache).
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            if key is None:
+                count = len(self._data)
+                self._data.clear()
+                return count
+            return 1 if self._data.pop(key, None) is not None else 0
+
+    def stats(self):
+        """
+        Returns cache size and hit/miss counters.
+
+        Returns:
+            dict: Current and maximum size, hits, misses, hit rate, evictions and expirations.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,388 @@
+import json
+import os
+import re
+import shutil
+import unicodedata
+import numpy as np
+
+# Version of the compact model directory layout:
+#   meta.json            vectorizer settings, class labels, probability mode and coefficient storage
+#   vocab_offsets.npy    uint64[V+1], offsets of each term in vocab_strings.npy
+#   vocab_strings.npy    uint8 UTF-8 string table of the vocabulary, terms sorted by their UTF-8 bytes
+#   idf.npy              float64[V], IDF weight of each term (absent if use_idf is off)
+#   intercept.npy        float64[C]
+# and the classifier coefficients, either dense:
+#   coef_t.npy           dtype[V, C], transposed classifier coefficients, one row per term
+# or, for pruned models, sparse by term (CSR):
+#   coef_indptr.npy      int64[V+1], offsets of each term's coefficients in coef_indices/coef_data
+#   coef_indices.npy     uint16[nnz] (int32 beyond 65536 classes), class column of each kept coefficient
+#   coef_data.npy        dtype[nnz], the kept coefficients
+# where dtype is float64, float32 or int8. Quantized int8 coefficients are multiplied by
+#   coef_scale.npy       float64[C], one scale per class column
+# Term i of the sorted string table is feature column i of idf.npy and row i of the coefficients.
+# Version 1 directories always have dense float64 coefficients.
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+COEFFICIENT_DTYPES = ("float64", "float32", "int8")
+
+_VECTORIZER_PARAMS = ("lowercase", "strip_accents", "token_pattern", "ngram_range", "analyzer",
+                      "binary", "norm", "use_idf", "smooth_idf", "sublinear_tf")
+
+def export_pipeline(pipeline, path, dtype="float64", prune=0.0, preprocess=False):
+    """
+    Exports a fitted TfidfVectorizer + linear classifier pipeline as a compact model directory.
+
+    The coefficients can be compressed: pruning drops every coefficient whose magnitude is
+    below a threshold and stores the rest sparsely, and float32 or int8 storage shrinks each
+    kept coefficient. Pruned terms stay in the vocabulary, since they still count towards the
+    TF-IDF normalization of a document.
+
+    Args:
+        pipeline (Pipeline): Fitted pipeline whose first step is a TfidfVectorizer and whose last
+                             step is a linear classifier such as LogisticRegression.
+        path (str): Directory to write the model to. An existing directory is replaced as a whole,
+                    so scorers already serving it keep reading the previous export.
+        dtype (str, optional): Coefficient storage, one of COEFFICIENT_DTYPES. int8 quantizes each
+                               class column linearly to [-127, 127]. Defaults to "float64".
+        prune (float, optional): Coefficients with a smaller magnitude are dropped and the rest are
+                                 stored sparsely. Defaults to 0.0 (dense, nothing dropped).
+        preprocess (bool, optional): The pipeline was trained on text preprocessed by app.language,
+                                     so inputs must be preprocessed the same way. Defaults to False.
+
+    Returns:
+        dict: Number of terms, terms left without coefficients, kept coefficients and
+              coefficient storage in bytes.
+
+    Raises:
+        ValueError: If the pipeline cannot be represented in the compact format, or dtype is unknown.
+    """
+    if dtype not in COEFFICIENT_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(COEFFICIENT_DTYPES)}")
+    vectorizer, clf = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if len(pipeline.steps) != 2 or not hasattr(vectorizer, "vocabulary_") or not hasattr(clf, "coef_"):
+        raise ValueError("Only fitted TfidfVectorizer + linear classifier pipelines can be exported")
+    if vectorizer.tokenizer is not None or vectorizer.preprocessor is not None or callable(vectorizer.analyzer):
+        raise ValueError("Pipelines with custom tokenizers, preprocessors or analyzers cannot be exported")
+
+    params = {name: getattr(vectorizer, name) for name in _VECTORIZER_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    stop_words = vectorizer.get_stop_words()
+    params["stop_words"] = sorted(stop_words) if stop_words else None
+
+    classes = list(clf.classes_)
+    if len(classes) <= 2:
+        mode = "binary"
+    elif getattr(clf, "multi_class", "auto") == "ovr" or (
+            getattr(clf, "multi_class", "auto") == "auto" and getattr(clf, "solver", None) == "liblinear"):
+        mode = "ovr"
+    else:
+        mode = "multinomial"
+
+    terms = sorted(vectorizer.vocabulary_.items(), key=lambda item: item[0].encode("utf-8"))
+    columns = np.array([column for _, column in terms], dtype=np.intp)
+    encoded = [term.encode("utf-8") for term, _ in terms]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(term) for term in encoded], out=offsets[1:])
+
+    coef_t = clf.coef_[:, columns].T
+    if prune > 0:
+        coef_t = np.where(np.abs(coef_t) >= prune, coef_t, 0.0)
+    arrays = {}
+    if dtype == "int8":
+        scale = np.abs(coef_t).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        coef_t = np.clip(np.rint(coef_t / scale), -127, 127)
+        arrays["coef_scale.npy"] = np.asarray(scale, dtype="<f8")
+    coef_t = coef_t.astype(np.dtype(dtype).newbyteorder("<"))
+    if prune > 0:
+        kept = coef_t != 0
+        indptr = np.zeros(len(coef_t) + 1, dtype="<i8")
+        np.cumsum(kept.sum(axis=1), out=indptr[1:])
+        arrays["coef_indptr.npy"] = indptr
+        arrays["coef_indices.npy"] = np.nonzero(kept)[1].astype("<u2" if coef_t.shape[1] <= 1 << 16 else "<i4")
+        arrays["coef_data.npy"] = coef_t[kept]
+        layout = "sparse"
+        empty_terms = int((indptr[1:] == indptr[:-1]).sum())
+    else:
+        arrays["coef_t.npy"] = np.ascontiguousarray(coef_t)
+        layout = "dense"
+        empty_terms = int((~coef_t.any(axis=1)).sum())
+
+    # Write into a sibling directory and swap it into place: scorers serving the previous export
+    # keep their memory-mapped files, and the model watcher never sees a half-written directory
+    path = os.path.normpath(path)
+    tmp_path, old_path = f"{path}.tmp", f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"format_version": FORMAT_VERSION, "vectorizer": params, "mode": mode,
+                   "classes": [c.item() if hasattr(c, "item") else c for c in classes],
+                   "coefficients": {"layout": layout, "dtype": dtype, "prune": prune},
+                   "preprocess": bool(preprocess)}, f, ensure_ascii=False)
+    np.save(os.path.join(tmp_path, "vocab_offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "vocab_strings.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    if vectorizer.use_idf:
+        np.save(os.path.join(tmp_path, "idf.npy"), np.ascontiguousarray(vectorizer.idf_[columns], dtype="<f8"))
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, name), array)
+    np.save(os.path.join(tmp_path, "intercept.npy"), np.asarray(clf.intercept_, dtype="<f8"))
+    _replace_directory(tmp_path, path, old_path)
+
+    return {
+        "terms": len(terms),
+        "empty_terms": empty_terms,
+        "coefficients": int(arrays["coef_data.npy"].size if layout == "sparse" else coef_t.size),
+        "coefficient_bytes": sum(array.nbytes for array in arrays.values()),
+    }
+
+def _replace_directory(src, dst, old_path):
+    """
+    Moves a directory into place, replacing an existing one. A directory cannot be renamed over
+    a non-empty one, so the existing directory is first renamed aside and then deleted; files
+    still memory-mapped from it stay readable until they are unmapped.
+    """
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.isdir(dst):
+        os.replace(dst, old_path)
+    os.replace(src, dst)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def is_compact_model(path):
+    """
+    Checks whether a path is a compact model directory.
+
+    Args:
+        path (str): The path to check.
+
+    Returns:
+        bool: True if the path is a directory containing a compact model.
+    """
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+class CompactScorer:
+    """
+    Lightweight scorer that reproduces TfidfVectorizer + LogisticRegression predict_proba
+    from a compact model directory.
+
+    All arrays are memory-mapped read-only, so loading is nearly instant and every
+    worker process shares the same pages. It offers the predict/predict_proba/classes_
+    interface of a fitted pipeline, so DiagnosisModel can use it in place of one.
+    """
+
+    def __init__(self, path):
+        """
+        Memory-maps a compact model directory.
+
+        Args:
+            path (str): Directory written by export_pipeline().
+
+        Raises:
+            ValueError: If the directory has an unsupported format version.
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(f"{path} has unsupported compact model format {meta.get('format_version')}")
+        self.path = path
+        self.params = meta["vectorizer"]
+        self.mode = meta["mode"]
+        self.classes_ = np.array(meta["classes"])
+
+        def load(name):
+            file = os.path.join(path, name)
+            return np.load(file, mmap_mode="r") if os.path.exists(file) else None
+
+        self._offsets = load("vocab_offsets.npy")
+        self._strings = load("vocab_strings.npy")
+        self._idf = load("idf.npy")
+        self._coef_t = load("coef_t.npy")
+        self._coef_indptr = load("coef_indptr.npy")
+        self._coef_indices = load("coef_indices.npy")
+        self._coef_data = load("coef_data.npy")
+        self._coef_scale = load("coef_scale.npy")
+        self._intercept = np.array(load("intercept.npy"))
+        self.coefficients = meta.get("coefficients", {"layout": "dense", "dtype": "float64", "prune": 0.0})
+        # Whether inputs are preprocessed by app.language; older exports were trained on raw text
+        self.preprocess = meta.get("preprocess", False)
+        self._stop_words = frozenset(self.params["stop_words"] or ())
+        self._token_re = re.compile(self.params["token_pattern"])
+        self._analyzer = self._build_analyzer()
+
+    @property
+    def vocabulary_size(self):
+        """
+        int: The number of terms in the vocabulary.
+        """
+        return len(self._offsets) - 1
+
+    def fit(self, X, y):
+        """
+        Compact models cannot be trained.
+
+        Raises:
+            TypeError: Always.
+        """
+        raise TypeError("Compact models are read-only; train a pipeline and export it instead")
+
+    def predict_proba(self, symptoms_list):
+        """
+        Computes class probabilities, matching the exported pipeline's predict_proba().
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(symptoms_list), n_classes).
+        """
+        scores = self.decision_function(symptoms_list)
+        if self.mode == "binary":
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if self.mode == "ovr":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return p / p.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, symptoms_list):
+        """
+        Predicts the most probable class of each input.
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+
+        Returns:
+            numpy.ndarray: The predicted class labels.
+        """
+        return self.classes_[self.predict_proba(symptoms_list).argmax(axis=1)]
+
+    def decision_function(self, symptoms_list):
+        """
+        Computes the linear classifier scores of each input.
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(symptoms_list), n_coefficient_rows).
+        """
+        n_outputs = len(self._intercept)
+        products = np.zeros((len(symptoms_list), n_outputs))
+        for row, symptoms in enumerate(symptoms_list):
+            columns, values = self.transform_one(symptoms)
+            if not len(columns):
+                continue
+            if self._coef_t is not None:
+                products[row] = values @ self._coef_t[columns]
+            else:
+                # Sparse dot product: gather the kept coefficients of each term and sum them per class
+                starts = self._coef_indptr[columns]
+                lengths = self._coef_indptr[columns + 1] - starts
+                positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+                weights = self._coef_data[positions] * np.repeat(values, lengths)
+                products[row] = np.bincount(self._coef_indices[positions], weights=weights, minlength=n_outputs)
+        if self._coef_scale is not None:
+            products *= self._coef_scale
+        return products + self._intercept
+
+    def transform_one(self, symptoms):
+        """
+        Computes the sparse TF-IDF vector of one input.
+
+        Args:
+            symptoms (str): Input symptoms.
+
+        Returns:
+            tuple: Sorted feature columns (numpy.ndarray) and their TF-IDF values (numpy.ndarray).
+        """
+        counts = {}
+        for term in self._analyzer(symptoms):
+            column = self._lookup(term)
+            if column >= 0:
+                counts[column] = counts.get(column, 0) + 1
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        columns = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+        values = np.array([counts[c] for c in columns], dtype=np.float64)
+        if self.params["binary"]:
+            values[:] = 1.0
+        if self.params["sublinear_tf"]:
+            values = np.log(values) + 1.0
+        if self._idf is not None:
+            values = values * self._idf[columns]
+        if self.params["norm"] == "l2":
+            norm = np.sqrt(values @ values)
+            if norm > 0:
+                values = values / norm
+        elif self.params["norm"] == "l1":
+            norm = np.abs(values).sum()
+            if norm > 0:
+                values = values / norm
+        return columns, values
+
+    def _lookup(self, term):
+        """
+        Finds the feature column of a term by binary search over the sorted string table.
+
+        Returns:
+            int: The column, or -1 if the term is not in the vocabulary.
+        """
+        key = term.encode("utf-8")
+        offsets, strings = self._offsets, self._strings
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if strings[offsets[mid]:offsets[mid + 1]].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and strings[offsets[lo]:offsets[lo + 1]].tobytes() == key:
+            return lo
+        return -1
+
+    def _build_analyzer(self):
+        """
+        Builds the text analyzer matching the exported vectorizer.
+
+        Word analyzers are reimplemented here so scoring does not need scikit-learn;
+        character analyzers fall back to scikit-learn's implementation.
+        """
+        params = self.params
+        if params["analyzer"] != "word":
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            return TfidfVectorizer(**{name: params[name] for name in
+                                      ("analyzer", "lowercase", "strip_accents", "ngram_range")}).build_analyzer()
+
+        strip_accents = params["strip_accents"]
+        min_n, max_n = params["ngram_range"]
+
+        def analyze(doc):
+            if params["lowercase"]:
+                doc = doc.lower()
+            if strip_accents == "unicode":
+                doc = _strip_accents_unicode(doc)
+            elif strip_accents == "ascii":
+                doc = unicodedata.normalize("NFKD", doc).encode("ASCII", "ignore").decode("ASCII")
+            tokens = [t for t in self._token_re.findall(doc) if t not in self._stop_words]
+            if max_n == 1:
+                return tokens
+            ngrams = list(tokens) if min_n == 1 else []
+            for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+                ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+            return ngrams
+
+        return analyze
+
+def _strip_accents_unicode(s):
+    """
+    Removes accents like scikit-learn's strip_accents_unicode.
+    """
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", s)
+        return "".join(c for c in normalized if not unicodedata.combining(c))
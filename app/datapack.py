@@ -0,0 +1,255 @@
+import argparse
+import csv
+import os
+import struct
+import numpy as np
+from app.geo import EARTH_RADIUS_KM, haversine_km
+
+DEFAULT_DATAPACK_PATH = os.path.join("data", "processed", "offline.pack")
+
+# File layout (little-endian, every section 8-byte aligned):
+#   header        magic, format version, hospital count n, place count m
+#   hospital_lat  float64[n], sorted ascending
+#   hospital_lon  float64[n], in the same order
+#   hospital_str  uint64[2n+1], string table offsets of name_0, address_0, name_1, ... and the end
+#   place_lat     float64[m], in place name order
+#   place_lon     float64[m]
+#   place_str     uint64[m+1], string table offsets of the normalized place names, sorted by UTF-8 bytes
+#   strings       UTF-8 string table
+MAGIC = b"AICKPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQ4x")
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+def normalize_place_name(name):
+    """
+    Normalizes a place name for gazetteer lookups.
+
+    Args:
+        name (str): The place name.
+
+    Returns:
+        str: The case-folded name with commas dropped and runs of whitespace collapsed.
+    """
+    return " ".join(name.casefold().replace(",", " ").split())
+
+def build_datapack(hospitals, places, path):
+    """
+    Compiles hospitals and a gazetteer of place names into a data pack file.
+
+    The file is written to a temporary name and renamed into place, so processes
+    that have the previous pack memory-mapped keep reading a consistent file.
+
+    Args:
+        hospitals (iterable): Hospitals with 'name', 'address', 'latitude' and 'longitude' fields.
+        places (iterable): Places with 'name', 'latitude' and 'longitude' fields.
+            If a normalized name occurs more than once, the first occurrence wins.
+        path (str): Path of the data pack file.
+
+    Returns:
+        tuple: The number of hospitals and places written.
+    """
+    hospitals = sorted((h for h in hospitals if h.get("latitude") is not None and h.get("longitude") is not None),
+                       key=lambda h: float(h["latitude"]))
+    gazetteer = {}
+    for place in places:
+        key = normalize_place_name(place["name"]).encode("utf-8")
+        if key and key not in gazetteer:
+            gazetteer[key] = (float(place["latitude"]), float(place["longitude"]))
+    names = sorted(gazetteer)
+
+    strings = bytearray()
+    hospital_offsets = [0]
+    for hospital in hospitals:
+        for field in ("name", "address"):
+            strings += str(hospital[field] or "").encode("utf-8")
+            hospital_offsets.append(len(strings))
+    place_offsets = [len(strings)]
+    for name in names:
+        strings += name
+        place_offsets.append(len(strings))
+
+    sections = [
+        np.array([float(h["latitude"]) for h in hospitals], dtype="<f8"),
+        np.array([float(h["longitude"]) for h in hospitals], dtype="<f8"),
+        np.array(hospital_offsets, dtype="<u8"),
+        np.array([gazetteer[name][0] for name in names], dtype="<f8"),
+        np.array([gazetteer[name][1] for name in names], dtype="<f8"),
+        np.array(place_offsets, dtype="<u8"),
+    ]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(hospitals), len(names)))
+        for section in sections:
+            f.write(section.tobytes())
+        f.write(bytes(strings))
+    os.replace(tmp_path, path)
+    return len(hospitals), len(names)
+
+class DataPack:
+    """
+    Read-only, memory-mapped view of a data pack built by build_datapack().
+
+    Opening a pack only maps the file; pages are loaded on demand by the OS and
+    shared between every process that maps the same file.
+    """
+
+    def __init__(self, path):
+        """
+        Memory-maps a data pack.
+
+        Args:
+            path (str): Path of the data pack file.
+
+        Raises:
+            ValueError: If the file is not a data pack of a supported version.
+        """
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, n, m = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} data pack")
+
+        offset = HEADER.size
+        def section(dtype, count):
+            nonlocal offset
+            array = self._map[offset:offset + 8 * count].view(dtype)
+            offset += 8 * count
+            return array
+
+        self._hospital_lat = section("<f8", n)
+        self._hospital_lon = section("<f8", n)
+        self._hospital_str = section("<u8", 2 * n + 1)
+        self._place_lat = section("<f8", m)
+        self._place_lon = section("<f8", m)
+        self._place_str = section("<u8", m + 1)
+        self._strings = self._map[offset:]
+
+    def __len__(self):
+        return len(self._hospital_lat)
+
+    @property
+    def place_count(self):
+        """
+        int: The number of places in the gazetteer.
+        """
+        return len(self._place_lat)
+
+    def _string(self, start, end):
+        return bytes(self._strings[start:end])
+
+    def hospital(self, i):
+        """
+        Returns one hospital record.
+
+        Args:
+            i (int): Position of the hospital in latitude order.
+
+        Returns:
+            dict: Hospital with 'name', 'address', 'latitude' and 'longitude' fields.
+        """
+        offsets = self._hospital_str[2 * i:2 * i + 3]
+        return {
+            "name": self._string(offsets[0], offsets[1]).decode("utf-8"),
+            "address": self._string(offsets[1], offsets[2]).decode("utf-8"),
+            "latitude": float(self._hospital_lat[i]),
+            "longitude": float(self._hospital_lon[i]),
+        }
+
+    def nearest(self, latitude, longitude, k=10, radius_km=None):
+        """
+        Finds the hospitals closest to a location.
+
+        Candidates are taken from a latitude band found by binary search on the sorted
+        latitudes; the band is widened until it provably contains the k nearest hospitals.
+
+        Args:
+            latitude (float): Latitude of the location, in degrees.
+            longitude (float): Longitude of the location, in degrees.
+            k (int, optional): Maximum number of hospitals to return; None for no limit. Defaults to 10.
+            radius_km (float, optional): Only return hospitals within this distance. Defaults to None (no limit).
+
+        Returns:
+            list: Hospitals with a 'distance' field in kilometres, sorted by distance.
+        """
+        count = len(self)
+        if count == 0 or (k is not None and k < 1):
+            return []
+        wanted = count if k is None else min(k, count)
+        max_radius = np.pi * EARTH_RADIUS_KM if radius_km is None else radius_km
+        radius = max_radius if k is None else min(max_radius, 25.0)
+        while True:
+            band = radius / KM_PER_DEGREE
+            lo = np.searchsorted(self._hospital_lat, latitude - band, side="left")
+            hi = np.searchsorted(self._hospital_lat, latitude + band, side="right")
+            distances = haversine_km(latitude, longitude, self._hospital_lat[lo:hi], self._hospital_lon[lo:hi])
+            inside = np.flatnonzero(distances <= radius)
+            if len(inside) >= wanted or radius >= max_radius:
+                break
+            radius = min(radius * 4, max_radius)
+
+        order = inside[np.argsort(distances[inside], kind="stable")][:wanted]
+        return [dict(self.hospital(lo + i), distance=round(float(distances[i]), 2)) for i in order]
+
+    def geocode(self, name):
+        """
+        Looks a place name up in the gazetteer.
+
+        Args:
+            name (str): The place name; compared after normalize_place_name().
+
+        Returns:
+            tuple: Latitude and longitude of the place, or None if it is not in the gazetteer.
+        """
+        key = normalize_place_name(name).encode("utf-8")
+        lo, hi = 0, self.place_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(self._place_str[mid], self._place_str[mid + 1]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.place_count and self._string(self._place_str[lo], self._place_str[lo + 1]) == key:
+            return float(self._place_lat[lo]), float(self._place_lon[lo])
+        return None
+
+def _read_csv(path):
+    """
+    Reads a CSV file with a header row into a list of dictionaries.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def main(argv=None):
+    """
+    Command-line entry point that builds the offline data pack.
+
+    Example:
+        python -m app.datapack --gazetteer data/raw/gazetteer.csv
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Build the offline hospital and geocoding data pack.")
+    parser.add_argument("--gazetteer", required=True, help="CSV file of place names with name,latitude,longitude columns.")
+    parser.add_argument("--hospitals", help="CSV file with name,address,latitude,longitude columns. "
+                                            "Defaults to the hospitals table of the database.")
+    parser.add_argument("-o", "--output", default=DEFAULT_DATAPACK_PATH, help="Path of the data pack file.")
+    args = parser.parse_args(argv)
+
+    if args.hospitals:
+        hospitals = _read_csv(args.hospitals)
+    else:
+        from app.utils import db
+        hospitals = db.load_hospitals()
+    counts = build_datapack(hospitals, _read_csv(args.gazetteer), args.output)
+    print(f"Wrote {counts[0]} hospitals and {counts[1]} places to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from flask.json.provider import DefaultJSONProvider
+from app.metrics import metrics
+
+# Optional accelerators: orjson serializes several times faster than the json module and
+# handles NumPy scalars and arrays natively; brotli compresses text better than gzip.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "image/svg+xml", "text/")
+
+# Directory of the web client and its static assets
+DEFAULT_ASSET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+def _default(obj):
+    """
+    Converts NumPy scalars and arrays for the json module.
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj, indent=False):
+    """
+    Serializes an object as compact UTF-8 JSON.
+
+    NumPy scalars and arrays, e.g. model probabilities, are serialized as numbers and lists.
+
+    Args:
+        obj: The object.
+        indent (bool, optional): Indent the output by two spaces. Defaults to False.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, default=_default, ensure_ascii=False, indent=2 if indent else None,
+                      separators=None if indent else (",", ":")).encode("utf-8")
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider serializing with dumps().
+
+    Keys are kept in insertion order, so probabilities stay ordered from most to least probable.
+    """
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+def filter_probabilities(probabilities, top_k=None, min_probability=None):
+    """
+    Keeps the most probable diagnoses of a probability map.
+
+    Args:
+        probabilities (dict): Probabilities keyed by diagnosis, ordered from most to least probable.
+        top_k (int, optional): Keep at most this many diagnoses. Defaults to None (no limit).
+        min_probability (float, optional): Drop diagnoses less probable than this. Defaults to None.
+
+    Returns:
+        dict: The kept probabilities, in the same order.
+    """
+    if top_k is None and not min_probability:
+        return probabilities
+    kept = {}
+    for diagnosis, probability in probabilities.items():
+        if (top_k is not None and len(kept) >= top_k) or (min_probability and probability < min_probability):
+            break
+        kept[diagnosis] = probability
+    return kept
+
+def negotiate_encoding(accept_encoding):
+    """
+    Chooses the content encoding of a response from the request's Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): The header value, e.g. "gzip, deflate, br;q=0.9".
+
+    Returns:
+        str: "br" (if brotli is installed), "gzip", or "identity", whichever the client prefers.
+    """
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    preferences = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        preferences[coding] = q
+
+    # On equal preference, the first supported encoding (the smaller output) wins
+    best, best_q = "identity", 0.0
+    for coding in supported:
+        q = preferences.get(coding, preferences.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def compress(body, encoding, level=None):
+    """
+    Compresses a response body.
+
+    Args:
+        body (bytes): The body.
+        encoding (str): "br", "gzip" or "identity".
+        level (int, optional): Compression level; brotli quality 0-11 or gzip level 1-9.
+                               Defaults to 5 for brotli and 6 for gzip.
+
+    Returns:
+        bytes: The encoded body.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=5 if level is None else level)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6 if level is None else level, mtime=0)
+    return body
+
+def _compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+class Asset:
+    """
+    A static file with its precompressed variants and ETag.
+    """
+
+    def __init__(self, path):
+        """
+        Reads and compresses the file at the highest levels, once.
+
+        Args:
+            path (str): Path of the file.
+        """
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": body}
+        if _compressible(self.mimetype):
+            self.variants["gzip"] = compress(body, "gzip", level=9)
+            if brotli is not None:
+                self.variants["br"] = compress(body, "br", level=11)
+
+    def variant(self, accept_encoding):
+        """
+        Returns the smallest variant the client accepts.
+
+        Args:
+            accept_encoding (str): The request's Accept-Encoding header.
+
+        Returns:
+            tuple: The encoding, the body and the ETag of the variant.
+        """
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding not in self.variants or len(self.variants[encoding]) >= len(self.variants["identity"]):
+            encoding = "identity"
+        etag = self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+        return encoding, self.variants[encoding], etag
+
+class AssetCache:
+    """
+    Serves static files from a directory from memory, precompressed.
+
+    A file is reread when its modification time or size changes, so edits are picked up
+    without a restart.
+    """
+
+    def __init__(self, directory=DEFAULT_ASSET_DIR):
+        """
+        Initializes an empty cache.
+
+        Args:
+            directory (str, optional): Directory of the files. Defaults to the templates directory.
+        """
+        self.directory = os.path.abspath(directory)
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Returns a file of the directory.
+
+        Args:
+            name (str): Path of the file relative to the directory.
+
+        Returns:
+            Asset: The file, or None if it does not exist or is outside the directory.
+        """
+        path = os.path.abspath(os.path.join(self.directory, name))
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        asset = self._assets.get(path)
+        if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                asset = self._assets.get(path)
+                if asset is None or asset.signature != (stat.st_mtime_ns, stat.st_size):
+                    if not os.path.isfile(path):
+                        return None
+                    asset = self._assets[path] = Asset(path)
+        return asset
+
+    def response(self, name, request, max_age=0):
+        """
+        Builds the response for a file, answering conditional requests with 304 Not Modified.
+
+        Args:
+            name (str): Path of the file relative to the directory.
+            request (flask.Request): The request.
+            max_age (int, optional): Seconds clients may use the file without revalidating. Defaults to 0
+                                     (revalidate with the ETag every time).
+
+        Returns:
+            flask.Response: The response, or None if the file does not exist.
+        """
+        from flask import current_app
+
+        asset = self.get(name)
+        if asset is None:
+            return None
+        encoding, body, etag = asset.variant(request.headers.get("Accept-Encoding"))
+        response = current_app.response_class(body, mimetype=asset.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(etag)
+        response.cache_control.public = True
+        if max_age:
+            response.cache_control.max_age = max_age
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+def init_app(app, min_size=None):
+    """
+    Sets up fast JSON serialization for a Flask application, and compresses its responses
+    according to each request's Accept-Encoding header. The size of every response body,
+    after compression, is recorded in the metrics.
+
+    Args:
+        app (Flask): The application.
+        min_size (int, optional): Smallest body worth compressing, in bytes. Defaults to the
+                                  COMPRESS_MIN_BYTES environment variable or 512.
+    """
+    from flask import request
+
+    if min_size is None:
+        min_size = int(os.environ.get("COMPRESS_MIN_BYTES", 512))
+    app.json = JSONProvider(app)
+
+    @app.after_request
+    def compress_response(response):
+        if response.is_streamed or response.direct_passthrough:
+            return response
+        encoding = response.headers.get("Content-Encoding", "identity")
+        if (encoding == "identity" and 200 <= response.status_code < 300 and _compressible(response.mimetype)
+                and response.content_length is not None and response.content_length >= min_size):
+            response.vary.add("Accept-Encoding")
+            encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+            if encoding != "identity":
+                with metrics.timer("compress"):
+                    response.set_data(compress(response.get_data(), encoding))
+                response.headers["Content-Encoding"] = encoding
+        metrics.response_bytes.observe(response.content_length or 0, endpoint=request.endpoint or "unmatched",
+                                       encoding=encoding)
+        return response
@@ -0,0 +1,254 @@
+import threading
+import numpy as np
+
+# Mean Earth radius in kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Computes great-circle distances from one point to one or more points.
+
+    Args:
+        latitude (float): Latitude of the origin, in degrees.
+        longitude (float): Longitude of the origin, in degrees.
+        latitudes (array-like): Latitudes of the destinations, in degrees.
+        longitudes (array-like): Longitudes of the destinations, in degrees.
+
+    Returns:
+        numpy.ndarray: Distances in kilometres.
+    """
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    lon2 = np.radians(np.asarray(longitudes, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# Alphabet of geohash cells
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash(latitude, longitude, precision=5):
+    """
+    Encodes a location as a geohash cell.
+
+    Every character halves the cell five times, alternating between longitude and
+    latitude, so a cell's prefixes are the cells containing it. At precision 5 a cell
+    is about 4.9 km by 4.9 km at the equator.
+
+    Args:
+        latitude (float): The latitude, in degrees.
+        longitude (float): The longitude, in degrees.
+        precision (int, optional): Number of characters. Defaults to 5.
+
+    Returns:
+        str: The geohash.
+    """
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    cell = []
+    bits, value, even = 0, 0, True
+    while len(cell) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(GEOHASH_BASE32[value])
+            bits, value = 0, 0
+    return "".join(cell)
+
+def hospital_key(hospital):
+    """
+    Returns the identity of a hospital record used for incremental updates.
+
+    Args:
+        hospital (dict): Hospital with 'name' and 'address' fields.
+
+    Returns:
+        tuple: The (name, address) pair.
+    """
+    return hospital["name"], hospital["address"]
+
+class _Snapshot:
+    """
+    Immutable state of a HospitalIndex: a ball tree over the bulk of the records,
+    plus recently added records and removed keys not yet folded into the tree.
+    """
+    def __init__(self, records=(), pending=(), removed=frozenset(), base=None):
+        if base is not None:
+            self.records, self.record_keys, self.tree = base.records, base.record_keys, base.tree
+        else:
+            self.records = list(records)
+            self.record_keys = frozenset(hospital_key(h) for h in self.records)
+            self.tree = None
+            if self.records:
+                from sklearn.neighbors import BallTree
+                coords = np.radians([[h["latitude"], h["longitude"]] for h in self.records])
+                self.tree = BallTree(coords, metric="haversine")
+        self.pending = tuple(pending)
+        self.removed = frozenset(removed)
+
+    def current(self):
+        """
+        Returns the hospitals currently in the index, keyed by hospital_key().
+        """
+        hospitals = {hospital_key(h): h for h in self.records if hospital_key(h) not in self.removed}
+        hospitals.update((hospital_key(h), h) for h in self.pending)
+        return hospitals
+
+class HospitalIndex:
+    """
+    In-memory nearest-neighbour index of hospitals with true haversine distances.
+
+    Queries run against an immutable snapshot, so they never block on updates.
+    Small changes are applied incrementally as a pending list and tombstones that
+    are searched alongside the tree; the tree is rebuilt once they exceed rebuild_threshold.
+    """
+
+    def __init__(self, hospitals=(), rebuild_threshold=64):
+        """
+        Initializes the index.
+
+        Args:
+            hospitals (iterable, optional): Hospitals with 'name', 'address', 'latitude' and 'longitude' fields.
+            rebuild_threshold (int, optional): Number of pending changes that triggers a rebuild. Defaults to 64.
+        """
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(self._valid(hospitals))
+
+    def __len__(self):
+        return len(self._snapshot.current())
+
+    def build(self, hospitals):
+        """
+        Replaces the whole index.
+
+        Args:
+            hospitals (iterable): Hospitals with 'name', 'address', 'latitude' and 'longitude' fields.
+        """
+        snapshot = _Snapshot(self._valid(hospitals))
+        with self._lock:
+            self._snapshot = snapshot
+
+    def add(self, hospital):
+        """
+        Adds or replaces a hospital without rebuilding the tree.
+
+        Args:
+            hospital (dict): Hospital with 'name', 'address', 'latitude' and 'longitude' fields.
+        """
+        self.update(added=[hospital])
+
+    def remove(self, hospital):
+        """
+        Removes a hospital without rebuilding the tree.
+
+        Args:
+            hospital (dict): Hospital with 'name' and 'address' fields.
+        """
+        self.update(removed=[hospital])
+
+    def update(self, added=(), removed=()):
+        """
+        Applies a set of changes, rebuilding the tree only if too many changes are pending.
+
+        Args:
+            added (iterable, optional): Hospitals to add or replace.
+            removed (iterable, optional): Hospitals to remove.
+        """
+        added = self._valid(added)
+        changed = {hospital_key(h) for h in added} | {hospital_key(h) for h in removed}
+        with self._lock:
+            current = self._snapshot
+            pending = [h for h in current.pending if hospital_key(h) not in changed] + added
+            tombstones = current.removed | (changed & current.record_keys)
+            if len(pending) + len(tombstones) > self.rebuild_threshold:
+                records = [h for h in current.records if hospital_key(h) not in tombstones] + pending
+                self._snapshot = _Snapshot(records)
+            else:
+                self._snapshot = _Snapshot(pending=pending, removed=tombstones, base=current)
+
+    def sync(self, hospitals):
+        """
+        Brings the index in line with a full list of hospitals, applying only the differences.
+
+        Args:
+            hospitals (iterable): The complete current list of hospitals.
+        """
+        hospitals = {hospital_key(h): h for h in self._valid(hospitals)}
+        current = self._snapshot.current()
+        added = [h for key, h in hospitals.items() if current.get(key) != h]
+        removed = [h for key, h in current.items() if key not in hospitals]
+        if added or removed:
+            self.update(added=added, removed=removed)
+
+    def nearest(self, latitude, longitude, k=10, radius_km=None):
+        """
+        Finds the hospitals closest to a location.
+
+        Args:
+            latitude (float): Latitude of the location, in degrees.
+            longitude (float): Longitude of the location, in degrees.
+            k (int, optional): Maximum number of hospitals to return; None for no limit. Defaults to 10.
+            radius_km (float, optional): Only return hospitals within this distance. Defaults to None (no limit).
+
+        Returns:
+            list: Hospitals with a 'distance' field in kilometres, sorted by distance.
+        """
+        snapshot = self._snapshot
+        results = []
+        if k is not None and k < 1:
+            return results
+        if snapshot.tree is not None:
+            point = np.radians([[latitude, longitude]])
+            if radius_km is not None:
+                indices, distances = snapshot.tree.query_radius(
+                    point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True)
+                indices, distances = indices[0], distances[0]
+            else:
+                count = len(snapshot.records) if k is None else min(len(snapshot.records), k + len(snapshot.removed))
+                distances, indices = snapshot.tree.query(point, k=count)
+                indices, distances = indices[0], distances[0]
+            for i, distance in zip(indices, distances):
+                hospital = snapshot.records[i]
+                if hospital_key(hospital) not in snapshot.removed:
+                    results.append((distance * EARTH_RADIUS_KM, hospital))
+
+        if snapshot.pending:
+            distances = haversine_km(latitude, longitude,
+                                     [h["latitude"] for h in snapshot.pending],
+                                     [h["longitude"] for h in snapshot.pending])
+            for distance, hospital in zip(distances, snapshot.pending):
+                if radius_km is None or distance <= radius_km:
+                    results.append((float(distance), hospital))
+
+        results.sort(key=lambda result: result[0])
+        if k is not None:
+            results = results[:k]
+        return [dict(hospital, distance=round(float(distance), 2)) for distance, hospital in results]
+
+    def within(self, latitude, longitude, radius_km):
+        """
+        Finds all hospitals within a radius of a location.
+
+        Args:
+            latitude (float): Latitude of the location, in degrees.
+            longitude (float): Longitude of the location, in degrees.
+            radius_km (float): Search radius in kilometres.
+
+        Returns:
+            list: Hospitals with a 'distance' field in kilometres, sorted by distance.
+        """
+        return self.nearest(latitude, longitude, k=None, radius_km=radius_km)
+
+    @staticmethod
+    def _valid(hospitals):
+        """
+        Drops hospitals without usable coordinates.
+        """
+        return [h for h in hospitals if h.get("latitude") is not None and h.get("longitude") is not None]
@@ -0,0 +1,398 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+import numpy as np
+
+# Canonical English symptom terms for common phrasings, per language. Keys are matched
+# after normalization (case folding, accent folding for Latin scripts, letter unification
+# and article stripping for Arabic), so they can be written naturally. More terms can be
+# added without code changes with a JSON file of the same shape, see load_lexicons().
+# Everyday words with a non-medical sense ("tired of", "my nose runs", "room temperature")
+# are only listed as part of phrases that fix their meaning.
+LEXICONS = {
+    "en": {
+        "belly ache": "stomach pain", "bellyache": "stomach pain", "tummy ache": "stomach pain",
+        "stomachache": "stomach pain", "stomach ache": "stomach pain", "abdominal pain": "stomach pain",
+        "head ache": "headache", "head hurts": "headache", "throwing up": "vomiting", "throw up": "vomiting",
+        "puking": "vomiting", "feel sick": "nausea", "feeling sick": "nausea", "queasy": "nausea",
+        "feverish": "fever", "high temperature": "fever", "have a temperature": "fever",
+        "running a temperature": "fever", "coughing": "cough",
+        "scratchy throat": "sore throat", "throat hurts": "sore throat", "stuffy nose": "nasal congestion",
+        "blocked nose": "nasal congestion", "short of breath": "shortness of breath",
+        "breathless": "shortness of breath", "dizzy": "dizziness", "lightheaded": "dizziness",
+        "feel tired": "fatigue", "feeling tired": "fatigue", "always tired": "fatigue", "exhausted": "fatigue",
+        "the runs": "diarrhea", "diarrhoea": "diarrhea",
+        "itchy": "itching", "chills": "chills", "shivering": "chills", "rash": "rash",
+    },
+    "es": {
+        "dolor de cabeza": "headache", "jaqueca": "headache", "migraña": "migraine", "fiebre": "fever",
+        "calentura": "fever", "tos": "cough", "dolor de garganta": "sore throat", "garganta irritada": "sore throat",
+        "dolor de estomago": "stomach pain", "dolor de barriga": "stomach pain", "dolor abdominal": "stomach pain",
+        "nauseas": "nausea", "vomito": "vomiting", "vomitos": "vomiting", "vomitar": "vomiting",
+        "diarrea": "diarrhea", "mareo": "dizziness", "mareos": "dizziness", "cansancio": "fatigue",
+        "fatiga": "fatigue", "escalofrios": "chills", "congestion nasal": "nasal congestion",
+        "nariz tapada": "nasal congestion", "falta de aire": "shortness of breath", "sarpullido": "rash",
+        "erupcion": "rash", "picazon": "itching", "dolor": "pain", "dolor de pecho": "chest pain",
+    },
+    "fr": {
+        "mal de tete": "headache", "mal a la tete": "headache", "maux de tete": "headache", "migraine": "migraine", "fievre": "fever",
+        "toux": "cough", "mal de gorge": "sore throat", "mal a la gorge": "sore throat", "gorge irritee": "sore throat",
+        "mal au ventre": "stomach pain", "mal de ventre": "stomach pain", "douleur abdominale": "stomach pain",
+        "nausee": "nausea", "nausees": "nausea", "vomissement": "vomiting", "vomissements": "vomiting",
+        "diarrhee": "diarrhea", "vertige": "dizziness", "vertiges": "dizziness", "fatigue": "fatigue",
+        "frissons": "chills", "nez bouche": "nasal congestion", "essoufflement": "shortness of breath",
+        "eruption cutanee": "rash", "demangeaisons": "itching", "douleur": "pain",
+        "douleur thoracique": "chest pain",
+    },
+    "ar": {
+        "صداع": "headache", "صداع نصفي": "migraine", "حمى": "fever", "حرارة": "fever", "سخونة": "fever",
+        "سعال": "cough", "كحة": "cough", "التهاب الحلق": "sore throat", "ألم الحلق": "sore throat",
+        "ألم في البطن": "stomach pain", "ألم البطن": "stomach pain", "مغص": "stomach pain",
+        "غثيان": "nausea", "قيء": "vomiting", "استفراغ": "vomiting", "إسهال": "diarrhea", "دوخة": "dizziness",
+        "دوار": "dizziness", "تعب": "fatigue", "إرهاق": "fatigue", "قشعريرة": "chills",
+        "احتقان الأنف": "nasal congestion", "ضيق التنفس": "shortness of breath", "طفح جلدي": "rash",
+        "حكة": "itching", "ألم": "pain", "ألم في الصدر": "chest pain",
+    },
+    "zh": {
+        "头痛": "headache", "頭痛": "headache", "头疼": "headache", "頭疼": "headache", "偏头痛": "migraine",
+        "偏頭痛": "migraine", "发烧": "fever", "發燒": "fever", "发热": "fever", "發熱": "fever",
+        "咳嗽": "cough", "喉咙痛": "sore throat", "喉嚨痛": "sore throat", "嗓子疼": "sore throat",
+        "胃痛": "stomach pain", "肚子疼": "stomach pain", "腹痛": "stomach pain", "恶心": "nausea",
+        "噁心": "nausea", "呕吐": "vomiting", "嘔吐": "vomiting", "腹泻": "diarrhea", "腹瀉": "diarrhea",
+        "拉肚子": "diarrhea", "头晕": "dizziness", "頭暈": "dizziness", "疲劳": "fatigue", "疲勞": "fatigue",
+        "乏力": "fatigue", "发冷": "chills", "發冷": "chills", "鼻塞": "nasal congestion",
+        "呼吸困难": "shortness of breath", "呼吸困難": "shortness of breath", "皮疹": "rash", "瘙痒": "itching",
+        "胸痛": "chest pain", "疼": "pain", "痛": "pain",
+    },
+}
+
+# Everyday sentences per Latin-script language, added to the lexicon terms to build the
+# character n-gram profiles used for language identification.
+LANGUAGE_SAMPLES = {
+    "en": "i have had a bad headache and a fever since yesterday my throat is sore and i feel very tired "
+          "the pain is worse at night and my child has been coughing with a runny nose what should i do",
+    "es": "tengo dolor de cabeza y fiebre desde ayer me duele la garganta y estoy muy cansado "
+          "el dolor es peor por la noche y mi hijo tiene tos con mocos que debo hacer",
+    "fr": "j'ai mal à la tête et de la fièvre depuis hier j'ai mal à la gorge et je suis très fatigué "
+          "la douleur est pire la nuit et mon enfant tousse avec le nez qui coule que dois-je faire",
+}
+
+DEFAULT_LANGUAGE = "en"
+
+_HAN_CHARS = "\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF"
+_HAN = re.compile(f"[{_HAN_CHARS}]+")
+# A run of Han characters (group 1), or a word of any other script
+_TOKEN = re.compile(f"([{_HAN_CHARS}]+)|[^\\W_{_HAN_CHARS}]+")
+_ARABIC = re.compile("[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]")
+# Harakat, superscript alef, Quranic marks and tatweel
+_ARABIC_DIACRITICS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+# Alef variants, alef maqsura and teh marbuta are unified with the letters they are often typed as
+_ARABIC_LETTERS = str.maketrans({"\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",
+                                 "\u0649": "\u064A", "\u0629": "\u0647"})
+# Definite article and conjunction/preposition prefixes, longest first
+_ARABIC_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال", "و")
+
+def normalize_text(text):
+    """
+    Applies Unicode normalization shared by every script: NFKC (folding full-width and
+    compatibility forms), case folding, and Arabic diacritic and letter-variant removal.
+
+    Args:
+        text (str): The input text.
+
+    Returns:
+        str: The normalized text.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    if _ARABIC.search(text):
+        text = _ARABIC_DIACRITICS.sub("", text).translate(_ARABIC_LETTERS)
+    return text
+
+@lru_cache(maxsize=65536)
+def _latin_key(token):
+    """
+    Returns the lexicon key of a Latin-script token: the token without accents.
+    """
+    if token.isascii():
+        return token
+    return "".join(c for c in unicodedata.normalize("NFD", token) if not unicodedata.combining(c))
+
+def _arabic_key(token):
+    """
+    Returns the lexicon key of an Arabic token: the token without a leading article or conjunction.
+    """
+    for prefix in _ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix):]
+    return token
+
+def tokenize(text):
+    """
+    Splits normalized text into tokens, keeping runs of Han characters together for
+    dictionary segmentation.
+
+    Args:
+        text (str): Text returned by normalize_text().
+
+    Returns:
+        list: (token, script) tuples, where script is "han", "arabic" or "latin".
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        token = match.group()
+        if match.group(1):
+            tokens.append((token, "han"))
+        elif _ARABIC.match(token):
+            tokens.append((token, "arabic"))
+        else:
+            tokens.append((token, "latin"))
+    return tokens
+
+def load_lexicons(path):
+    """
+    Loads additional lexicon terms from a JSON file of the form {"es": {"term": "english term"}}.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        dict: Lexicons merged over the built-in LEXICONS.
+    """
+    with open(path, encoding="utf-8") as f:
+        extra = json.load(f)
+    lexicons = {language: dict(terms) for language, terms in LEXICONS.items()}
+    for language, terms in extra.items():
+        lexicons.setdefault(language, {}).update(terms)
+    return lexicons
+
+class SymptomPreprocessor:
+    """
+    Local preprocessing stage in front of the diagnosis model, turning symptom descriptions
+    in English, Spanish, French, Arabic or Chinese into canonical English terms.
+
+    Text is normalized, tokenized by script and matched longest-phrase-first against
+    precompiled per-language lexicons. Han runs are segmented by forward maximum matching.
+    The lexicon of a Latin-script text is chosen by character n-gram language identification,
+    scored for a whole batch in one vectorized reduction; only that language's terms are
+    matched, so a word is never rewritten with another language's meaning. Unmatched tokens are kept.
+    """
+
+    def __init__(self, lexicons=None, samples=None):
+        """
+        Compiles the lexicons and the language identification profiles.
+
+        Args:
+            lexicons (dict, optional): Terms per language code. Defaults to LEXICONS.
+            samples (dict, optional): Sample text per Latin-script language. Defaults to LANGUAGE_SAMPLES.
+        """
+        lexicons = LEXICONS if lexicons is None else lexicons
+        samples = LANGUAGE_SAMPLES if samples is None else samples
+
+        # Phrase tables keyed on tuples of token keys, plus the longest phrase per language
+        self._phrases = {}
+        self._max_phrase = {}
+        for language, terms in lexicons.items():
+            table = {}
+            for term, canonical in terms.items():
+                if language == "zh":
+                    key = (normalize_text(term),)
+                else:
+                    key = tuple(self._key(token, script) for token, script in tokenize(normalize_text(term)))
+                if key:
+                    table[key] = canonical
+            self._phrases[language] = table
+            self._max_phrase[language] = max((len(key[0]) if language == "zh" else len(key)
+                                              for key in table), default=0)
+
+        # Latin-script languages, with lexicon terms added to their samples
+        self.languages = sorted(set(samples) | {language for language in lexicons if language not in ("ar", "zh")})
+        self._build_profiles({language: " ".join([samples.get(language, "")] + list(lexicons.get(language, ())))
+                              for language in self.languages})
+
+    @staticmethod
+    def _key(token, script):
+        if script == "latin":
+            return _latin_key(token)
+        if script == "arabic":
+            return _arabic_key(token)
+        return token
+
+    @staticmethod
+    def _ngrams(text):
+        """
+        Yields the character 1- to 3-grams of the Latin-script words of a text, padded with spaces.
+        """
+        for word in _TOKEN.finditer(text):
+            if word.group(1) or word.group().isdigit() or _ARABIC.match(word.group()):
+                continue
+            padded = f" {_latin_key(word.group())} "
+            for n in (1, 2, 3):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def _build_profiles(self, texts):
+        """
+        Fits a multinomial naive Bayes model of character n-grams per language.
+        """
+        counts = {language: {} for language in texts}
+        for language, text in texts.items():
+            for ngram in self._ngrams(normalize_text(text)):
+                counts[language][ngram] = counts[language].get(ngram, 0) + 1
+        vocabulary = sorted(set().union(*counts.values())) if counts else []
+        self._ngram_index = {ngram: i for i, ngram in enumerate(vocabulary)}
+        weights = np.ones((len(vocabulary), len(self.languages)))  # Laplace smoothing
+        for j, language in enumerate(self.languages):
+            for ngram, count in counts[language].items():
+                weights[self._ngram_index[ngram], j] += count
+        totals = weights.sum(axis=0)
+        self._log_probs = np.log(weights / totals)
+        self._unknown_log_probs = np.log(1.0 / totals)
+
+    def detect(self, texts):
+        """
+        Identifies the language of several normalized texts at once.
+
+        Texts written mostly in Arabic or Han script are identified by their script; the
+        others by their character n-grams.
+
+        Args:
+            texts (list): Texts returned by normalize_text().
+
+        Returns:
+            list: A language code per text, e.g. "en", "es", "ar" or "zh".
+        """
+        languages = [None] * len(texts)
+        columns, lengths, unknown, latin = [], [], [], []
+        for i, text in enumerate(texts):
+            han = sum(len(run) for run in _HAN.findall(text))
+            arabic = len(_ARABIC.findall(text))
+            if han or arabic:
+                languages[i] = "zh" if han >= arabic else "ar"
+                continue
+            known = missing = 0
+            for ngram in self._ngrams(text):
+                column = self._ngram_index.get(ngram)
+                if column is None:
+                    missing += 1
+                else:
+                    columns.append(column)
+                    known += 1
+            if known:
+                latin.append(i)
+                lengths.append(known)
+                unknown.append(missing)
+            else:
+                # Texts without known n-grams score the same in every language
+                languages[i] = DEFAULT_LANGUAGE
+
+        if latin:
+            # Sum the n-gram log-probabilities of each text in one reduction over the batch
+            starts = np.cumsum([0] + lengths[:-1])
+            scores = np.add.reduceat(self._log_probs[columns], starts, axis=0)
+            scores += np.outer(unknown, self._unknown_log_probs)
+            for i, best in zip(latin, scores.argmax(axis=1)):
+                languages[i] = self.languages[best]
+        return languages
+
+    def _translate(self, text, language):
+        """
+        Replaces lexicon phrases in one normalized text by their canonical English terms.
+        """
+        # Latin-script words in Arabic or Chinese text are matched against the English lexicon
+        latin = language if language in self.languages else DEFAULT_LANGUAGE
+        tokens = tokenize(text)
+        keys = [self._key(token, script) for token, script in tokens]
+        output = []
+        i = 0
+        while i < len(tokens):
+            token, script = tokens[i]
+            if script == "han":
+                output.extend(self._segment(token))
+                i += 1
+                continue
+
+            # Longest phrase of the detected language starting here
+            candidate = "ar" if script == "arabic" else latin
+            table = self._phrases.get(candidate, {})
+            match = None
+            for length in range(min(self._max_phrase.get(candidate, 0), len(tokens) - i), 0, -1):
+                if any(tokens[j][1] != script for j in range(i, i + length)):
+                    continue
+                canonical = table.get(tuple(keys[i:i + length]))
+                if canonical is not None:
+                    match = (canonical, length)
+                    break
+            if match:
+                output.append(match[0])
+                i += match[1]
+            else:
+                output.append(token)
+                i += 1
+        return " ".join(output)
+
+    def _segment(self, run):
+        """
+        Segments a run of Han characters by forward maximum matching against the Chinese lexicon.
+        """
+        table = self._phrases.get("zh", {})
+        longest = self._max_phrase.get("zh", 0)
+        output = []
+        i = 0
+        while i < len(run):
+            for length in range(min(longest, len(run) - i), 0, -1):
+                canonical = table.get((run[i:i + length],))
+                if canonical is not None:
+                    output.append(canonical)
+                    i += length
+                    break
+            else:
+                output.append(run[i])
+                i += 1
+        return output
+
+    def transform(self, texts):
+        """
+        Preprocesses a batch of symptom descriptions.
+
+        Args:
+            texts (list): Symptom descriptions in any supported language.
+
+        Returns:
+            list: The descriptions in canonical English terms, in input order.
+        """
+        return self.transform_with_languages(texts)[0]
+
+    def transform_with_languages(self, texts):
+        """
+        Preprocesses a batch of symptom descriptions and reports their languages.
+
+        Args:
+            texts (list): Symptom descriptions in any supported language.
+
+        Returns:
+            tuple: The preprocessed texts and the detected language code of each.
+        """
+        normalized = [normalize_text(text) for text in texts]
+        languages = self.detect(normalized)
+        return [self._translate(text, language) for text, language in zip(normalized, languages)], languages
+
+_default_preprocessor = None
+_default_lock = threading.Lock()
+
+def get_preprocessor():
+    """
+    Returns the shared preprocessor, compiling it on first use. Terms from the JSON file
+    named by the SYMPTOM_LEXICON_PATH environment variable are added to the built-in lexicons.
+
+    Returns:
+        SymptomPreprocessor: The shared preprocessor.
+    """
+    global _default_preprocessor
+    with _default_lock:
+        if _default_preprocessor is None:
+            path = os.environ.get("SYMPTOM_LEXICON_PATH")
+            _default_preprocessor = SymptomPreprocessor(lexicons=load_lexicons(path) if path else None)
+        return _default_preprocessor
@@ -1,21 +1,47 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from app.routes import bp as routes_bp  # Import routes from routes.py
+from app import encoding, metrics
+from app.startup import load_environment, startup
 
-def create_app():
+def create_app(background_tasks=True):
     """
     Create and configure the Flask application.
 
+    Importing this module has no side effects: the environment is loaded from .env, and
+    the routes and their services are imported, when the application is created. Services
+    connect to the database and load the model on first use, or in the background.
+
+    Args:
+        background_tasks (bool, optional): Start loading the model and the advice in the background and
+                                           watching for new versions. The multi-process server turns
+                                           this off and preloads everything before forking. Defaults to True.
+
     Returns:
         Flask: The Flask application instance.
     """
-    app = Flask(__name__)
+    load_environment()
+    with startup.stage("import routes"):
+        from app.routes import bp as routes_bp  # Import routes from routes.py
+
+    with startup.stage("create app"):
+        app = Flask(__name__)
+
+        # Enable Cross-Origin Resource Sharing (CORS)
+        CORS(app)
+
+        # Register blueprints
+        app.register_blueprint(routes_bp)
+
+        # Serialize JSON with orjson when available, and compress responses for clients that accept it
+        encoding.init_app(app)
 
-    # Enable Cross-Origin Resource Sharing (CORS)
-    CORS(app)
+        # Record request latencies and stage timings, and profile slow requests if PROFILE_SLOW_MS is set
+        metrics.init_app(app)
 
-    # Register blueprints
-    app.register_blueprint(routes_bp)
+    # Load the model and the advice in the background and watch for new versions,
+    # and write the surveillance counts periodically
+    if background_tasks:
+        start_background_tasks()
 
     # Placeholder for the diagnosis function using a machine learning model (to be implemented in models.py)
     def diagnose_symptoms(symptoms):
@@ -65,6 +91,56 @@ def create_app():
 
     return app
 
+def create_async_app(background_tasks=True):
+    """
+    Create and configure the async (ASGI) variant of the application, served with e.g.
+    hypercorn "app.main:create_async_app()".
+
+    I/O-bound endpoints run as coroutines on async database and HTTP clients, so
+    requests waiting on Postgres or Google Maps do not each hold a thread.
+
+    Args:
+        background_tasks (bool, optional): Start loading the model and the advice in the background and
+                                           watching for new versions. Defaults to True.
+
+    Returns:
+        quart.Quart: The Quart application instance.
+    """
+    load_environment()
+    with startup.stage("import routes"):
+        from quart import Quart
+        from quart_cors import cors
+        from app.aio import aio_api, aio_db
+        from app.async_routes import bp as async_routes_bp
+
+    with startup.stage("create app"):
+        app = cors(Quart(__name__))
+        app.register_blueprint(async_routes_bp)
+
+    if background_tasks:
+        start_background_tasks()
+
+    @app.after_serving
+    async def close_clients():
+        await aio_db.close()
+        await aio_api.close()
+
+    return app
+
+def start_background_tasks():
+    """
+    Starts loading the model and the advice in the background, watching for new versions
+    of both, and writing the surveillance counts periodically.
+    """
+    from app.routes import registry, surveillance
+    from app.utils import advice_store
+
+    registry.warm_up(background=True)
+    registry.start_watching()
+    advice_store.warm_up(background=True)
+    advice_store.start_watching()
+    surveillance.start_flushing()
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True)  # Run in debug mode during development
@@ -0,0 +1,392 @@
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the response size histogram buckets, in bytes
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+
+def _format_labels(labels):
+    """
+    Formats a label dict in the Prometheus text format, e.g. {stage="score"}.
+    """
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+def _format_value(value):
+    """
+    Formats a sample value in the Prometheus text format.
+    """
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by labels.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Initializes the counter.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (tuple, optional): Names of the labels every sample carries. Defaults to none.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Increments the counter.
+
+        Args:
+            amount (float, optional): The increment. Defaults to 1.
+            **labels: Label values.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Returns the current count of a label combination.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def collect(self):
+        """
+        Returns the metric for exposition.
+
+        Returns:
+            tuple: Name, type, help text and a list of (suffix, labels, value) samples.
+        """
+        with self._lock:
+            samples = [("_total", dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+        return self.name, "counter", self.documentation, samples
+
+class Histogram:
+    """
+    A distribution of observed values in cumulative buckets, optionally split by labels.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Initializes the histogram.
+
+        Args:
+            name (str): Metric name.
+            documentation (str): Help text.
+            labelnames (tuple, optional): Names of the labels every sample carries. Defaults to none.
+            buckets (tuple, optional): Increasing bucket upper bounds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value, e.g. a duration in seconds.
+            **labels: Label values.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        """
+        Returns the number of observations of a label combination.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def collect(self):
+        """
+        Returns the metric for exposition.
+
+        Returns:
+            tuple: Name, type, help text and a list of (suffix, labels, value) samples.
+        """
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(("_bucket", dict(labels, le=_format_value(bound)), cumulative))
+                samples.append(("_sum", labels, total))
+                samples.append(("_count", labels, count))
+        return self.name, "histogram", self.documentation, samples
+
+class Metrics:
+    """
+    Process-wide metrics: per-stage latency histograms, request latencies, status counts
+    and response sizes, plus gauges gathered from registered collectors when the metrics are rendered.
+
+    Each worker process keeps its own metrics.
+    """
+
+    def __init__(self):
+        """
+        Initializes the built-in metrics.
+        """
+        self.stage_seconds = Histogram("aicheckup_stage_seconds",
+                                       "Time spent in each stage of request handling, in seconds.", ("stage",))
+        self.stage_errors = Counter("aicheckup_stage_errors",
+                                    "Number of stage executions that raised an exception.", ("stage",))
+        self.request_seconds = Histogram("aicheckup_request_seconds",
+                                         "Request handling time per endpoint, in seconds.", ("endpoint",))
+        self.requests = Counter("aicheckup_requests", "Number of handled requests.", ("endpoint", "status"))
+        self.response_bytes = Histogram("aicheckup_response_bytes",
+                                        "Response body size per endpoint and content encoding, in bytes.",
+                                        ("endpoint", "encoding"), buckets=SIZE_BUCKETS)
+        self._metrics = [self.stage_seconds, self.stage_errors, self.request_seconds, self.requests,
+                         self.response_bytes]
+        self._collectors = []
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Times a with-block as one execution of a stage, counting it as an error if it raises.
+
+        Args:
+            stage (str): Stage name, e.g. "score" or "geocode".
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.stage_errors.inc(stage=stage)
+            raise
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+    def add_collector(self, collector):
+        """
+        Registers a function called on every render to report current values.
+
+        Args:
+            collector (callable): Function returning a list of (name, type, help, samples) tuples,
+                                  where samples is a list of (labels, value) pairs. Counter families
+                                  are named without the "_total" suffix, which their samples get.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics document.
+        """
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                for name, kind, documentation, samples in collector():
+                    suffix = "_total" if kind == "counter" else ""
+                    families.append((name, kind, documentation, [(suffix, labels, value) for labels, value in samples]))
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# Metrics of this process
+metrics = Metrics()
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for slow requests.
+
+    While a request is being handled, one background thread samples the stack of the
+    handling thread every interval. When the request turns out to be slow, the samples
+    are written in the folded-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, threshold, interval=0.005, output_dir="data/profiles"):
+        """
+        Initializes the profiler without starting the sampling thread.
+
+        Args:
+            threshold (float): Requests taking at least this long are dumped, in seconds.
+            interval (float, optional): Time between samples, in seconds. Defaults to 0.005.
+            output_dir (str, optional): Directory the folded stacks are written to. Defaults to data/profiles.
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.output_dir = output_dir
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts sampling the calling thread.
+        """
+        with self._lock:
+            self._active[threading.get_ident()] = _Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+
+    def stop(self):
+        """
+        Stops sampling the calling thread.
+
+        Returns:
+            collections.Counter: Number of samples per folded stack.
+        """
+        with self._lock:
+            return self._active.pop(threading.get_ident(), _Counter())
+
+    def dump(self, samples, name):
+        """
+        Writes samples as folded stacks, one "frame;frame;... count" line per distinct stack.
+
+        Args:
+            samples (collections.Counter): Samples returned by stop().
+            name (str): Name of the profiled request, used in the file name.
+
+        Returns:
+            str: Path of the written file, or None if there were no samples.
+        """
+        if not samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{os.getpid()}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self):
+        """
+        Sampler loop: sleeps while no request is being profiled.
+        """
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                threads = list(self._active)
+            frames = sys._current_frames()
+            stacks = {ident: _fold(frames[ident]) for ident in threads if ident in frames}
+            with self._lock:
+                for ident, stack in stacks.items():
+                    samples = self._active.get(ident)
+                    if samples is not None:
+                        samples[stack] += 1
+            time.sleep(self.interval)
+
+def _fold(frame):
+    """
+    Returns the folded representation of a stack, outermost frame first.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def init_app(app, profiler=None):
+    """
+    Records request latencies and status codes of a Flask application, times its JSON
+    serialization and, optionally, profiles slow requests.
+
+    Args:
+        app (Flask): The application.
+        profiler (SamplingProfiler, optional): Profiler dumping slow requests. Defaults to one configured
+                                               by the PROFILE_SLOW_MS, PROFILE_INTERVAL_MS and PROFILE_DIR
+                                               environment variables, or none if PROFILE_SLOW_MS is unset.
+    """
+    from flask import g, request
+
+    if profiler is None and os.environ.get("PROFILE_SLOW_MS"):
+        profiler = SamplingProfiler(float(os.environ["PROFILE_SLOW_MS"]) / 1000.0,
+                                    interval=float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000.0,
+                                    output_dir=os.environ.get("PROFILE_DIR", "data/profiles"))
+
+    # Time whichever JSON provider the application uses
+    class TimedJSONProvider(type(app.json)):
+        def dumps(self, obj, **kwargs):
+            with metrics.timer("serialize"):
+                return super().dumps(obj, **kwargs)
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        if profiler is not None:
+            profiler.start()
+
+    @app.after_request
+    def record_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop("request_start", None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        status = g.pop("response_status", 500)
+        metrics.request_seconds.observe(duration, endpoint=endpoint)
+        metrics.requests.inc(endpoint=endpoint, status=status)
+        if profiler is not None:
+            samples = profiler.stop()
+            if duration >= profiler.threshold:
+                try:
+                    path = profiler.dump(samples, endpoint)
+                    if path:
+                        print(f"Slow request to {endpoint} took {duration * 1000:.0f} ms, profile written to {path}")
+                except OSError as e:
+                    print(f"Error writing profile: {e}")
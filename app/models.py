@@ -1,39 +1,79 @@
-import joblib  # For saving and loading the model
-from sklearn.linear_model import LogisticRegression  # Example model
-from sklearn.feature_extraction.text import TfidfVectorizer  # Example feature extraction
-from sklearn.pipeline import Pipeline  # Example pipeline
+import os
+from app.compact import CompactScorer, export_pipeline, is_compact_model
+from app.language import get_preprocessor
+from app.metrics import metrics
+
+# scikit-learn and joblib are imported on first use: serving a compact model needs neither
 
 class DiagnosisModel:
     """
     A class representing the machine learning model for diagnosis prediction.
     """
 
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, preprocess=True):
         """
         Initializes the DiagnosisModel.
 
         Args:
             model_path (str, optional): Path to a pre-trained model file. 
                                          If None, a new model will be trained. Defaults to None.
+            preprocess (bool, optional): Translate symptoms in any supported language to canonical
+                                         English terms before vectorization, see app.language. Defaults to True.
+                                         Ignored when loading a model: it is served with the setting it
+                                         was saved with, so serving inputs match training inputs.
         """
         self.model_path = model_path
+        self.preprocessor = get_preprocessor() if preprocess else None
         if model_path:
             self.model = self.load_model(model_path)
         else:
             self.model = self.create_model()
 
-    def create_model(self):
+    def create_model(self, **params):
         """
         Creates and returns a new diagnosis prediction model.
 
+        Args:
+            **params: Pipeline parameters to override, e.g. tfidf__ngram_range=(1, 2) or clf__C=10.
+
         Returns:
             Pipeline: A machine learning pipeline for diagnosis prediction.
         """
+        from sklearn.feature_extraction.text import TfidfVectorizer  # Example feature extraction
+        from sklearn.linear_model import LogisticRegression  # Example model
+        from sklearn.pipeline import Pipeline  # Example pipeline
+
         # Example pipeline: TF-IDF for text vectorization and Logistic Regression for classification
         model = Pipeline([
             ('tfidf', TfidfVectorizer()),  # Convert text symptoms to numerical vectors
             ('clf', LogisticRegression())  # Train a logistic regression classifier
         ])
+        if params:
+            model.set_params(**params)
+        return model
+
+    def create_streaming_model(self, n_features=2 ** 20, ngram_range=(1, 2)):
+        """
+        Creates and returns a new diagnosis prediction model that can be trained incrementally.
+
+        The hashing vectorizer has no vocabulary, so memory use is fixed by n_features
+        no matter how many distinct terms the corpus contains.
+
+        Args:
+            n_features (int, optional): Number of hashed feature columns. Defaults to 2 ** 20.
+            ngram_range (tuple, optional): Range of word n-grams to hash. Defaults to (1, 2).
+
+        Returns:
+            Pipeline: A hashing vectorizer and logistic-loss SGD classifier pipeline.
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.pipeline import Pipeline
+
+        model = Pipeline([
+            ('hashing', HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False)),
+            ('clf', SGDClassifier(loss='log_loss', alpha=1e-5))  # Logistic regression trained with partial_fit
+        ])
         return model
 
     def train(self, X_train, y_train):
@@ -44,7 +84,58 @@ class DiagnosisModel:
             X_train (list): List of training data (e.g., symptoms as text).
             y_train (list): List of corresponding labels (e.g., diagnoses).
         """
-        self.model.fit(X_train, y_train)
+        self.model.fit(self.preprocess(X_train), y_train)
+
+    def train_streaming(self, chunks, classes, n_features=2 ** 20, ngram_range=(1, 2)):
+        """
+        Trains a new streaming model from chunks of training data, one chunk in memory at a time.
+
+        Args:
+            chunks (iterable): Iterable of (X_chunk, y_chunk) pairs of lists.
+            classes (list): Every diagnosis label that occurs in the data.
+            n_features (int, optional): Number of hashed feature columns. Defaults to 2 ** 20.
+            ngram_range (tuple, optional): Range of word n-grams to hash. Defaults to (1, 2).
+
+        Returns:
+            int: The number of training examples seen.
+        """
+        self.model = self.create_streaming_model(n_features=n_features, ngram_range=ngram_range)
+        count = 0
+        for X_chunk, y_chunk in chunks:
+            self.partial_train(X_chunk, y_chunk, classes=classes)
+            count += len(X_chunk)
+        return count
+
+    def partial_train(self, X_train, y_train, classes=None):
+        """
+        Updates a streaming model with new training data without refitting from scratch.
+
+        Args:
+            X_train (list): List of training data (e.g., symptoms as text).
+            y_train (list): List of corresponding labels (e.g., diagnoses).
+            classes (list, optional): Every diagnosis label the model should know.
+                                      Required for the first update of a new model.
+
+        Raises:
+            ValueError: If the model cannot be trained incrementally, or y_train contains a label
+                        the model was not created with.
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        # Compact models have no pipeline steps
+        steps = getattr(self.model, "steps", None)
+        if steps is None or not isinstance(steps[0][1], HashingVectorizer) or not hasattr(steps[-1][1], 'partial_fit'):
+            raise ValueError("Only streaming models (see create_streaming_model) can be trained incrementally")
+        vectorizer, clf = steps[0][1], steps[-1][1]
+        if hasattr(clf, 'classes_'):
+            unknown = set(y_train) - set(clf.classes_)
+            if unknown:
+                raise ValueError(f"Unknown diagnoses {sorted(unknown)}; retrain the model with all classes")
+            classes = None
+        elif classes is None:
+            raise ValueError("classes must be given for the first update of a new model")
+        if len(X_train):
+            clf.partial_fit(vectorizer.transform(self.preprocess(X_train)), y_train, classes=classes)
 
     def predict(self, symptoms):
         """
@@ -57,7 +148,7 @@ class DiagnosisModel:
             str: Predicted diagnosis.
         """
         # Assuming the model expects a list of strings as input
-        return self.model.predict([symptoms])[0]
+        return self.model.predict(self.preprocess([symptoms]))[0]
 
     def predict_proba(self, symptoms):
         """
@@ -70,30 +161,175 @@ class DiagnosisModel:
             dict: A dictionary where keys are diagnoses and values are their probabilities.
         """
         # Assuming the model returns probabilities for each class
-        probabilities = self.model.predict_proba([symptoms])[0]
+        probabilities = self.model.predict_proba(self.preprocess([symptoms]))[0]
         classes = self.model.classes_  # Get the class labels from the model
         return dict(zip(classes, probabilities))
 
+    def predict_with_proba(self, symptoms, top_k=None):
+        """
+        Predicts the diagnosis and the probabilities of each possible diagnosis
+        in a single pass through the pipeline.
+
+        Calling predict() and then predict_proba() vectorizes and scores the input
+        twice; this method does both from one predict_proba() call.
+
+        Args:
+            symptoms (str): Input symptoms.
+            top_k (int, optional): If given, only the k most probable diagnoses are
+                                   included in the probabilities. Defaults to None (all classes).
+
+        Returns:
+            tuple: The predicted diagnosis (str) and a dictionary where keys are diagnoses
+                   and values are their probabilities, ordered from most to least probable.
+        """
+        return self.rank_probabilities(self.score_batch([symptoms])[0], top_k=top_k)
+
+    def predict_batch(self, symptoms_list, top_k=None):
+        """
+        Predicts the diagnosis and probabilities for several inputs at once.
+
+        All inputs are vectorized into one sparse matrix and scored together,
+        which is much cheaper than calling predict_with_proba() once per input.
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+            top_k (int, optional): If given, only the k most probable diagnoses are
+                                   included in each result. Defaults to None (all classes).
+
+        Returns:
+            list: A (diagnosis, probabilities) tuple per input, in input order.
+        """
+        return [self.rank_probabilities(row, top_k=top_k) for row in self.score_batch(symptoms_list)]
+
+    def score_batch(self, symptoms_list):
+        """
+        Computes the class probabilities for several inputs in one vectorized call.
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+
+        Returns:
+            numpy.ndarray: Array of shape (len(symptoms_list), n_classes) whose columns
+                           follow the order of the model's classes_.
+        """
+        symptoms_list = self.preprocess(symptoms_list)
+        if not isinstance(self.model, CompactScorer):
+            # Time feature extraction and classification separately
+            with metrics.timer("vectorize"):
+                features = self.model[:-1].transform(symptoms_list)
+            with metrics.timer("score"):
+                return self.model[-1].predict_proba(features)
+        with metrics.timer("score"):
+            return self.model.predict_proba(symptoms_list)
+
+    def preprocess(self, symptoms_list):
+        """
+        Normalizes symptom descriptions into the canonical English terms the model is trained on.
+
+        Args:
+            symptoms_list (list): List of input symptoms.
+
+        Returns:
+            list: The preprocessed symptoms, or the input as a list if preprocessing is disabled.
+        """
+        symptoms_list = list(symptoms_list)
+        if self.preprocessor is None:
+            return symptoms_list
+        with metrics.timer("preprocess"):
+            return self.preprocessor.transform(symptoms_list)
+
+    @property
+    def order_sensitive(self):
+        """
+        bool: Whether the order of words in a (preprocessed) text can change its prediction,
+              i.e. the model uses word n-grams longer than one word or character n-grams.
+        """
+        if isinstance(self.model, CompactScorer):
+            analyzer, ngram_range = self.model.params["analyzer"], self.model.params["ngram_range"]
+        else:
+            vectorizer = self.model.steps[0][1]
+            analyzer, ngram_range = getattr(vectorizer, "analyzer", None), getattr(vectorizer, "ngram_range", None)
+        return analyzer != "word" or ngram_range is None or ngram_range[1] > 1
+
+    def rank_probabilities(self, probabilities, top_k=None):
+        """
+        Turns one row of class probabilities into a diagnosis and a probability map.
+
+        Args:
+            probabilities (numpy.ndarray): Probabilities for each class, as returned by score_batch().
+            top_k (int, optional): If given, only the k most probable diagnoses are
+                                   included in the probabilities. Defaults to None (all classes).
+
+        Returns:
+            tuple: The predicted diagnosis (str) and a dictionary where keys are diagnoses
+                   and values are their probabilities, ordered from most to least probable.
+        """
+        classes = self.model.classes_
+        order = (-probabilities).argsort(kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        diagnosis = classes[probabilities.argmax()]
+        return diagnosis, {classes[i]: probabilities[i] for i in order}
+
     def save_model(self, model_path):
         """
-        Saves the trained model to a file.
+        Saves the trained model to a file, together with its preprocessing setting.
+
+        The file is written to a temporary name and renamed into place, so the model
+        registry never loads a partially written model.
 
         Args:
             model_path (str): Path to save the model.
         """
-        joblib.dump(self.model, model_path)
+        import joblib  # For saving and loading the model
+        # Keep the extension, from which joblib infers the compression
+        root, ext = os.path.splitext(model_path)
+        tmp_path = f"{root}.tmp{ext}"
+        joblib.dump({"pipeline": self.model, "preprocess": self.preprocessor is not None}, tmp_path)
+        os.replace(tmp_path, model_path)
+
+    def export_compact(self, model_path, dtype="float64", prune=0.0):
+        """
+        Exports the trained model as a compact, memory-mappable model directory.
+
+        The directory loads much faster than a joblib file and its arrays are shared
+        between worker processes. Pass it as model_path to load it with CompactScorer.
+
+        Args:
+            model_path (str): Directory to export the model to.
+            dtype (str, optional): Coefficient storage: "float64", "float32" or "int8". Defaults to "float64".
+            prune (float, optional): Drop coefficients with a smaller magnitude and store the rest
+                                     sparsely. Defaults to 0.0 (keep all).
+
+        Returns:
+            dict: Coefficient statistics, see app.compact.export_pipeline().
+        """
+        return export_pipeline(self.model, model_path, dtype=dtype, prune=prune,
+                               preprocess=self.preprocessor is not None)
 
     def load_model(self, model_path):
         """
-        Loads a pre-trained model from a file.
+        Loads a pre-trained model from a file, or from a compact model directory, and turns
+        preprocessing on or off as the model was saved. Models saved without the setting
+        were trained on raw text, so they are served without preprocessing.
 
         Args:
-            model_path (str): Path to the pre-trained model file.
+            model_path (str): Path to the pre-trained model file or compact model directory.
 
         Returns:
-            Pipeline: The loaded model.
+            Pipeline or CompactScorer: The loaded model.
         """
-        return joblib.load(model_path)
+        if is_compact_model(model_path):
+            model = CompactScorer(model_path)
+            preprocess = model.preprocess
+        else:
+            import joblib
+            model = joblib.load(model_path)
+            preprocess = False
+            if isinstance(model, dict):
+                model, preprocess = model["pipeline"], model.get("preprocess", False)
+        self.preprocessor = get_preprocessor() if preprocess else None
+        return model
 
 # Example usage (you can add this to a separate script or within a conditional block)
 # if __name__ == "__main__":
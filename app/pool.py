@@ -0,0 +1,255 @@
+import threading
+import time
+from contextlib import closing, contextmanager
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection becomes available within the pool timeout.
+    """
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of DB-API connections.
+
+    Connections are opened lazily, up to max_connections. Each caller checks a
+    connection out for the duration of one unit of work; connections that have
+    been idle for longer than health_check_interval are pinged before reuse and
+    transparently replaced if they are dead.
+    """
+
+    def __init__(self, connect, max_connections=10, timeout=30.0, health_check_interval=30.0):
+        """
+        Initializes the pool without opening any connection.
+
+        Args:
+            connect (callable): Function returning a new DB-API connection.
+            max_connections (int, optional): Maximum number of open connections. Defaults to 10.
+            timeout (float, optional): Maximum time to wait for a free connection, in seconds. Defaults to 30.
+            health_check_interval (float, optional): Idle time after which a connection is pinged
+                                                     before reuse, in seconds. Defaults to 30.
+        """
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self._connect = connect
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._open = 0
+        self._waiting = 0
+        self._closed = False
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks a connection out of the pool for the duration of a with-block.
+
+        The transaction is committed when the block succeeds and rolled back when it
+        raises. A connection that cannot be rolled back is considered broken and discarded.
+
+        Yields:
+            The checked-out DB-API connection.
+
+        Raises:
+            PoolTimeout: If no connection became available within the timeout.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._release(conn, self._rollback(conn))
+            raise
+        else:
+            try:
+                conn.commit()
+            except Exception:
+                self._release(conn, self._rollback(conn))
+                raise
+            self._release(conn, True)
+
+    @contextmanager
+    def cursor(self):
+        """
+        Checks a connection out and yields a cursor on it, closing the cursor afterwards.
+
+        Yields:
+            A DB-API cursor.
+        """
+        with self.connection() as conn:
+            with closing(conn.cursor()) as cur:
+                yield cur
+
+    def stats(self):
+        """
+        Returns pool size and wait-time statistics.
+
+        Returns:
+            dict: Connection counts, checkouts, waits and wait times in seconds, timeouts and reconnects.
+        """
+        with self._cond:
+            return {
+                "max_connections": self.max_connections,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+                "timeouts": self._timeouts,
+                "reconnects": self._reconnects,
+            }
+
+    def dispose(self):
+        """
+        Closes all idle connections but keeps the pool usable; new connections are opened on demand.
+
+        Call this before forking worker processes, so that children never share a
+        connection socket with the parent.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def close(self):
+        """
+        Closes all idle connections. Connections in use are closed when they are returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _acquire(self):
+        """
+        Takes a healthy idle connection, opens a new one, or waits for one to be returned.
+
+        Returns:
+            A DB-API connection.
+        """
+        start = time.monotonic()
+        deadline = None if self.timeout is None else start + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle or self._open < self.max_connections:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout} seconds")
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._checkouts += 1
+            if waited:
+                wait_time = time.monotonic() - start
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._open += 1
+
+        if conn is not None:
+            if self._is_alive(conn, last_used):
+                return conn
+            self._close_quietly(conn)
+            with self._cond:
+                self._reconnects += 1
+        try:
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn, healthy):
+        """
+        Returns a connection to the pool, or discards it if it is broken or the pool is closed.
+
+        Args:
+            conn: The DB-API connection.
+            healthy (bool): Whether the connection can be reused.
+        """
+        with self._cond:
+            if healthy and not self._closed and not getattr(conn, "closed", False):
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def _is_alive(self, conn, last_used):
+        """
+        Checks whether an idle connection can still be used.
+
+        Args:
+            conn: The DB-API connection.
+            last_used (float): Monotonic time at which the connection was returned.
+
+        Returns:
+            bool: True if the connection is usable.
+        """
+        if getattr(conn, "closed", False):
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with closing(conn.cursor()) as cur:
+                cur.execute("SELECT 1")
+                cur.fetchall()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _rollback(conn):
+        """
+        Rolls back the current transaction.
+
+        Returns:
+            bool: True if the rollback succeeded and the connection can be reused.
+        """
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        """
+        Closes a connection, ignoring errors from already broken connections.
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,256 @@
+import json
+import queue
+import secrets
+import threading
+import time
+from app.metrics import metrics
+
+# Consultation history. Rows are only ever inserted. The primary key orders each user's
+# records by time, so a page of history is one range scan of the key's index.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS health_records (
+    user_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    recorded_at DOUBLE PRECISION NOT NULL,
+    symptoms TEXT NOT NULL,
+    diagnosis TEXT,
+    probabilities TEXT,
+    advice TEXT,
+    model_version TEXT,
+    PRIMARY KEY (user_id, record_id)
+)
+"""
+
+COLUMNS = ("user_id", "record_id", "recorded_at", "symptoms", "diagnosis", "probabilities", "advice", "model_version")
+
+def new_record_id(micros):
+    """
+    Returns a record id that sorts in time order.
+
+    The id is the time in microseconds as fixed-width hex followed by a random suffix,
+    so records written in the same microsecond by different workers do not collide.
+
+    Args:
+        micros (int): Unix time of the record in microseconds.
+
+    Returns:
+        str: The record id.
+    """
+    return f"{micros:014x}{secrets.token_hex(4)}"
+
+class HealthRecordStore:
+    """
+    Append-only store of consultation results, keyed by user.
+
+    record() only queues the record, so it never waits on the database. A background
+    writer inserts queued records in batches of up to batch_size rows, one transaction
+    per batch, at least every flush_interval seconds. If the queue is full, new records
+    are dropped and counted rather than slowing down requests.
+
+    Records still queued are not yet visible in history().
+    """
+
+    def __init__(self, db, batch_size=100, flush_interval=1.0, max_queue=10000):
+        """
+        Initializes the store. The table is created on first use if it does not exist.
+
+        Args:
+            db (Database): Database whose connection pool the records are written with.
+            batch_size (int, optional): Maximum number of records inserted together. Defaults to 100.
+            flush_interval (float, optional): Maximum time a record waits for its batch, in seconds. Defaults to 1.
+            max_queue (int, optional): Maximum number of queued records. Defaults to 10000.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._last_micros = 0
+        self._worker = None
+        self._closed = False
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+
+    def record(self, user_id, symptoms, diagnosis, probabilities, advice, model_version=None, timestamp=None):
+        """
+        Queues a consultation result for writing without waiting for the database.
+
+        Args:
+            user_id (str): The user the consultation belongs to.
+            symptoms (str): The symptoms as entered.
+            diagnosis (str): The diagnosis.
+            probabilities (dict): Probabilities of the diagnoses.
+            advice (dict): The health advice given.
+            model_version (str, optional): Version of the model that made the diagnosis. Defaults to None.
+            timestamp (float, optional): Unix time of the consultation. Defaults to now.
+
+        Returns:
+            str: The record id, or None if the record was dropped.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        probabilities, advice = json.dumps(probabilities), json.dumps(advice)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HealthRecordStore is closed")
+            # Ids of this process are strictly increasing, so records keep their order
+            # even when several are made in the same microsecond
+            self._last_micros = max(int(timestamp * 1_000_000), self._last_micros + 1)
+            record_id = new_record_id(self._last_micros)
+            row = (str(user_id), record_id, timestamp, symptoms, diagnosis, probabilities, advice, model_version)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="health-record-writer", daemon=True)
+                self._worker.start()
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self._dropped += 1
+                return None
+        return record_id
+
+    def history(self, user_id, limit=20, before=None):
+        """
+        Returns a page of a user's records, newest first.
+
+        Args:
+            user_id (str): The user.
+            limit (int, optional): Maximum number of records. Defaults to 20.
+            before (str, optional): Only return records older than this record id, i.e. the
+                                    cursor returned with the previous page. Defaults to None.
+
+        Returns:
+            tuple: The list of records, and the cursor of the next page or None if there are no more.
+        """
+        self.ensure_schema()
+        query = f"SELECT {', '.join(COLUMNS)} FROM health_records WHERE user_id = %s"
+        params = [str(user_id)]
+        if before is not None:
+            query += " AND record_id < %s"
+            params.append(before)
+        # Fetch one extra row to know whether there is a next page
+        query += " ORDER BY record_id DESC LIMIT %s"
+        params.append(limit + 1)
+        with metrics.timer("records_db"):
+            rows = self.db.fetchall(query, tuple(params))
+
+        records = [self._record(row) for row in rows[:limit]]
+        cursor = records[-1]["record_id"] if len(rows) > limit else None
+        return records, cursor
+
+    def ensure_schema(self):
+        """
+        Creates the health_records table if it does not exist.
+        """
+        if self._schema_ready:
+            return
+        self.db.execute(SCHEMA)
+        self._schema_ready = True
+
+    def flush(self):
+        """
+        Waits until every queued record has been written or has failed.
+        """
+        self._queue.join()
+
+    def stats(self):
+        """
+        Returns write statistics.
+
+        Returns:
+            dict: Number of queued, written, dropped and failed records, and of batches written.
+        """
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+            }
+
+    def close(self, timeout=None):
+        """
+        Stops accepting records and waits for queued records to be written.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for the writer, in seconds. Defaults to None.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    @staticmethod
+    def _record(row):
+        record = dict(zip(COLUMNS, row))
+        record["probabilities"] = json.loads(record["probabilities"]) if record["probabilities"] else None
+        record["advice"] = json.loads(record["advice"]) if record["advice"] else None
+        return record
+
+    def _collect(self):
+        """
+        Blocks for the first record, then gathers more until the batch is full or the flush interval expires.
+
+        Returns:
+            tuple: The list of gathered rows and whether the close sentinel was seen.
+        """
+        first = self._queue.get()
+        if first is None:
+            self._queue.task_done()
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is None:
+                self._queue.task_done()
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _run(self):
+        """
+        Writer loop: collects and inserts batches until closed.
+        """
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            if batch:
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        """
+        Inserts one batch of rows in a single transaction.
+
+        Args:
+            batch (list): Rows in COLUMNS order.
+        """
+        placeholders = ", ".join(["%s"] * len(COLUMNS))
+        query = f"INSERT INTO health_records ({', '.join(COLUMNS)}) VALUES ({placeholders})"
+        try:
+            self.ensure_schema()
+            with metrics.timer("records_db"):
+                self.db.executemany(query, batch)
+        except Exception as e:
+            print(f"Error writing health records: {e}")
+            with self._lock:
+                self._failed += len(batch)
+            return
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import threading
+import time
+from app.models import DiagnosisModel
+
+class ModelRegistry:
+    """
+    Holds the current DiagnosisModel and replaces it when a new version appears on disk.
+
+    The model is loaded lazily on first use or by a background warm-up thread.
+    A watcher thread polls the model file; a changed file is loaded, validated with
+    a smoke prediction and swapped in with a single reference assignment, so
+    requests already holding the previous model finish with it undisturbed.
+    """
+
+    def __init__(self, model_path, loader=DiagnosisModel, poll_interval=30.0, retry_interval=10.0,
+                 smoke_symptoms="headache fever"):
+        """
+        Initializes the registry without loading the model.
+
+        Args:
+            model_path (str): Path to the model file or compact model directory.
+            loader (callable, optional): Function creating a model from a path. Defaults to
+                                         DiagnosisModel(model_path=...).
+            poll_interval (float, optional): How often the watcher checks the file, in seconds. Defaults to 30.
+            retry_interval (float, optional): Minimum time between attempts to load a model that failed
+                                              to load, in seconds. Defaults to 10.
+            smoke_symptoms (str, optional): Input used to validate a model before it is served.
+        """
+        self.model_path = model_path
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.smoke_symptoms = smoke_symptoms
+        self._model = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._signature = None
+        self._version = None
+        self._loaded_at = None
+        self._load_seconds = None
+        self._last_error = None
+        self._last_attempt = None
+        self._swaps = 0
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def add_listener(self, callback):
+        """
+        Registers a function called with every newly loaded model.
+
+        Args:
+            callback (callable): Function taking the new DiagnosisModel.
+        """
+        self._listeners.append(callback)
+
+    def get(self):
+        """
+        Returns the current model, loading it first if necessary.
+
+        Returns:
+            DiagnosisModel: The current model, or None if no model could be loaded.
+        """
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None and (self._last_attempt is None
+                                        or time.monotonic() - self._last_attempt >= self.retry_interval):
+                self._load()
+            return self._model
+
+    def warm_up(self, background=True):
+        """
+        Loads the model ahead of the first request.
+
+        Args:
+            background (bool, optional): Load in a daemon thread instead of blocking. Defaults to True.
+
+        Returns:
+            threading.Thread: The warm-up thread, or None if the model was loaded in the foreground.
+        """
+        if not background:
+            self.get()
+            return None
+        thread = threading.Thread(target=self.get, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def check_for_update(self):
+        """
+        Loads and swaps in the model file if it changed since the last load attempt.
+
+        Returns:
+            bool: True if a new model was swapped in.
+        """
+        with self._lock:
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                return False
+            return self._load()
+
+    def start_watching(self):
+        """
+        Starts the watcher thread, unless it is already running or poll_interval is not positive.
+        """
+        with self._lock:
+            if self.poll_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        """
+        Stops the watcher thread.
+        """
+        self._stop.set()
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.join(self.poll_interval + 1)
+
+    def info(self):
+        """
+        Returns details about the served model.
+
+        Returns:
+            dict: Model path, whether a model is loaded, its version (SHA-256 prefix of the file),
+                  load time, load duration in seconds, number of swaps and the last load error.
+        """
+        return {
+            "path": self.model_path,
+            "loaded": self._model is not None,
+            "version": self._version,
+            "loaded_at": self._loaded_at,
+            "load_seconds": self._load_seconds,
+            "swaps": self._swaps,
+            "last_error": self._last_error,
+        }
+
+    @property
+    def version(self):
+        """
+        str: Version of the served model, or None if no model is loaded.
+        """
+        return self._version
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                print(f"Error checking for a new model: {e}")
+
+    def _model_files(self):
+        """
+        Returns the files making up the model: the model file, or every file of a model directory.
+        """
+        if os.path.isdir(self.model_path):
+            return sorted(os.path.join(self.model_path, name) for name in os.listdir(self.model_path)
+                          if os.path.isfile(os.path.join(self.model_path, name)))
+        return [self.model_path]
+
+    def _file_signature(self):
+        try:
+            stats = [os.stat(file) for file in self._model_files()]
+        except OSError:
+            return None
+        return tuple((stat.st_mtime_ns, stat.st_size) for stat in stats)
+
+    def _file_version(self):
+        digest = hashlib.sha256()
+        for file in self._model_files():
+            with open(file, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+
+    def _load(self):
+        """
+        Loads, validates and swaps in the model file. Requires the lock.
+
+        Returns:
+            bool: True if a new model was swapped in.
+        """
+        self._last_attempt = time.monotonic()
+        signature = self._file_signature()
+        start = time.perf_counter()
+        try:
+            version = self._file_version()
+            if version == self._version and self._model is not None:
+                self._signature = signature
+                return False
+            model = self.loader(model_path=self.model_path)
+            diagnosis, _ = model.predict_with_proba(self.smoke_symptoms)
+            if diagnosis not in model.model.classes_:
+                raise ValueError(f"Smoke prediction returned unknown diagnosis {diagnosis!r}")
+        except Exception as e:
+            # Remember the failed file so the watcher does not reload it until it changes again
+            self._signature = signature
+            self._last_error = f"{type(e).__name__}: {e}"
+            print(f"Error loading model: {e}")
+            return False
+
+        load_seconds = time.perf_counter() - start
+        for callback in self._listeners:
+            try:
+                callback(model)
+            except Exception as e:
+                print(f"Error in model listener: {e}")
+
+        if self._model is not None:
+            self._swaps += 1
+        self._model = model
+        self._signature = signature
+        self._version = version
+        self._loaded_at = time.time()
+        self._load_seconds = load_seconds
+        self._last_error = None
+        return True
@@ -1,16 +1,281 @@
-from flask import Blueprint, request, jsonify
-from app.models import DiagnosisModel
-from app.utils import get_health_advice, find_nearby_hospitals
+import hmac
+import os
+from flask import Blueprint, Response, request, jsonify
+from app.batching import InferenceBatcher
+from app.breaker import CircuitBreaker
+from app.cache import TTLCache
+from app.encoding import DEFAULT_ASSET_DIR, AssetCache, filter_probabilities
+from app.metrics import metrics
+from app.records import HealthRecordStore
+from app.registry import ModelRegistry
+from app.surveillance import DEFAULT_SUMMARY_PATH, HOSPITAL_SEARCH, DiagnosisAggregator
+from app.utils import (api, db, get_health_advice, get_health_advice_many, find_nearby_hospitals,
+                       advice_cache, advice_store, invalidate_health_advice, normalize_symptoms,
+                       parse_location, warm_health_advice_cache)
 
 # Create a Blueprint for the routes
 bp = Blueprint('routes', __name__)
 
-# Load the trained model (replace 'diagnosis_model.joblib' with your actual model path if different)
-try:
-    model = DiagnosisModel(model_path="diagnosis_model.joblib")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
+# Advice returned when the database has none for a diagnosis
+DEFAULT_ADVICE = {"advice": "Please consult a doctor for further advice.", "source": "AI Checkup"}
+
+# The trained model is loaded lazily and hot-swapped when a new version is written to MODEL_PATH
+registry = ModelRegistry(
+    os.environ.get("MODEL_PATH", "diagnosis_model.joblib"),
+    poll_interval=float(os.environ.get("MODEL_POLL_INTERVAL", 30))
+)
+
+# Optionally preload advice for every diagnosis a newly loaded model can return
+if os.environ.get("ADVICE_CACHE_WARM", "").lower() in ("1", "true", "yes"):
+    registry.add_listener(lambda model: warm_health_advice_cache(model.model.classes_))
+
+# Model results for recently seen symptom texts, keyed on the normalized text and the
+# model version. Entries of a replaced model can never hit again, so they are dropped
+# as soon as a new model is loaded.
+diagnosis_cache = TTLCache(
+    max_size=int(os.environ.get("DIAGNOSIS_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("DIAGNOSIS_CACHE_TTL", 86400))
+)
+registry.add_listener(lambda model: diagnosis_cache.invalidate())
+
+# Batch concurrent /diagnose requests into one vectorized scoring call
+batcher = InferenceBatcher(
+    registry.get,
+    max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", 32)),
+    max_wait_ms=float(os.environ.get("BATCH_MAX_WAIT_MS", 5))
+)
+
+# Consultation results of identified users are appended to their health record by a background writer
+health_records = HealthRecordStore(
+    db,
+    batch_size=int(os.environ.get("RECORDS_BATCH_SIZE", 100)),
+    flush_interval=float(os.environ.get("RECORDS_FLUSH_INTERVAL", 1)),
+    max_queue=int(os.environ.get("RECORDS_QUEUE_SIZE", 10000))
+)
+
+# Live counts of diagnoses and hospital searches by geohash cell over a sliding window,
+# written to SURVEILLANCE_PATH every SURVEILLANCE_FLUSH_INTERVAL seconds
+surveillance = DiagnosisAggregator(
+    bucket_seconds=float(os.environ.get("SURVEILLANCE_BUCKET_SECONDS", 60)),
+    num_buckets=int(os.environ.get("SURVEILLANCE_BUCKETS", 60)),
+    precision=int(os.environ.get("SURVEILLANCE_PRECISION", 5)),
+    path=os.environ.get("SURVEILLANCE_PATH", DEFAULT_SUMMARY_PATH),
+    flush_interval=float(os.environ.get("SURVEILLANCE_FLUSH_INTERVAL", 60))
+)
+
+# Largest page of health records returned by the history endpoint
+MAX_HISTORY_LIMIT = 100
+
+# Probabilities below this are left out of diagnosis responses, unless a request sets
+# 'min_probability'. Low-bandwidth clients can ask for less with 'top_k' as well
+MIN_PROBABILITY = float(os.environ.get("MIN_PROBABILITY", 0))
+
+# The web client and its static assets, served precompressed from memory
+assets = AssetCache(os.environ.get("ASSET_DIR", DEFAULT_ASSET_DIR))
+
+def _service_metrics():
+    """
+    Reports cache hit rates, database pool usage, batching and the served model to the metrics endpoint.
+
+    Returns:
+        list: (name, type, help, samples) tuples, see Metrics.add_collector().
+    """
+    caches = {"advice": advice_cache.stats(), "diagnosis": diagnosis_cache.stats()}
+    api_stats = api.stats()
+    caches["geocode"], caches["places"] = api_stats["geocode_cache"], api_stats["places_cache"]
+    pool = db.pool_stats()
+    batches = batcher.stats()
+    info = registry.info()
+    advice = advice_store.info()
+    records = health_records.stats()
+    return [
+        ("aicheckup_cache_hit_ratio", "gauge", "Hit rate of the in-process caches.",
+         [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()]),
+        ("aicheckup_cache_entries", "gauge", "Number of entries in the in-process caches.",
+         [({"cache": name}, stats["size"]) for name, stats in caches.items()]),
+        ("aicheckup_db_pool_connections", "gauge", "Database connections by state.",
+         [({"state": "in_use"}, pool["in_use"]), ({"state": "idle"}, pool["idle"]),
+          ({"state": "max"}, pool["max_connections"])]),
+        ("aicheckup_db_pool_waiting", "gauge", "Threads waiting for a database connection.",
+         [({}, pool["waiting"])]),
+        ("aicheckup_db_pool_wait_seconds", "counter", "Total time spent waiting for a database connection.",
+         [({}, pool["wait_time_total"])]),
+        ("aicheckup_db_pool_timeouts", "counter", "Database connection checkouts that timed out.",
+         [({}, pool["timeouts"])]),
+        ("aicheckup_maps_circuit_open", "gauge", "Whether the Google Maps circuit breaker is open.",
+         [({}, api_stats["breaker"]["state"] == CircuitBreaker.OPEN)]),
+        ("aicheckup_batch_queue_depth", "gauge", "Diagnosis requests waiting to be batched.",
+         [({}, batches["queue_depth"])]),
+        ("aicheckup_batch_size_mean", "gauge", "Mean number of requests scored per batch.",
+         [({}, batches["mean_batch_size"])]),
+        ("aicheckup_model_info", "gauge", "The served model; 1 if it is loaded.",
+         [({"version": info["version"] or "", "path": info["path"]}, info["loaded"])]),
+        ("aicheckup_model_swaps", "counter", "Number of times a new model version was swapped in.",
+         [({}, info["swaps"])]),
+        ("aicheckup_advice_snapshot_info", "gauge", "The served advice snapshot; 1 if one is loaded.",
+         [({"version": advice["version"] or "", "source": advice["source"] or ""}, advice["loaded"])]),
+        ("aicheckup_advice_snapshot_entries", "gauge", "Number of diagnoses in the advice snapshot.",
+         [({}, advice["entries"])]),
+        ("aicheckup_health_records", "counter", "Health records by outcome of the background write.",
+         [({"outcome": outcome}, records[outcome]) for outcome in ("written", "dropped", "failed")]),
+        ("aicheckup_health_records_queued", "gauge", "Health records waiting to be written.",
+         [({}, records["queued"])]),
+    ]
+
+metrics.add_collector(_service_metrics)
+
+def diagnosis_cache_keys(symptoms_list, model, version):
+    """
+    Returns the diagnosis cache keys of symptom texts.
+
+    The texts are keyed as the model sees them, after its preprocessing, with the tokens
+    sorted only if the model ignores word order. The cache holds the probabilities of every
+    diagnosis; 'top_k' and 'min_probability' only shape the response, so they are not part of the key.
+
+    Args:
+        symptoms_list (list): The symptom texts.
+        model (DiagnosisModel): The model scoring the texts, or None if no model is loaded.
+        version (str): Version of the model scoring the texts.
+
+    Returns:
+        list: (model version, normalized symptom text) tuples in input order.
+    """
+    if model is None:
+        return [(version, normalize_symptoms(symptoms)) for symptoms in symptoms_list]
+    sort = not model.order_sensitive
+    return [(version, normalize_symptoms(text, sort=sort)) for text in model.preprocess(symptoms_list)]
+
+def diagnosis_cache_key(symptoms, model, version):
+    """
+    Returns the diagnosis cache key of a symptom text, see diagnosis_cache_keys().
+
+    Args:
+        symptoms (str): The symptom text.
+        model (DiagnosisModel): The model scoring the text, or None if no model is loaded.
+        version (str): Version of the model scoring the text.
+
+    Returns:
+        tuple: The model version and the normalized symptom text.
+    """
+    return diagnosis_cache_keys([symptoms], model, version)[0]
+
+def cache_diagnosis(key, result, version):
+    """
+    Caches a model result, unless the model was swapped while it was being scored.
+
+    Args:
+        key (tuple): Key returned by diagnosis_cache_key().
+        result (tuple): The (diagnosis, probabilities) result.
+        version (str): Version of the model served now.
+    """
+    if key[0] is not None and key[0] == version:
+        diagnosis_cache.set(key, result)
+
+def predict_cached(symptoms_list, predict_batch, model_registry):
+    """
+    Returns model results, with the probabilities of every diagnosis, for a list of symptom
+    texts, scoring only the texts whose normalized form is not cached, each distinct one once.
+
+    Args:
+        symptoms_list (list): The symptom texts.
+        predict_batch (callable): Function scoring a list of texts, like DiagnosisModel.predict_batch().
+        model_registry (ModelRegistry): Registry serving the scoring model.
+
+    Returns:
+        list: (diagnosis, probabilities) tuples in input order.
+    """
+    version = model_registry.version
+    keys = diagnosis_cache_keys(symptoms_list, model_registry.get(), version)
+    results = [diagnosis_cache.get(key) for key in keys]
+
+    misses = {}
+    for i, result in enumerate(results):
+        if result is None:
+            misses.setdefault(keys[i], []).append(i)
+    if misses:
+        texts = [symptoms_list[indices[0]] for indices in misses.values()]
+        predictions = predict_batch(texts)
+        for (key, indices), result in zip(misses.items(), predictions):
+            cache_diagnosis(key, result, model_registry.version)
+            for i in indices:
+                results[i] = result
+    return results
+
+def record_consultation(user_id, symptoms, diagnosis, probabilities, advice):
+    """
+    Queues a consultation result for the user's health record, if the request identified a user.
+
+    Errors are reported but never fail the request.
+
+    Args:
+        user_id (str): The user, or None for anonymous consultations, which are not recorded.
+        symptoms (str): The symptoms as entered.
+        diagnosis (str): The diagnosis.
+        probabilities (dict): Probabilities of every diagnosis, not only those shown in the response.
+        advice (dict): The health advice given.
+    """
+    if user_id is None:
+        return
+    try:
+        health_records.record(user_id, symptoms, diagnosis, probabilities, advice, model_version=registry.version)
+    except Exception as e:
+        print(f"Error recording consultation: {e}")
+
+def observe(signal, location):
+    """
+    Counts a diagnosis or hospital search in the live surveillance counts.
+
+    Only "latitude,longitude" locations are placed in a cell; place names are not geocoded
+    for this, so counting never adds a lookup to the request. Errors are reported but never
+    fail the request.
+
+    Args:
+        signal (str): The diagnosis, or HOSPITAL_SEARCH.
+        location (str): The location given with the request, or None.
+    """
+    try:
+        coordinates = parse_location(location) if isinstance(location, str) else None
+        surveillance.observe(signal, *(coordinates or ()))
+    except Exception as e:
+        print(f"Error counting {signal}: {e}")
+
+@bp.route('/index.html', methods=['GET'])
+def web_client():
+    """
+    Endpoint to serve the web client.
+
+    The page is served from memory, compressed for the client, with an ETag so that
+    unchanged pages are answered with 304 Not Modified.
+
+    Returns:
+        Response: The page.
+    """
+    return asset_response('index.html')
+
+@bp.route('/assets/<path:name>', methods=['GET'])
+def static_asset(name):
+    """
+    Endpoint to serve a static asset of the web client.
+
+    Returns:
+        Response: The asset, or a 404 error in JSON format if it does not exist.
+    """
+    return asset_response(name)
+
+def asset_response(name):
+    """
+    Builds the response for a file of the web client.
+
+    Args:
+        name (str): Path of the file relative to the asset directory.
+
+    Returns:
+        Response: The file, or a 404 error in JSON format if it does not exist.
+    """
+    response = assets.response(name, request)
+    if response is None:
+        return jsonify({"error": "Not found"}), 404
+    return response
 
 # Diagnosis endpoint
 @bp.route('/diagnose', methods=['POST'])
@@ -18,26 +283,50 @@ def diagnose():
     """
     Endpoint to receive symptoms, and return diagnosis results and advice.
 
+    If the request has a 'user_id' and the user's token (X-User-Token) or the admin token,
+    the result is added to the user's health record in the background; a 'user_id' without
+    a valid token is refused. A 'location' ("latitude,longitude") places the diagnosis in the
+    surveillance counts. 'top_k' and 'min_probability' limit the probabilities returned.
+
     Returns:
         JSON: Diagnosis and advice in JSON format.
     """
     try:
         data = request.get_json()
         symptoms = data['symptoms']
+        user_id = data.get('user_id')
+        location = data.get('location')
+        try:
+            top_k, min_probability = parse_filter_args(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if user_id is not None and not can_access_records(request.headers, user_id):
+            return jsonify({"error": "Forbidden"}), 403
 
-        # Multilingual support will be considered here (e.g., using a translation API)
-        # Currently, it assumes English symptoms
+        # Symptoms in other languages are mapped to English terms by the model's local
+        # preprocessing stage (app.language), without calling a translation API
 
+        model = registry.get()
         if model:
-            # Get the diagnosis from the model
-            diagnosis = model.predict(symptoms)
-            probabilities = model.predict_proba(symptoms)
+            # Rephrasings of recently seen symptoms are answered from the diagnosis cache.
+            # Otherwise the diagnosis and probabilities come from the model in a single pass,
+            # scored together with any other requests arriving at the same time
+            key = diagnosis_cache_key(symptoms, model, registry.version)
+            found, result = diagnosis_cache.lookup(key)
+            if not found:
+                result = batcher.predict_with_proba(symptoms)
+                cache_diagnosis(key, result, registry.version)
+            diagnosis, probabilities = result
 
             # Get health advice based on the diagnosis
             advice = get_health_advice(diagnosis)
             if advice is None:
-                advice = {"advice": "Please consult a doctor for further advice.", "source": "AI Checkup"}
+                advice = DEFAULT_ADVICE
 
+            record_consultation(user_id, symptoms, diagnosis, probabilities, advice)
+            observe(diagnosis, location)
+
+            probabilities = filter_probabilities(probabilities, top_k=top_k, min_probability=min_probability)
             return jsonify({"diagnosis": diagnosis, "probabilities": probabilities, "advice": advice})
         else:
             return jsonify({"error": "Model not loaded"}), 500
@@ -45,6 +334,120 @@ def diagnose():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Batch diagnosis endpoint
+@bp.route('/diagnose/batch', methods=['POST'])
+def diagnose_batch():
+    """
+    Endpoint to receive a list of symptom reports, and return diagnosis results and advice for each.
+
+    Reports missing the diagnosis cache are scored in one vectorized model call, and
+    advice for all distinct diagnoses is looked up in one database query. If the request
+    has a 'user_id' and the user's token, every result is added to the user's health record
+    in the background, and a 'location' places the diagnoses in the surveillance counts.
+
+    Returns:
+        JSON: A list of diagnosis and advice results in input order, in JSON format.
+    """
+    try:
+        data = request.get_json()
+        symptoms_list = data['symptoms']
+        user_id = data.get('user_id')
+        location = data.get('location')
+        try:
+            top_k, min_probability = parse_filter_args(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if user_id is not None and not can_access_records(request.headers, user_id):
+            return jsonify({"error": "Forbidden"}), 403
+
+        if not isinstance(symptoms_list, list) or not all(isinstance(s, str) for s in symptoms_list):
+            return jsonify({"error": "'symptoms' must be a list of strings"}), 400
+
+        model = registry.get()
+        if model:
+            predictions = predict_cached(symptoms_list, model.predict_batch, registry)
+            advice = get_health_advice_many(diagnosis for diagnosis, _ in predictions)
+
+            results = []
+            for symptoms, (diagnosis, probabilities) in zip(symptoms_list, predictions):
+                result_advice = advice.get(diagnosis, DEFAULT_ADVICE)
+                record_consultation(user_id, symptoms, diagnosis, probabilities, result_advice)
+                observe(diagnosis, location)
+                results.append({"diagnosis": diagnosis,
+                                "probabilities": filter_probabilities(probabilities, top_k=top_k,
+                                                                      min_probability=min_probability),
+                                "advice": result_advice})
+            return jsonify({"results": results})
+        else:
+            return jsonify({"error": "Model not loaded"}), 500
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def parse_filter_args(data):
+    """
+    Parses the 'top_k' and 'min_probability' fields of a diagnosis request.
+
+    Args:
+        data (dict): The request body.
+
+    Returns:
+        tuple: The number of probabilities to return (None for all) and the minimum probability.
+
+    Raises:
+        ValueError: If 'top_k' is not a non-negative integer, or 'min_probability' not a number between 0 and 1.
+    """
+    top_k = data.get('top_k')
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 0):
+        raise ValueError("'top_k' must be a non-negative integer")
+    min_probability = data.get('min_probability', MIN_PROBABILITY)
+    if (isinstance(min_probability, bool) or not isinstance(min_probability, (int, float))
+            or not 0 <= min_probability <= 1):
+        raise ValueError("'min_probability' must be a number between 0 and 1")
+    return top_k, float(min_probability)
+
+def parse_history_args(args):
+    """
+    Parses the 'limit' and 'before' query parameters of the history endpoint.
+
+    Args:
+        args (dict): The query parameters.
+
+    Returns:
+        tuple: The page size, capped at MAX_HISTORY_LIMIT, and the cursor.
+
+    Raises:
+        ValueError: If 'limit' is not a positive integer.
+    """
+    limit = int(args.get('limit', 20))
+    if limit < 1:
+        raise ValueError("'limit' must be a positive integer")
+    return min(limit, MAX_HISTORY_LIMIT), args.get('before')
+
+# Health record history endpoint
+@bp.route('/records/<user_id>', methods=['GET'])
+def records_history(user_id):
+    """
+    Endpoint to return a page of a user's consultation history, newest first.
+
+    Query parameters are 'limit' (default 20) and 'before', the 'next' cursor of the previous page.
+    The request must carry the user's token (X-User-Token) or the admin token (X-Admin-Token).
+
+    Returns:
+        JSON: The records and the cursor of the next page (null on the last page) in JSON format.
+    """
+    if not can_access_records(request.headers, user_id):
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        limit, before = parse_history_args(request.args)
+    except ValueError:
+        return jsonify({"error": "'limit' must be a positive integer"}), 400
+    try:
+        records, cursor = health_records.history(user_id, limit=limit, before=before)
+        return jsonify({"records": records, "next": cursor})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Medical institution search endpoint
 @bp.route('/find_hospitals', methods=['POST'])
 def find_hospitals():
@@ -57,6 +460,7 @@ def find_hospitals():
     try:
         data = request.get_json()
         location = data['location']
+        observe(HOSPITAL_SEARCH, location)
 
         # Get nearby hospitals using the utility function
         hospitals = find_nearby_hospitals(location)
@@ -64,3 +468,173 @@ def find_hospitals():
         return jsonify({"hospitals": hospitals})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+# Model information endpoint
+@bp.route('/model', methods=['GET'])
+def model_info():
+    """
+    Endpoint to return the version and load time of the served model.
+
+    Returns:
+        JSON: Model registry information in JSON format.
+    """
+    return jsonify(registry.info())
+
+# Metrics endpoint
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Endpoint to return stage latencies, request counts, cache, pool and model metrics.
+
+    Returns:
+        Response: Metrics in the Prometheus text exposition format.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def _token_matches(value, token):
+    """
+    Compares a token given with a request to the expected one in constant time.
+
+    Args:
+        value (str): The token given, or None.
+        token (str): The expected token, or None if none is configured.
+
+    Returns:
+        bool: True if a token is configured and matches.
+    """
+    return bool(token) and hmac.compare_digest(value or "", token)
+
+def _is_admin():
+    """
+    Checks the request's X-Admin-Token header against the ADMIN_TOKEN environment variable.
+
+    Returns:
+        bool: True if ADMIN_TOKEN is set and matches the header.
+    """
+    return _token_matches(request.headers.get("X-Admin-Token"), os.environ.get("ADMIN_TOKEN"))
+
+def user_token(user_id):
+    """
+    Returns the token that lets a user read their own health record.
+
+    The token is an HMAC of the user id keyed with the RECORDS_SECRET environment variable,
+    handed to the user by the service that signs them in.
+
+    Args:
+        user_id (str): The user.
+
+    Returns:
+        str: The token, or None if RECORDS_SECRET is not set.
+    """
+    secret = os.environ.get("RECORDS_SECRET")
+    if not secret:
+        return None
+    return hmac.new(secret.encode("utf-8"), str(user_id).encode("utf-8"), "sha256").hexdigest()
+
+def can_access_records(headers, user_id):
+    """
+    Checks that a request may read or add to a user's health record.
+
+    Args:
+        headers (Headers): The request headers.
+        user_id (str): The user whose record is requested or written.
+
+    Returns:
+        bool: True if the request carries the user's token (X-User-Token) or the admin token (X-Admin-Token).
+    """
+    return (_token_matches(headers.get("X-Admin-Token"), os.environ.get("ADMIN_TOKEN"))
+            or _token_matches(headers.get("X-User-Token"), user_token(user_id)))
+
+# Health advice cache administration endpoints
+@bp.route('/admin/advice_cache', methods=['GET'])
+def advice_cache_stats():
+    """
+    Endpoint to return advice cache size and hit/miss statistics.
+
+    Returns:
+        JSON: Advice cache statistics in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(advice_cache.stats())
+
+@bp.route('/admin/advice_cache/invalidate', methods=['POST'])
+def advice_cache_invalidate():
+    """
+    Endpoint to drop cached advice for one diagnosis, or for all diagnoses if none is given.
+
+    Returns:
+        JSON: The number of cache entries removed in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    data = request.get_json(silent=True) or {}
+    return jsonify({"invalidated": invalidate_health_advice(data.get('diagnosis'))})
+
+# Advice snapshot administration endpoints
+@bp.route('/admin/advice', methods=['GET'])
+def advice_snapshot_info():
+    """
+    Endpoint to return the version, source and size of the served advice snapshot.
+
+    Returns:
+        JSON: Advice snapshot information in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(advice_store.info())
+
+@bp.route('/admin/advice/reload', methods=['POST'])
+def advice_snapshot_reload():
+    """
+    Endpoint to notify the service that the advice changed, reloading the snapshot immediately.
+
+    Returns:
+        JSON: Whether a new snapshot was swapped in, and the snapshot information, in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    reloaded = advice_store.reload()
+    return jsonify({"reloaded": reloaded, **advice_store.info()})
+
+# Public health surveillance endpoint
+@bp.route('/admin/surveillance', methods=['GET'])
+def surveillance_counts():
+    """
+    Endpoint to return live counts of diagnoses and hospital searches by region.
+
+    Query parameters are 'window' (seconds, default the whole sliding window), and
+    'signal' (a diagnosis or "hospital_search") and/or 'cell' (a geohash) to also
+    return the count of that signal and region.
+
+    Counts cover every worker process: this worker's live counts are merged with the
+    counts the other workers last wrote, every SURVEILLANCE_FLUSH_INTERVAL seconds.
+
+    Returns:
+        JSON: Counts per signal, the top hotspots and the requested count in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        window = float(request.args['window']) if 'window' in request.args else None
+    except ValueError:
+        return jsonify({"error": "'window' must be a number of seconds"}), 400
+    counts = surveillance.combined()
+    result = counts.summary(window)
+    signal, cell = request.args.get('signal'), request.args.get('cell')
+    if signal or cell:
+        result["count"] = counts.count(signal=signal, cell=cell, window=window)
+    return jsonify(result)
+
+# Diagnosis cache administration endpoint
+@bp.route('/admin/diagnosis_cache', methods=['GET'])
+def diagnosis_cache_stats():
+    """
+    Endpoint to return diagnosis cache size and hit/miss statistics.
+
+    Returns:
+        JSON: Diagnosis cache statistics in JSON format.
+    """
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(diagnosis_cache.stats())
@@ -0,0 +1,163 @@
+import argparse
+import os
+from gunicorn.app.base import BaseApplication
+from app.startup import load_environment, startup
+
+# The server is an entry point: load .env before the application modules read their configuration
+load_environment()
+
+from app.main import create_app
+from app.routes import batcher, health_records, registry, surveillance
+from app.utils import advice_store, api, db, get_datapack, reload_datapack, warm_health_advice_cache
+
+def default_options():
+    """
+    Builds the server options from environment variables.
+
+    Returns:
+        dict: Gunicorn settings: bind address, worker processes, threads per worker and timeouts.
+    """
+    return {
+        "bind": os.environ.get("BIND", "0.0.0.0:8000"),
+        "workers": int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        "threads": int(os.environ.get("WORKER_THREADS", 4)),
+        "timeout": int(os.environ.get("WORKER_TIMEOUT", 30)),
+        "graceful_timeout": int(os.environ.get("GRACEFUL_TIMEOUT", 30)),
+    }
+
+def preload():
+    """
+    Loads the model, the advice snapshot (or else the advice cache), the hospital index and
+    the offline data pack in the parent process, so forked workers share them copy-on-write
+    instead of loading their own.
+
+    Database and HTTP connections opened while preloading are closed again, so that no
+    worker inherits a socket that is shared with the parent or its siblings.
+
+    Returns:
+        dict: Whether each resource was preloaded.
+    """
+    report = {"model": False, "advice": 0, "hospital_index": False, "datapack": False}
+    registry.warm_up(background=False)
+    model = registry.get()
+    snapshot = advice_store.get()
+    if model is not None:
+        report["model"] = True
+    if snapshot is not None:
+        report["advice"] = len(snapshot)
+    elif model is not None:
+        try:
+            report["advice"] = warm_health_advice_cache(list(model.model.classes_))
+        except Exception as e:
+            print(f"Error preloading health advice: {e}")
+    try:
+        db.get_hospital_index()
+        report["hospital_index"] = True
+    except Exception as e:
+        print(f"Error preloading hospital index: {e}")
+    report["datapack"] = get_datapack() is not None
+
+    db.pool.dispose()
+    api.close()
+    return report
+
+def post_fork(server, worker):
+    """
+    Gunicorn hook run in each worker after forking: starts the worker's model and advice watchers
+    and its surveillance summary writer.
+    """
+    registry.start_watching()
+    advice_store.start_watching()
+    surveillance.start_flushing()
+    # Pick up a model published while the parent was preloading
+    registry.check_for_update()
+
+def worker_exit(server, worker):
+    """
+    Gunicorn hook run in each worker before it exits: drains the batcher and the health
+    record writer, deletes its surveillance counts file and closes connections.
+    """
+    registry.stop_watching()
+    advice_store.stop_watching()
+    surveillance.stop_flushing()
+    surveillance.discard_flushed()
+    batcher.close(timeout=5)
+    health_records.close(timeout=5)
+    db.close()
+    api.close()
+
+def on_reload(server):
+    """
+    Gunicorn hook run in the parent on SIGHUP, before the new workers are forked. With preload_app
+    the application is not loaded again, so the parent picks up a new model, advice snapshot and
+    data pack here and preloads them for the new workers to share.
+    """
+    registry.check_for_update()
+    advice_store.reload()
+    reload_datapack()
+    print(f"Reloaded shared state: {preload()}")
+
+def on_exit(server):
+    """
+    Gunicorn hook run in the parent on shutdown: closes its connections.
+    """
+    db.close()
+    api.close()
+
+class ServerApplication(BaseApplication):
+    """
+    Pre-forking server for the Flask application.
+
+    The application and its shared state are loaded once in the parent (preload_app),
+    then N worker processes are forked, each serving requests with its own thread pool.
+    Sending SIGHUP to the parent reloads the shared state (see on_reload) and gracefully
+    replaces the workers; SIGTERM shuts them down after in-flight requests have finished.
+    """
+
+    def __init__(self, options=None):
+        """
+        Initializes the server.
+
+        Args:
+            options (dict, optional): Gunicorn settings overriding default_options().
+        """
+        self.options = {**default_options(), **(options or {})}
+        super().__init__()
+
+    def load_config(self):
+        options = {
+            **self.options,
+            "preload_app": True,
+            "worker_class": "gthread",
+            "post_fork": post_fork,
+            "worker_exit": worker_exit,
+            "on_reload": on_reload,
+            "on_exit": on_exit,
+        }
+        for key, value in options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        app = create_app(background_tasks=False)
+        with startup.stage("preload"):
+            report = preload()
+        print(f"Preloaded shared state: {report}")
+        print(f"Startup: {startup.to_dict()}")
+        return app
+
+def main(argv=None):
+    """
+    Command-line entry point: python -m app.serve [--workers N] [--threads N] [--bind ADDR].
+    """
+    parser = argparse.ArgumentParser(description="Serve AI Checkup with multiple worker processes.")
+    parser.add_argument("--bind", help="Address to listen on (default: $BIND or 0.0.0.0:8000)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: $WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--threads", type=int, help="Request threads per worker (default: $WORKER_THREADS or 4)")
+    parser.add_argument("--timeout", type=int, help="Seconds before a silent worker is restarted")
+    parser.add_argument("--graceful-timeout", type=int, help="Seconds workers get to finish on shutdown or reload")
+    args = parser.parse_args(argv)
+    ServerApplication({key: value for key, value in vars(args).items() if value is not None}).run()
+
+if __name__ == "__main__":
+    main()
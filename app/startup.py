@@ -0,0 +1,117 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Third-party packages whose import time is worth reporting
+HEAVY_PACKAGES = ("flask", "quart", "gunicorn", "numpy", "scipy", "sklearn", "joblib", "psycopg2", "requests",
+                  "aiohttp", "asyncpg", "dotenv")
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+def load_environment(path=None):
+    """
+    Loads environment variables from the .env file, once per process.
+
+    Variables that are already set are not overridden. Application modules read their
+    configuration when they are imported, so entry points call this before importing them.
+
+    Args:
+        path (str, optional): Path of the file. Defaults to the .env file found by python-dotenv.
+
+    Returns:
+        bool: True if the file was loaded by this call.
+    """
+    global _environment_loaded
+    with _environment_lock:
+        if _environment_loaded:
+            return False
+        with startup.stage("load environment"):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+        _environment_loaded = True
+        return True
+
+class StartupReport:
+    """
+    Records how long each startup stage took and which heavy packages it imported.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty report.
+        """
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a with-block as one startup stage.
+
+        Args:
+            name (str): Stage name, e.g. "import routes".
+        """
+        before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            loaded = set(sys.modules) - before
+            packages = sorted(name for name in loaded if name in HEAVY_PACKAGES)
+            with self._lock:
+                self.stages.append({"stage": name, "seconds": round(seconds, 6), "modules": len(loaded),
+                                    "packages": packages})
+
+    def to_dict(self):
+        """
+        Returns the report.
+
+        Returns:
+            dict: The stages in order with their duration, number of modules imported and the heavy
+                  packages among them, and the total duration.
+        """
+        with self._lock:
+            stages = [dict(stage) for stage in self.stages]
+        return {"stages": stages, "total_seconds": round(sum(stage["seconds"] for stage in stages), 6)}
+
+# Report of this process's startup, filled in by create_app() and the entry points
+startup = StartupReport()
+
+def main(argv=None):
+    """
+    Command-line entry point: starts the application the way a server does and prints the startup report.
+
+    Example:
+        python -m app.startup --preload
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Report the import and initialization costs of starting AI Checkup.")
+    parser.add_argument("--preload", action="store_true",
+                        help="Also load the model and the advice, as the multi-process server does before forking.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Start the async (ASGI) application.")
+    args = parser.parse_args(argv)
+
+    # Run as a script this module is __main__, so use the report the application records into
+    from app.startup import startup as report
+
+    with report.stage("import app.main"):
+        from app.main import create_app, create_async_app
+    (create_async_app if args.use_async else create_app)(background_tasks=False)
+    if args.preload:
+        from app.routes import registry
+        from app.utils import advice_store
+        with report.stage("load model"):
+            registry.warm_up(background=False)
+        with report.stage("load advice"):
+            advice_store.get()
+    print(json.dumps(report.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+import base64
+import glob
+import hashlib
+import json
+import re
+import zlib
+from array import array
+import os
+import threading
+import time
+import numpy as np
+from app.geo import geohash
+
+# Every process counts its own requests, so each writes its own summary; see DiagnosisAggregator.combined()
+DEFAULT_SUMMARY_PATH = os.path.join("data", "processed", "surveillance-{pid}.json")
+
+# Signal counted for /find_hospitals searches, next to the diagnoses
+HOSPITAL_SEARCH = "hospital_search"
+
+def _hash(key):
+    """
+    Hashes a key to two independent 64-bit integers.
+
+    Args:
+        key (str): The key.
+
+    Returns:
+        tuple: The two hashes.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+class CountMinSketch:
+    """
+    Approximate counts of an unbounded number of keys in a fixed-size table.
+
+    Every key increments one counter in each of depth rows. Estimates never undercount,
+    and overcount by at most 2 * total / width with probability 1 - (1/2) ** depth.
+    """
+
+    def __init__(self, width=2048, depth=4):
+        """
+        Initializes an empty sketch.
+
+        Args:
+            width (int, optional): Counters per row. Defaults to 2048.
+            depth (int, optional): Number of rows. Defaults to 4.
+        """
+        self.width = width
+        self.depth = depth
+        # Rows are stored one after the other; a flat array is faster to update one
+        # counter at a time than a numpy array
+        self.table = array("q", bytes(8 * depth * width))
+
+    def _cells(self, key):
+        # Double hashing: the hash function of row i is h1 + i * h2
+        h1, h2 = _hash(key)
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """
+        Counts a key.
+
+        Args:
+            key (str): The key.
+            count (int, optional): The number of occurrences. Defaults to 1.
+
+        Returns:
+            int: The estimated count of the key after adding.
+        """
+        table = self.table
+        estimate = None
+        for i in self._cells(key):
+            table[i] += count
+            if estimate is None or table[i] < estimate:
+                estimate = table[i]
+        return estimate
+
+    def estimate(self, key):
+        """
+        Returns the estimated count of a key.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            int: The estimated count.
+        """
+        table = self.table
+        return min(table[i] for i in self._cells(key))
+
+    def clear(self):
+        """
+        Resets all counts to zero.
+        """
+        self.table = array("q", bytes(8 * self.depth * self.width))
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch with the same width and depth.
+
+        Args:
+            other (CountMinSketch): The other sketch.
+        """
+        merged = np.frombuffer(self.table, dtype=np.int64) + np.frombuffer(other.table, dtype=np.int64)
+        self.table = array("q", merged.tobytes())
+
+class HyperLogLog:
+    """
+    Approximate number of distinct items in 2 ** p one-byte registers.
+
+    The relative standard error is about 1.04 / sqrt(2 ** p), e.g. 6.5% for p=8.
+    """
+
+    def __init__(self, p=8):
+        """
+        Initializes an empty counter.
+
+        Args:
+            p (int, optional): Number of index bits. Defaults to 8 (256 registers).
+        """
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, item):
+        """
+        Adds an item.
+
+        Args:
+            item (str): The item.
+        """
+        h = _hash(item)[0]
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Adds the items of another counter with the same p.
+
+        Args:
+            other (HyperLogLog): The other counter.
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """
+        Returns the estimated number of distinct items.
+
+        Returns:
+            int: The estimate.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+class _Bucket:
+    """
+    Counts of one time bucket of a sliding window.
+    """
+
+    def __init__(self, width, depth):
+        self.epoch = None
+        self.total = 0
+        self.overflow = 0  # occurrences of signals beyond max_signals, only counted in the sketch
+        self.sketch = CountMinSketch(width, depth)
+        self.diagnoses = {}  # diagnosis -> [count, HyperLogLog of cells]
+        self.hotspots = {}  # (diagnosis, cell) -> estimated count
+
+    def reset(self, epoch):
+        self.epoch = epoch
+        self.total = 0
+        self.overflow = 0
+        self.sketch.clear()
+        self.diagnoses.clear()
+        self.hotspots.clear()
+
+    def to_dict(self):
+        """
+        Returns the counts as a JSON-serializable dict, with the sketch and the HyperLogLog
+        registers compressed and base64-encoded.
+        """
+        def encode(data):
+            return base64.b64encode(zlib.compress(data)).decode("ascii")
+
+        return {
+            "epoch": self.epoch,
+            "total": self.total,
+            "overflow": self.overflow,
+            "sketch": encode(self.sketch.table.tobytes()),
+            "diagnoses": {signal: [count, encode(cells.registers.tobytes())]
+                          for signal, (count, cells) in self.diagnoses.items()},
+            "hotspots": [[signal, cell, count] for (signal, cell), count in self.hotspots.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, width, depth, hll_p):
+        """
+        Rebuilds a bucket from to_dict() output.
+        """
+        def decode(text):
+            return zlib.decompress(base64.b64decode(text))
+
+        bucket = cls(width, depth)
+        bucket.epoch = data["epoch"]
+        bucket.total = data["total"]
+        bucket.overflow = data["overflow"]
+        bucket.sketch.table = array("q", decode(data["sketch"]))
+        for signal, (count, registers) in data["diagnoses"].items():
+            cells = HyperLogLog(hll_p)
+            cells.registers = np.frombuffer(decode(registers), dtype=np.uint8).copy()
+            bucket.diagnoses[signal] = [count, cells]
+        bucket.hotspots = {(signal, cell): count for signal, cell, count in data["hotspots"]}
+        return bucket
+
+class DiagnosisAggregator:
+    """
+    Live counts of diagnoses by geohash cell over a sliding time window.
+
+    The window is a ring of num_buckets buckets of bucket_seconds each; a bucket is
+    reused, and its counts dropped, once it falls out of the window. Each bucket holds:
+
+    - exact counts per signal (a diagnosis or HOSPITAL_SEARCH), with a HyperLogLog of
+      the distinct cells reporting it, for up to max_signals signals; further signals
+      are only counted in the sketch;
+    - a count-min sketch of every (signal, cell) and cell count, for every geohash
+      prefix of the cell, so any region can be queried at any precision;
+    - the top_k (signal, cell) pairs with the highest estimated counts.
+
+    Memory is therefore fixed by the configuration, whatever the traffic, and each
+    observation costs a constant amount of work.
+
+    Counts are kept per process. flush() writes them to a file per process, and
+    combined() merges the files of every process into one view.
+    """
+
+    def __init__(self, bucket_seconds=60, num_buckets=60, precision=5, width=2048, depth=4,
+                 max_signals=256, top_k=32, hll_p=8, path=None, flush_interval=300.0, timer=time.time):
+        """
+        Initializes empty counts.
+
+        Args:
+            bucket_seconds (float, optional): Length of a bucket, in seconds. Defaults to 60.
+            num_buckets (int, optional): Number of buckets in the window. Defaults to 60 (one hour).
+            precision (int, optional): Geohash precision of the cells. Defaults to 5.
+            width (int, optional): Count-min sketch counters per row. Defaults to 2048.
+            depth (int, optional): Count-min sketch rows. Defaults to 4.
+            max_signals (int, optional): Maximum number of signals counted exactly per bucket. Defaults to 256.
+            top_k (int, optional): Number of hotspots tracked per bucket. Defaults to 32.
+            hll_p (int, optional): HyperLogLog index bits. Defaults to 8.
+            path (str, optional): File the summary is written to by flush(). "{pid}" is replaced by the
+                                  process id, so that several worker processes do not overwrite each
+                                  other's counts. Defaults to None (not written).
+            flush_interval (float, optional): How often the flushing thread writes the summary, in seconds.
+                                              Defaults to 300.
+            timer (callable, optional): Clock returning Unix time. Defaults to time.time.
+        """
+        if num_buckets < 1:
+            raise ValueError("num_buckets must be at least 1")
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.precision = precision
+        self.max_signals = max_signals
+        self.top_k = top_k
+        self.hll_p = hll_p
+        self.path = path
+        self.flush_interval = flush_interval
+        self._timer = timer
+        self._width = width
+        self._depth = depth
+        self._buckets = [_Bucket(width, depth) for _ in range(num_buckets)]
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def cell(self, latitude, longitude):
+        """
+        Returns the geohash cell of a location.
+
+        Args:
+            latitude (float): The latitude.
+            longitude (float): The longitude.
+
+        Returns:
+            str: The cell.
+        """
+        return geohash(latitude, longitude, self.precision)
+
+    def observe(self, signal, latitude=None, longitude=None):
+        """
+        Counts one occurrence of a signal, at a location if one is known.
+
+        Args:
+            signal (str): A diagnosis, or HOSPITAL_SEARCH.
+            latitude (float, optional): The latitude. Defaults to None (unknown location).
+            longitude (float, optional): The longitude. Defaults to None (unknown location).
+        """
+        signal = str(signal)
+        cell = None if latitude is None or longitude is None else self.cell(latitude, longitude)
+        now = self._timer()
+        with self._lock:
+            bucket = self._bucket(int(now // self.bucket_seconds))
+            bucket.total += 1
+            entry = bucket.diagnoses.get(signal)
+            if entry is None and len(bucket.diagnoses) < self.max_signals:
+                entry = bucket.diagnoses[signal] = [0, HyperLogLog(self.hll_p)]
+            if entry is not None:
+                entry[0] += 1
+            else:
+                bucket.overflow += 1
+                bucket.sketch.add(f"{signal}|")
+            if cell is None:
+                return
+            if entry is not None:
+                entry[1].add(cell)
+
+            for length in range(1, len(cell) + 1):
+                prefix = cell[:length]
+                bucket.sketch.add(f"cell|{prefix}")
+                count = bucket.sketch.add(f"{signal}|{prefix}")
+            self._track_hotspot(bucket, (signal, cell), count)
+
+    def count(self, signal=None, cell=None, window=None):
+        """
+        Returns the number of occurrences in the window.
+
+        Counts for a cell, and for signals beyond max_signals, are count-min estimates,
+        which may be slightly too high. Other signal counts are exact.
+
+        Args:
+            signal (str, optional): A diagnosis or HOSPITAL_SEARCH. Defaults to None (all signals).
+            cell (str, optional): A geohash cell or prefix of up to `precision` characters.
+                                  Defaults to None (everywhere).
+            window (float, optional): Window length in seconds, rounded up to whole buckets.
+                                      Defaults to the whole window.
+
+        Returns:
+            int: The count.
+        """
+        if cell is not None:
+            cell = cell[:self.precision]
+            key = f"cell|{cell}" if signal is None else f"{signal}|{cell}"
+        total = 0
+        with self._lock:
+            for bucket in self._window(window):
+                if cell is not None:
+                    total += bucket.sketch.estimate(key)
+                elif signal is None:
+                    total += bucket.total
+                else:
+                    # Only signals beyond max_signals are missing from the exact counts
+                    entry = bucket.diagnoses.get(str(signal))
+                    if entry:
+                        total += entry[0]
+                    elif bucket.overflow:
+                        total += bucket.sketch.estimate(f"{signal}|")
+        return total
+
+    def summary(self, window=None):
+        """
+        Returns the counts of the window.
+
+        Args:
+            window (float, optional): Window length in seconds, rounded up to whole buckets.
+                                      Defaults to the whole window.
+
+        Returns:
+            dict: The window start and end, the total count, the count and estimated number
+                  of distinct cells of each signal, and the top_k hotspots by estimated count.
+        """
+        with self._lock:
+            buckets = self._window(window)
+            signals = {}
+            hotspots = {}
+            total = 0
+            for bucket in buckets:
+                total += bucket.total
+                for signal, (count, cells) in bucket.diagnoses.items():
+                    merged = signals.get(signal)
+                    if merged is None:
+                        merged = signals[signal] = [0, HyperLogLog(self.hll_p)]
+                    merged[0] += count
+                    merged[1].merge(cells)
+                for key in bucket.hotspots:
+                    hotspots[key] = 0
+            for bucket in buckets:
+                for signal, cell in hotspots:
+                    hotspots[signal, cell] += bucket.sketch.estimate(f"{signal}|{cell}")
+
+            end = (self._current_epoch() + 1) * self.bucket_seconds
+            length = self._window_buckets(window) * self.bucket_seconds
+        top = sorted(hotspots.items(), key=lambda item: (-item[1], item[0]))[:self.top_k]
+        return {
+            "start": end - length,
+            "end": end,
+            "total": total,
+            "signals": {signal: {"count": count, "cells": cells.count()}
+                        for signal, (count, cells) in sorted(signals.items())},
+            "hotspots": [{"signal": signal, "cell": cell, "count": count} for (signal, cell), count in top if count],
+        }
+
+    def state(self):
+        """
+        Returns the counts of the window, for another process to merge with merge_state().
+
+        Returns:
+            dict: The configuration the counts depend on, and the buckets of the window.
+        """
+        with self._lock:
+            buckets = [bucket.to_dict() for bucket in self._window(None)]
+        return {"bucket_seconds": self.bucket_seconds, "precision": self.precision, "width": self._width,
+                "depth": self._depth, "hll_p": self.hll_p, "buckets": buckets}
+
+    def merge_state(self, state):
+        """
+        Adds counts returned by state() in another process. Buckets that are no longer in the
+        window are ignored.
+
+        Args:
+            state (dict): The counts.
+
+        Raises:
+            ValueError: If the counts were made with a different configuration.
+        """
+        config = {"bucket_seconds": self.bucket_seconds, "precision": self.precision, "width": self._width,
+                  "depth": self._depth, "hll_p": self.hll_p}
+        if any(state.get(name) != value for name, value in config.items()):
+            raise ValueError("Counts were made with a different configuration")
+        for data in state["buckets"]:
+            source = _Bucket.from_dict(data, self._width, self._depth, self.hll_p)
+            with self._lock:
+                current = self._current_epoch()
+                if current - self.num_buckets < source.epoch <= current:
+                    self._merge_bucket(self._bucket(source.epoch), source)
+
+    def combined(self, paths=None):
+        """
+        Returns the counts of every process: this process's live counts, plus the counts
+        other processes last wrote with flush().
+
+        Counts of other processes are as recent as their last flush, at most flush_interval
+        seconds old. Files that cannot be read are skipped. Files left behind by processes
+        that are no longer running, or not written for three flush intervals, are deleted.
+
+        Args:
+            paths (list, optional): Files written by other processes. Defaults to the files matching
+                                    the configured path, other than this process's.
+
+        Returns:
+            DiagnosisAggregator: A new aggregator holding the merged counts.
+        """
+        if paths is None:
+            paths = []
+            if self.path:
+                own = os.path.abspath(self.path.replace("{pid}", str(os.getpid())))
+                paths = [path for path in sorted(glob.glob(self.path.replace("{pid}", "*")))
+                         if os.path.abspath(path) != own and not self._remove_if_stale(path)]
+        view = DiagnosisAggregator(bucket_seconds=self.bucket_seconds, num_buckets=self.num_buckets,
+                                   precision=self.precision, width=self._width, depth=self._depth,
+                                   max_signals=self.max_signals, top_k=self.top_k, hll_p=self.hll_p,
+                                   timer=self._timer)
+        view.merge_state(self.state())
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    view.merge_state(json.load(f))
+            except Exception as e:
+                print(f"Error reading surveillance counts from {path}: {e}")
+        return view
+
+    def flush(self, path=None):
+        """
+        Writes the summary of the whole window to a JSON file, along with the counts
+        for combined() to merge.
+
+        The file is written to a temporary name and renamed into place, so readers never
+        see a partially written summary.
+
+        Args:
+            path (str, optional): Path of the file, see __init__(). Defaults to the configured path.
+
+        Returns:
+            str: The path written to.
+        """
+        path = (path or self.path).replace("{pid}", str(os.getpid()))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        summary = dict(self.summary(), generated_at=self._timer(), **self.state())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def discard_flushed(self):
+        """
+        Deletes the file this process writes with flush(), so that other processes stop
+        merging its counts, e.g. when a worker process exits.
+        """
+        if not self.path:
+            return
+        try:
+            os.remove(self.path.replace("{pid}", str(os.getpid())))
+        except FileNotFoundError:
+            pass
+
+    def start_flushing(self):
+        """
+        Starts a thread writing the summary every flush_interval seconds, unless it is already
+        running, no path is configured or flush_interval is not positive.
+        """
+        with self._lock:
+            if (not self.path or self.flush_interval <= 0
+                    or (self._flusher is not None and self._flusher.is_alive())):
+                return
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_periodically, name="surveillance-flusher",
+                                             daemon=True)
+            self._flusher.start()
+
+    def stop_flushing(self):
+        """
+        Stops the flushing thread after a last write.
+        """
+        self._stop.set()
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.join(5)
+
+    def _flush_periodically(self):
+        while True:
+            stopped = self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing surveillance summary: {e}")
+            if stopped:
+                return
+
+    def _remove_if_stale(self, path):
+        """
+        Deletes a file written by another process if that process is gone or stopped writing.
+
+        Returns:
+            bool: True if the file was stale.
+        """
+        pattern = re.escape(os.path.basename(self.path)).replace(re.escape("{pid}"), r"(\d+)")
+        match = re.fullmatch(pattern, os.path.basename(path))
+        stale = False
+        if match:
+            try:
+                os.kill(int(match.group(1)), 0)
+            except ProcessLookupError:
+                stale = True
+            except (PermissionError, OverflowError):
+                pass
+        try:
+            if not stale and self.flush_interval > 0:
+                stale = time.time() - os.path.getmtime(path) > 3 * self.flush_interval
+            if stale:
+                os.remove(path)
+        except OSError:
+            pass
+        return stale
+
+    def _current_epoch(self):
+        return int(self._timer() // self.bucket_seconds)
+
+    def _bucket(self, epoch):
+        """
+        Returns the bucket of an epoch, resetting it if it holds an older epoch. Requires the lock.
+        """
+        bucket = self._buckets[epoch % self.num_buckets]
+        if bucket.epoch != epoch:
+            bucket.reset(epoch)
+        return bucket
+
+    def _window_buckets(self, window):
+        if window is None:
+            return self.num_buckets
+        return max(1, min(self.num_buckets, int(-(-window // self.bucket_seconds))))
+
+    def _window(self, window):
+        """
+        Returns the buckets of the last `window` seconds. Requires the lock.
+        """
+        current = self._current_epoch()
+        oldest = current - self._window_buckets(window) + 1
+        return [bucket for bucket in self._buckets if bucket.epoch is not None and oldest <= bucket.epoch <= current]
+
+    def _merge_bucket(self, target, source):
+        """
+        Adds the counts of a bucket of the same epoch into one of this aggregator's. Requires the lock.
+        """
+        # A signal counted exactly in one bucket may be in the other's sketch only;
+        # its sketch estimate is then added to the exact count
+        for signal in source.diagnoses:
+            if signal not in target.diagnoses:
+                count = target.sketch.estimate(f"{signal}|") if target.overflow else 0
+                target.diagnoses[signal] = [count, HyperLogLog(self.hll_p)]
+        for signal, entry in target.diagnoses.items():
+            other = source.diagnoses.get(signal)
+            if other is not None:
+                entry[0] += other[0]
+                entry[1].merge(other[1])
+            elif source.overflow:
+                entry[0] += source.sketch.estimate(f"{signal}|")
+        target.total += source.total
+        target.overflow += source.overflow
+        target.sketch.merge(source.sketch)
+        for signal, cell in set(target.hotspots) | set(source.hotspots):
+            self._track_hotspot(target, (signal, cell), target.sketch.estimate(f"{signal}|{cell}"))
+
+    def _track_hotspot(self, bucket, key, count):
+        """
+        Updates the bucket's top_k hotspots with a new estimated count. Requires the lock.
+        """
+        hotspots = bucket.hotspots
+        if key in hotspots or len(hotspots) < self.top_k:
+            hotspots[key] = count
+            return
+        coldest = min(hotspots, key=hotspots.get)
+        if count > hotspots[coldest]:
+            del hotspots[coldest]
+            hotspots[key] = count
@@ -0,0 +1,407 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import StratifiedKFold
+from threadpoolctl import threadpool_limits
+from app.bulk_score import PROCESSED_DATA_DIR, RAW_DATA_DIR, iter_chunks
+from app.compact import is_compact_model
+from app.models import DiagnosisModel
+
+def resolve_input(path):
+    """
+    Resolves an input path, looking in the raw data directory if it does not exist as given.
+
+    Args:
+        path (str): The input path.
+
+    Returns:
+        str: The resolved path.
+    """
+    return path if os.path.exists(path) else os.path.join(RAW_DATA_DIR, path)
+
+def iter_labelled(path):
+    """
+    Streams labelled consultations from a JSONL file.
+
+    Args:
+        path (str): JSONL file whose lines have 'symptoms' and 'diagnosis' fields. Blank lines are skipped.
+
+    Yields:
+        tuple: The symptoms and diagnosis of each consultation.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["symptoms"], record["diagnosis"]
+
+def iter_labelled_chunks(path, chunk_size=10000):
+    """
+    Streams labelled consultations from a JSONL file in chunks.
+
+    Args:
+        path (str): JSONL file whose lines have 'symptoms' and 'diagnosis' fields.
+        chunk_size (int, optional): Number of consultations per chunk. Defaults to 10000.
+
+    Yields:
+        tuple: A list of symptoms and the list of their diagnoses.
+    """
+    for chunk in iter_chunks(iter_labelled(path), chunk_size):
+        X_chunk, y_chunk = zip(*chunk)
+        yield list(X_chunk), list(y_chunk)
+
+def collect_classes(path):
+    """
+    Reads every distinct diagnosis label from a JSONL file without keeping the consultations.
+
+    Args:
+        path (str): JSONL file whose lines have a 'diagnosis' field.
+
+    Returns:
+        list: The sorted diagnosis labels.
+    """
+    return sorted({diagnosis for _, diagnosis in iter_labelled(path)})
+
+def train_streaming_file(path, output_path, classes=None, chunk_size=10000, epochs=1, n_features=2 ** 20):
+    """
+    Trains a streaming model on a JSONL corpus with memory bounded by the chunk size.
+
+    Args:
+        path (str): JSONL training corpus.
+        output_path (str): Path to save the trained model to.
+        classes (list, optional): Every diagnosis label. Defaults to the labels found by a first pass over the corpus.
+        chunk_size (int, optional): Number of consultations per chunk. Defaults to 10000.
+        epochs (int, optional): Number of passes over the corpus. Defaults to 1.
+        n_features (int, optional): Number of hashed feature columns. Defaults to 2 ** 20.
+
+    Returns:
+        DiagnosisModel: The trained model.
+    """
+    classes = classes or collect_classes(path)
+    model = DiagnosisModel()
+    model.train_streaming(iter_labelled_chunks(path, chunk_size), classes, n_features=n_features)
+    for _ in range(epochs - 1):
+        for X_chunk, y_chunk in iter_labelled_chunks(path, chunk_size):
+            model.partial_train(X_chunk, y_chunk)
+    model.save_model(output_path)
+    return model
+
+def update_model_file(model_path, path, output_path=None, chunk_size=10000):
+    """
+    Folds new labelled consultations into an existing streaming model without a full refit.
+
+    Args:
+        model_path (str): Path to the streaming model to update.
+        path (str): JSONL file of new labelled consultations.
+        output_path (str, optional): Path to save the updated model to. Defaults to model_path.
+        chunk_size (int, optional): Number of consultations per chunk. Defaults to 10000.
+
+    Returns:
+        DiagnosisModel: The updated model.
+
+    Raises:
+        ValueError: If the model is a compact model or not a streaming model.
+    """
+    if is_compact_model(model_path):
+        raise ValueError(f"{model_path} is a compact model; update the streaming model it was exported from")
+    model = DiagnosisModel(model_path=model_path)
+    for X_chunk, y_chunk in iter_labelled_chunks(path, chunk_size):
+        model.partial_train(X_chunk, y_chunk)
+    model.save_model(output_path or model_path)
+    return model
+
+# Default hyperparameter grid searched by search_hyperparameters()
+DEFAULT_GRID = {
+    "tfidf__ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "clf__C": [0.1, 1.0, 10.0],
+    "clf__class_weight": [None, "balanced"],
+}
+
+# Training data of a search worker process, set once per worker by _init_search_worker()
+_search_data = None
+
+def _init_search_worker(X, y, folds):
+    """
+    Stores the dataset and folds in a search worker process.
+
+    With the fork start method the arguments are inherited from the parent instead of
+    being pickled, and in every case they are passed once per worker, not once per task.
+    """
+    global _search_data
+    _search_data = (X, y, folds)
+    # One BLAS thread per worker; the pool already uses every core
+    threadpool_limits(1)
+
+def _evaluate_candidate(task):
+    """
+    Fits and scores one parameter combination on one cross-validation fold in a worker.
+
+    Args:
+        task (tuple): Candidate index, fold index and pipeline parameters.
+
+    Returns:
+        tuple: Candidate index, accuracy and macro-averaged F1 score.
+    """
+    candidate, fold, params = task
+    X, y, folds = _search_data
+    train_index, test_index = folds[fold]
+    model = DiagnosisModel()
+    model.model = model.create_model(**params)
+    model.train(X[train_index].tolist(), y[train_index])
+    predicted = model.model.predict(model.preprocess(X[test_index].tolist()))
+    return (candidate, accuracy_score(y[test_index], predicted),
+            f1_score(y[test_index], predicted, average="macro", zero_division=0))
+
+def search_hyperparameters(X, y, grid=None, n_splits=5, n_jobs=None, random_state=0):
+    """
+    Runs a cross-validated grid search over pipeline parameters in a process pool.
+
+    Every (parameter combination, fold) pair is evaluated as a separate task, spread
+    over n_jobs worker processes that each receive the dataset once.
+
+    Args:
+        X (list): List of training data (e.g., symptoms as text).
+        y (list): List of corresponding labels (e.g., diagnoses).
+        grid (dict, optional): Lists of values per pipeline parameter. Defaults to DEFAULT_GRID.
+        n_splits (int, optional): Number of stratified cross-validation folds. Defaults to 5.
+        n_jobs (int, optional): Number of worker processes. Defaults to the number of CPU cores.
+        random_state (int, optional): Seed for shuffling the folds. Defaults to 0.
+
+    Returns:
+        list: Leaderboard entries with the parameters and the mean and standard deviation of
+              macro F1 and accuracy, best first.
+    """
+    grid = grid or DEFAULT_GRID
+    names = sorted(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    X, y = np.asarray(X, dtype=object), np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X, y))
+    tasks = [(i, fold, params) for i, params in enumerate(candidates) for fold in range(len(folds))]
+
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    scores = [[] for _ in candidates]
+    with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count(), mp_context=context,
+                             initializer=_init_search_worker, initargs=(X, y, folds)) as executor:
+        for candidate, accuracy, f1 in executor.map(_evaluate_candidate, tasks):
+            scores[candidate].append((accuracy, f1))
+
+    leaderboard = []
+    for params, results in zip(candidates, scores):
+        accuracy, f1 = np.array(results).T
+        leaderboard.append({
+            "params": params,
+            "mean_f1_macro": float(f1.mean()),
+            "std_f1_macro": float(f1.std()),
+            "mean_accuracy": float(accuracy.mean()),
+            "std_accuracy": float(accuracy.std()),
+        })
+    leaderboard.sort(key=lambda entry: (-entry["mean_f1_macro"], -entry["mean_accuracy"]))
+    for rank, entry in enumerate(leaderboard, 1):
+        entry["rank"] = rank
+    return leaderboard
+
+def search_file(path, output_path, leaderboard_path, grid=None, n_splits=5, n_jobs=None):
+    """
+    Searches hyperparameters on a JSONL corpus, writes the leaderboard and saves the best model.
+
+    Args:
+        path (str): JSONL training corpus.
+        output_path (str): Path to save the best model, refitted on the whole corpus, to.
+        leaderboard_path (str): Path to write the leaderboard JSON to.
+        grid (dict, optional): Lists of values per pipeline parameter. Defaults to DEFAULT_GRID.
+        n_splits (int, optional): Number of cross-validation folds. Defaults to 5.
+        n_jobs (int, optional): Number of worker processes. Defaults to the number of CPU cores.
+
+    Returns:
+        list: The leaderboard, best first.
+    """
+    X, y = map(list, zip(*iter_labelled(path)))
+    leaderboard = search_hyperparameters(X, y, grid=grid, n_splits=n_splits, n_jobs=n_jobs)
+
+    directory = os.path.dirname(leaderboard_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(leaderboard_path, "w", encoding="utf-8") as f:
+        json.dump(leaderboard, f, indent=2)
+
+    model = DiagnosisModel()
+    model.model = model.create_model(**leaderboard[0]["params"])
+    model.train(X, y)
+    model.save_model(output_path)
+    return leaderboard
+
+def _directory_size(path):
+    """
+    Returns the size of a file, or the total size of the files in a directory, in bytes.
+    """
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+                   if os.path.isfile(os.path.join(path, name)))
+    return os.path.getsize(path)
+
+def _evaluate(model, X, y):
+    """
+    Scores a labelled dataset with a model.
+
+    Returns:
+        tuple: The probability matrix, the predicted labels and evaluation metrics.
+    """
+    start = time.perf_counter()
+    probabilities = model.score_batch(X)
+    seconds = time.perf_counter() - start
+    predicted = model.model.classes_[probabilities.argmax(axis=1)]
+    return probabilities, predicted, {
+        "accuracy": float(accuracy_score(y, predicted)),
+        "f1_macro": float(f1_score(y, predicted, average="macro", zero_division=0)),
+        "score_seconds": seconds,
+    }
+
+def compression_report(original, compressed, X, y):
+    """
+    Compares a compressed model with the pipeline it was exported from on a labelled dataset.
+
+    Args:
+        original (DiagnosisModel): The original model.
+        compressed (DiagnosisModel): The compressed model, loaded from its compact directory.
+        X (list): List of evaluation data (e.g., symptoms as text).
+        y (list): List of corresponding labels (e.g., diagnoses).
+
+    Returns:
+        dict: Accuracy, macro F1 and scoring time of both models, and the accuracy and F1
+              differences, the share of identical predictions and the largest probability difference.
+    """
+    original_proba, original_predicted, original_metrics = _evaluate(original, X, y)
+    compressed_proba, compressed_predicted, compressed_metrics = _evaluate(compressed, X, y)
+    return {
+        "examples": len(X),
+        "original": original_metrics,
+        "compressed": compressed_metrics,
+        "delta": {
+            "accuracy": compressed_metrics["accuracy"] - original_metrics["accuracy"],
+            "f1_macro": compressed_metrics["f1_macro"] - original_metrics["f1_macro"],
+            "agreement": float(np.mean(original_predicted == compressed_predicted)) if len(X) else 1.0,
+            "max_probability_difference": float(np.abs(original_proba - compressed_proba).max()) if len(X) else 0.0,
+        },
+    }
+
+def compress_model_file(model_path, path, output_path, report_path, dtype="int8", prune=0.0):
+    """
+    Exports a trained model as a compressed compact model and writes an accuracy-delta report.
+
+    Args:
+        model_path (str): Path to the trained TF-IDF + linear classifier model.
+        path (str): JSONL file of labelled consultations to evaluate both models on.
+        output_path (str): Directory to export the compressed model to.
+        report_path (str): Path to write the report JSON to.
+        dtype (str, optional): Coefficient storage: "float64", "float32" or "int8". Defaults to "int8".
+        prune (float, optional): Drop coefficients with a smaller magnitude. Defaults to 0.0.
+
+    Returns:
+        dict: The report: compression settings, coefficient and disk sizes, and the
+              evaluation of both models, see compression_report().
+    """
+    original = DiagnosisModel(model_path=model_path)
+    export = original.export_compact(output_path, dtype=dtype, prune=prune)
+    compressed = DiagnosisModel(model_path=output_path)
+
+    X, y = map(list, zip(*iter_labelled(path)))
+    report = {"dtype": dtype, "prune": prune, **compression_report(original, compressed, X, y)}
+    report["original"].update(coefficient_bytes=original.model[-1].coef_.nbytes, disk_bytes=_directory_size(model_path))
+    report["compressed"].update(export, disk_bytes=_directory_size(output_path))
+
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def main(argv=None):
+    """
+    Command-line entry point for training.
+
+    Examples:
+        python -m app.training stream consultations.jsonl -o diagnosis_model.joblib
+        python -m app.training update diagnosis_model.joblib new_consultations.jsonl
+        python -m app.training search consultations.jsonl -o diagnosis_model.joblib
+        python -m app.training compress diagnosis_model.joblib holdout.jsonl -o diagnosis_model_compact --prune 0.05
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description="Train diagnosis models.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stream = commands.add_parser("stream", help="Train a new streaming model from a JSONL corpus in chunks.")
+    stream.add_argument("corpus", help=f"JSONL corpus, relative to {RAW_DATA_DIR} unless it exists as given.")
+    stream.add_argument("-o", "--output", default="diagnosis_model.joblib", help="Path to save the model to.")
+    stream.add_argument("--classes", nargs="+", help="Every diagnosis label. Defaults to a first pass over the corpus.")
+    stream.add_argument("--chunk-size", type=int, default=10000, help="Number of consultations per chunk.")
+    stream.add_argument("--epochs", type=int, default=1, help="Number of passes over the corpus.")
+    stream.add_argument("--n-features", type=int, default=2 ** 20, help="Number of hashed feature columns.")
+
+    update = commands.add_parser("update", help="Fold new labelled consultations into a streaming model.")
+    update.add_argument("model", help="Path to the streaming model to update.")
+    update.add_argument("corpus", help=f"JSONL file of new consultations, relative to {RAW_DATA_DIR} unless it exists as given.")
+    update.add_argument("-o", "--output", help="Path to save the updated model to. Defaults to overwriting the model.")
+    update.add_argument("--chunk-size", type=int, default=10000, help="Number of consultations per chunk.")
+
+    search = commands.add_parser("search", help="Cross-validated hyperparameter search across all CPU cores.")
+    search.add_argument("corpus", help=f"JSONL corpus, relative to {RAW_DATA_DIR} unless it exists as given.")
+    search.add_argument("-o", "--output", default="diagnosis_model.joblib", help="Path to save the best model to.")
+    search.add_argument("--leaderboard", default=os.path.join(PROCESSED_DATA_DIR, "search_leaderboard.json"),
+                        help="Path to write the leaderboard JSON to.")
+    search.add_argument("--ngram-ranges", nargs="+", default=["1,1", "1,2", "1,3"],
+                        help="Word n-gram ranges to try, as min,max.")
+    search.add_argument("--C", nargs="+", type=float, default=[0.1, 1.0, 10.0],
+                        help="Inverse regularization strengths to try.")
+    search.add_argument("--class-weights", nargs="+", default=["none", "balanced"], choices=["none", "balanced"],
+                        help="Class weightings to try.")
+    search.add_argument("--folds", type=int, default=5, help="Number of cross-validation folds.")
+    search.add_argument("--jobs", type=int, help="Number of worker processes. Defaults to the number of CPU cores.")
+
+    compress = commands.add_parser("compress", help="Export a pruned and quantized compact model and "
+                                                    "report its accuracy against the original.")
+    compress.add_argument("model", help="Path to the trained model.")
+    compress.add_argument("corpus", help=f"JSONL evaluation set, relative to {RAW_DATA_DIR} unless it exists as given.")
+    compress.add_argument("-o", "--output", default="diagnosis_model_compact", help="Directory to export the model to.")
+    compress.add_argument("--report", default=os.path.join(PROCESSED_DATA_DIR, "compression_report.json"),
+                          help="Path to write the report JSON to.")
+    compress.add_argument("--dtype", default="int8", choices=["float64", "float32", "int8"],
+                          help="Coefficient storage.")
+    compress.add_argument("--prune", type=float, default=0.0,
+                          help="Drop coefficients whose magnitude is below this threshold.")
+
+    args = parser.parse_args(argv)
+    if args.command == "stream":
+        train_streaming_file(resolve_input(args.corpus), args.output, classes=args.classes,
+                             chunk_size=args.chunk_size, epochs=args.epochs, n_features=args.n_features)
+        print(f"Saved streaming model to {args.output}")
+    elif args.command == "update":
+        update_model_file(args.model, resolve_input(args.corpus), output_path=args.output, chunk_size=args.chunk_size)
+        print(f"Saved updated model to {args.output or args.model}")
+    elif args.command == "search":
+        grid = {
+            "tfidf__ngram_range": [tuple(int(n) for n in r.split(",")) for r in args.ngram_ranges],
+            "clf__C": args.C,
+            "clf__class_weight": [None if w == "none" else w for w in args.class_weights],
+        }
+        leaderboard = search_file(resolve_input(args.corpus), args.output, args.leaderboard,
+                                  grid=grid, n_splits=args.folds, n_jobs=args.jobs)
+        print(f"Best parameters {leaderboard[0]['params']} (macro F1 {leaderboard[0]['mean_f1_macro']:.3f}); "
+              f"saved model to {args.output} and leaderboard to {args.leaderboard}")
+    elif args.command == "compress":
+        report = compress_model_file(args.model, resolve_input(args.corpus), args.output, args.report,
+                                     dtype=args.dtype, prune=args.prune)
+        print(f"Coefficients {report['original']['coefficient_bytes']} -> {report['compressed']['coefficient_bytes']} bytes, "
+              f"accuracy {report['delta']['accuracy']:+.4f}, agreement {report['delta']['agreement']:.4f}; "
+              f"saved model to {args.output} and report to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,121 @@
 import os
-import psycopg2
-import requests
-from dotenv import load_dotenv
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from app.advice import DEFAULT_SNAPSHOT_PATH, AdviceSnapshot, AdviceStore, read_snapshot
+from app.breaker import CircuitBreaker, CircuitOpenError
+from app.cache import TTLCache
+from app.datapack import DEFAULT_DATAPACK_PATH, DataPack
+from app.geo import HospitalIndex, haversine_km
+from app.metrics import metrics
+from app.pool import ConnectionPool
 
-# Load environment variables from .env file
-load_dotenv()
+def connect_postgres():
+    """
+    Opens a new PostgreSQL connection configured from environment variables.
+
+    Returns:
+        psycopg2.extensions.connection: The new connection.
+    """
+    import psycopg2
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD")
+    )
+
+# Fingerprint of the hospitals table (PostgreSQL): a hash of every row, so that any insert,
+# delete or edit of a name, address or coordinates changes it
+HOSPITAL_SIGNATURE_QUERY = """
+SELECT COUNT(*), md5(COALESCE(string_agg(concat_ws('|', name, address, latitude, longitude), E'\\n'
+                                         ORDER BY name, address, latitude, longitude), ''))
+FROM hospitals
+"""
 
 class Database:
     """
     Handles database operations.
+
+    Queries run on connections checked out of a bounded ConnectionPool, one per
+    call, so the instance can be shared between worker threads. Hospital searches
+    are answered from an in-memory HospitalIndex that is kept in sync with the table.
     """
-    def __init__(self):
+    def __init__(self, connect=connect_postgres, max_connections=None, timeout=None, placeholder="%s",
+                 hospital_refresh_interval=None, hospital_signature_query=HOSPITAL_SIGNATURE_QUERY):
+        """
+        Initializes the connection pool. No connection is opened until the first query.
+
+        Args:
+            connect (callable, optional): Function returning a new DB-API connection.
+                                          Defaults to a PostgreSQL connection from environment variables.
+            max_connections (int, optional): Maximum number of pooled connections.
+                                             Defaults to the DB_POOL_SIZE environment variable or 10.
+            timeout (float, optional): Maximum time to wait for a free connection, in seconds.
+                                       Defaults to the DB_POOL_TIMEOUT environment variable or 30.
+            placeholder (str, optional): Parameter placeholder of the DB-API driver. Defaults to "%s".
+            hospital_refresh_interval (float, optional): How often to check the hospitals table for changes,
+                                                         in seconds. Defaults to the HOSPITAL_INDEX_REFRESH
+                                                         environment variable or 300.
+            hospital_signature_query (str, optional): Query returning one row that changes whenever the
+                                                      hospitals table does. None to reload and compare the
+                                                      rows on every check instead, e.g. for databases
+                                                      without md5() and string_agg(). Defaults to
+                                                      HOSPITAL_SIGNATURE_QUERY.
+        """
+        if max_connections is None:
+            max_connections = int(os.environ.get("DB_POOL_SIZE", 10))
+        if timeout is None:
+            timeout = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+        if hospital_refresh_interval is None:
+            hospital_refresh_interval = float(os.environ.get("HOSPITAL_INDEX_REFRESH", 300))
+        self.pool = ConnectionPool(connect, max_connections=max_connections, timeout=timeout)
+        self.placeholder = placeholder
+        self.hospital_refresh_interval = hospital_refresh_interval
+        self.hospital_signature_query = hospital_signature_query
+        self.hospital_index = None
+        self._hospital_lock = threading.Lock()
+        self._hospital_signature = None
+        self._hospital_checked_at = None
+
+    def fetchall(self, query, params=()):
+        """
+        Runs a query on a pooled connection and returns all rows.
+
+        Args:
+            query (str): The SQL query, using %s as the parameter placeholder.
+            params (tuple, optional): The query parameters.
+
+        Returns:
+            list: The result rows.
+        """
+        with self.pool.cursor() as cur:
+            cur.execute(query.replace("%s", self.placeholder), params)
+            return cur.fetchall()
+
+    def execute(self, query, params=()):
+        """
+        Runs a statement that returns no rows, e.g. CREATE TABLE, on a pooled connection.
+
+        Args:
+            query (str): The SQL statement, using %s as the parameter placeholder.
+            params (tuple, optional): The statement parameters.
         """
-        Initializes the database connection.
+        with self.pool.cursor() as cur:
+            cur.execute(query.replace("%s", self.placeholder), params)
+
+    def executemany(self, query, rows):
+        """
+        Runs a statement once per row of parameters, in a single transaction on one pooled connection.
+
+        Args:
+            query (str): The SQL statement, using %s as the parameter placeholder.
+            rows (list): The parameters of each execution.
         """
-        self.conn = psycopg2.connect(
-            host=os.environ.get("DB_HOST"),
-            database=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASSWORD")
-        )
-        self.cur = self.conn.cursor()
+        with self.pool.cursor() as cur:
+            cur.executemany(query.replace("%s", self.placeholder), rows)
 
     def get_advice(self, diagnosis):
         """
@@ -33,9 +128,10 @@ class Database:
             dict: Health advice and its source, or None if not found.
         """
         try:
-            self.cur.execute("SELECT advice, source FROM health_advice WHERE diagnosis = %s", (diagnosis,))
-            result = self.cur.fetchone()
-            if result:
+            with metrics.timer("advice_db"):
+                results = self.fetchall("SELECT advice, source FROM health_advice WHERE diagnosis = %s", (diagnosis,))
+            if results:
+                result = results[0]
                 return {"advice": result[0], "source": result[1]}
             else:
                 return None
@@ -43,54 +139,290 @@ class Database:
             print(f"Error retrieving health advice: {e}")
             return None
 
-    def find_hospitals(self, latitude, longitude):
+    def get_advice_many(self, diagnoses):
+        """
+        Retrieves health advice for several diagnoses in one query.
+
+        Args:
+            diagnoses (iterable): The diagnoses. Duplicates are looked up once.
+
+        Returns:
+            dict: Health advice and its source keyed by diagnosis. Diagnoses without
+                  advice are left out, and an empty dict is returned if an error occurred.
+        """
+        try:
+            return self.fetch_advice(diagnoses)
+        except Exception as e:
+            print(f"Error retrieving health advice: {e}")
+            return {}
+
+    def load_advice(self):
+        """
+        Retrieves every row of the health advice table in one query.
+
+        Returns:
+            list: (diagnosis, advice, source) rows.
+        """
+        with metrics.timer("advice_db"):
+            return self.fetchall("SELECT diagnosis, advice, source FROM health_advice")
+
+    def fetch_advice(self, diagnoses):
+        """
+        Retrieves health advice for several diagnoses in one query, raising on database errors.
+
+        Args:
+            diagnoses (iterable): The diagnoses. Duplicates are looked up once.
+
+        Returns:
+            dict: Health advice and its source keyed by diagnosis; diagnoses without advice are left out.
+        """
+        diagnoses = sorted({str(diagnosis) for diagnosis in diagnoses})
+        if not diagnoses:
+            return {}
+        placeholders = ", ".join(["%s"] * len(diagnoses))
+        with metrics.timer("advice_db"):
+            results = self.fetchall(
+                f"SELECT diagnosis, advice, source FROM health_advice WHERE diagnosis IN ({placeholders})",
+                tuple(diagnoses))
+        return {result[0]: {"advice": result[1], "source": result[2]} for result in results}
+
+    def find_hospitals(self, latitude, longitude, limit=10, radius_km=None):
         """
         Finds nearby medical institutions based on the location.
 
         Args:
             latitude (float): The latitude of the location.
             longitude (float): The longitude of the location.
+            limit (int, optional): Maximum number of institutions to return. Defaults to 10.
+            radius_km (float, optional): Only return institutions within this distance. Defaults to None (no limit).
 
         Returns:
-            list: List of nearby medical institutions, or an empty list if none found or an error occurred.
+            list: List of nearby medical institutions with their distance in kilometres, sorted by distance,
+                  or an empty list if none found or an error occurred.
         """
-        # This is a placeholder for a more complex query that might involve
-        # calculating distances and filtering based on proximity.
-        # For now, it just returns a list of all hospitals in the database.
         try:
-            self.cur.execute("SELECT name, address, latitude, longitude FROM hospitals")
-            results = self.cur.fetchall()
-            hospitals = []
-            for result in results:
-                hospitals.append({
-                    "name": result[0],
-                    "address": result[1],
-                    "latitude": result[2],
-                    "longitude": result[3],
-                    # In a real application, you'd calculate the distance
-                    "distance": 0  # Placeholder for distance calculation
-                })
-            return hospitals
+            return self.get_hospital_index().nearest(latitude, longitude, k=limit, radius_km=radius_km)
         except Exception as e:
             print(f"Error retrieving hospitals: {e}")
             return []
 
+    def load_hospitals(self):
+        """
+        Loads every hospital from the database.
+
+        Returns:
+            list: Hospitals with 'name', 'address', 'latitude' and 'longitude' fields.
+        """
+        results = self.fetchall("SELECT name, address, latitude, longitude FROM hospitals")
+        return [{"name": result[0], "address": result[1], "latitude": result[2], "longitude": result[3]}
+                for result in results]
+
+    def get_hospital_index(self, force_refresh=False):
+        """
+        Returns the hospital index, loading it on first use and refreshing it when the table changed.
+
+        Every hospital_refresh_interval seconds the hospital_signature_query fingerprint of the
+        table is checked; only if it changed are the rows reloaded, and only the differences
+        are applied to the index. If the check fails, the existing index keeps being served.
+
+        Args:
+            force_refresh (bool, optional): Check for changes regardless of the interval. Defaults to False.
+
+        Returns:
+            HospitalIndex: The hospital index.
+        """
+        now = time.monotonic()
+        if (not force_refresh and self.hospital_index is not None
+                and now - self._hospital_checked_at < self.hospital_refresh_interval):
+            return self.hospital_index
+
+        with self._hospital_lock:
+            if (not force_refresh and self.hospital_index is not None
+                    and now - self._hospital_checked_at < self.hospital_refresh_interval):
+                return self.hospital_index
+            try:
+                signature = None
+                if self.hospital_signature_query is not None:
+                    signature = tuple(self.fetchall(self.hospital_signature_query)[0])
+                if self.hospital_index is None:
+                    self.hospital_index = HospitalIndex(self.load_hospitals())
+                elif signature is None or signature != self._hospital_signature:
+                    self.hospital_index.sync(self.load_hospitals())
+                self._hospital_signature = signature
+            except Exception as e:
+                if self.hospital_index is None:
+                    raise
+                print(f"Error refreshing hospital index, serving the previous index: {e}")
+            self._hospital_checked_at = time.monotonic()
+            return self.hospital_index
+
+    def pool_stats(self):
+        """
+        Returns connection pool size and wait-time statistics.
+
+        Returns:
+            dict: See ConnectionPool.stats().
+        """
+        return self.pool.stats()
+
     def close(self):
         """
-        Closes the database connection.
+        Closes the pooled database connections.
         """
-        self.cur.close()
-        self.conn.close()
+        self.pool.close()
+
+# Responses retried by the Google Maps clients
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def normalize_address(address):
+    """
+    Normalizes an address for use as a cache key.
+
+    Args:
+        address (str): The address.
+
+    Returns:
+        str: The case-folded address with runs of whitespace collapsed.
+    """
+    return " ".join(address.casefold().split())
+
+def normalize_symptoms(symptoms, sort=True):
+    """
+    Normalizes symptom text for use as a diagnosis cache key, so that rephrasings such
+    as "fever headache" and "Headache, fever" share one entry.
+
+    Args:
+        symptoms (str): The symptom text.
+        sort (bool, optional): Sort the tokens. Only valid for models that ignore word order.
+                               Defaults to True.
+
+    Returns:
+        str: The case-folded tokens, with punctuation removed, sorted unless sort is False,
+             and joined by single spaces.
+    """
+    text = unicodedata.normalize("NFKC", symptoms).casefold()
+    tokens = re.sub(r"[^\w\s]", " ", text).split()
+    return " ".join(sorted(tokens) if sort else tokens)
 
 class ExternalAPI:
     """
     Handles interactions with external APIs.
+
+    Requests share a keep-alive connection pool and use strict timeouts, bounded
+    retries with exponential backoff and a circuit breaker. Successful responses
+    are cached by normalized address or by rounded coordinates.
     """
-    def __init__(self):
+    def __init__(self, api_key=None, base_url=None, timeout=None, retries=None, backoff_factor=0.3,
+                 pool_size=None, cache_size=4096, geocode_ttl=86400.0, places_ttl=3600.0, coordinate_precision=3,
+                 breaker=None, geocode_cache=None, places_cache=None):
         """
         Initializes the API client.
+
+        Args:
+            api_key (str, optional): Google Maps API key. Defaults to the GOOGLE_MAPS_API_KEY environment variable.
+            base_url (str, optional): Base URL of the Google Maps APIs. Defaults to the GOOGLE_MAPS_BASE_URL
+                                      environment variable or https://maps.googleapis.com/maps/api.
+            timeout (tuple, optional): Connect and read timeouts in seconds. Defaults to the
+                                       GOOGLE_MAPS_CONNECT_TIMEOUT and GOOGLE_MAPS_READ_TIMEOUT
+                                       environment variables or (3.05, 5).
+            retries (int, optional): Retries for connection errors and 429/5xx responses. Defaults to the
+                                     GOOGLE_MAPS_RETRIES environment variable or 2.
+            backoff_factor (float, optional): Exponential backoff factor between retries. Defaults to 0.3.
+            pool_size (int, optional): Maximum number of keep-alive connections. Defaults to the
+                                       GOOGLE_MAPS_POOL_SIZE environment variable or 10.
+            cache_size (int, optional): Maximum number of cached responses per API. Defaults to 4096.
+            geocode_ttl (float, optional): Time-to-live of cached geocodes, in seconds. Defaults to 86400.
+            places_ttl (float, optional): Time-to-live of cached Places results, in seconds. Defaults to 3600.
+            coordinate_precision (int, optional): Decimal places coordinates are rounded to for the Places
+                                                  cache key. Defaults to 3 (about 100 m).
+            breaker (CircuitBreaker, optional): Circuit breaker shared by all requests. Defaults to a new one.
+            geocode_cache (TTLCache, optional): Cache of geocodes, e.g. another client's. Defaults to a new
+                                                one of cache_size entries and geocode_ttl.
+            places_cache (TTLCache, optional): Cache of Places results, e.g. another client's. Defaults to a
+                                               new one of cache_size entries and places_ttl.
+        """
+        self.api_key = api_key if api_key is not None else os.environ.get("GOOGLE_MAPS_API_KEY")
+        self.base_url = (base_url or os.environ.get("GOOGLE_MAPS_BASE_URL")
+                         or "https://maps.googleapis.com/maps/api").rstrip("/")
+        self.timeout = timeout or (float(os.environ.get("GOOGLE_MAPS_CONNECT_TIMEOUT", 3.05)),
+                                   float(os.environ.get("GOOGLE_MAPS_READ_TIMEOUT", 5)))
+        if retries is None:
+            retries = int(os.environ.get("GOOGLE_MAPS_RETRIES", 2))
+        if pool_size is None:
+            pool_size = int(os.environ.get("GOOGLE_MAPS_POOL_SIZE", 10))
+
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.session = None
+        self._session_lock = threading.Lock()
+
+        self.breaker = breaker or CircuitBreaker()
+        self.coordinate_precision = coordinate_precision
+        if geocode_cache is None:
+            geocode_cache = TTLCache(max_size=cache_size, ttl=geocode_ttl)
+        if places_cache is None:
+            places_cache = TTLCache(max_size=cache_size, ttl=places_ttl)
+        self.geocode_cache = geocode_cache
+        self.places_cache = places_cache
+
+    def _create_session(self):
         """
-        self.api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
+        Creates the HTTP session with a keep-alive connection pool and retries.
+
+        Returns:
+            requests.Session: The session.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                      status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(["GET"]), raise_on_status=False)
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry))
+        session.mount("http://", HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry))
+        return session
+
+    def _get_session(self):
+        """
+        Returns the HTTP session, creating it on first use.
+
+        Returns:
+            requests.Session: The session.
+        """
+        if self.session is None:
+            with self._session_lock:
+                if self.session is None:
+                    self.session = self._create_session()
+        return self.session
+
+    def _get_json(self, path, params):
+        """
+        Sends a GET request through the circuit breaker and returns the decoded JSON body.
+
+        Args:
+            path (str): API path relative to base_url, e.g. "geocode/json".
+            params (dict): Query parameters; the API key is added automatically.
+
+        Returns:
+            dict: The decoded response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed after retries.
+            CircuitOpenError: If the circuit breaker rejected the request.
+        """
+        self.breaker.before_call()
+        try:
+            response = self._get_session().get(f"{self.base_url}/{path}", params=dict(params, key=self.api_key),
+                                               timeout=self.timeout)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            data = response.json()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return data
 
     def get_geocode(self, address):
         """
@@ -102,21 +434,37 @@ class ExternalAPI:
         Returns:
             tuple: Latitude and longitude of the address, or None if an error occurred.
         """
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={self.api_key}"
+        import requests
+        key = normalize_address(address)
+        found, location = self.geocode_cache.lookup(key)
+        if found:
+            return location
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            data = response.json()
-            if data['status'] == 'OK':
-                location = data['results'][0]['geometry']['location']
-                return location['lat'], location['lng']
-            else:
-                print(f"Geocoding API error: {data['status']}")
-                return None
-        except requests.exceptions.RequestException as e:
+            with metrics.timer("geocode"):
+                data = self._get_json("geocode/json", {"address": address})
+            return self._geocode_result(key, data)
+        except (requests.exceptions.RequestException, ValueError, CircuitOpenError) as e:
             print(f"Error during Geocoding API request: {e}")
             return None
-        
+
+    def _geocode_result(self, key, data):
+        """
+        Extracts and caches the coordinates from a Geocoding API response.
+
+        Returns:
+            tuple: Latitude and longitude, or None if the address was not found or the API failed.
+        """
+        if data['status'] == 'OK':
+            location = data['results'][0]['geometry']['location']
+            location = location['lat'], location['lng']
+            self.geocode_cache.set(key, location)
+            return location
+        elif data['status'] == 'ZERO_RESULTS':
+            self.geocode_cache.set(key, None)
+            return None
+        else:
+            print(f"Geocoding API error: {data['status']}")
+            return None
 
     def find_nearby_hospitals(self, latitude, longitude, radius=5000):
         """
@@ -130,51 +478,334 @@ class ExternalAPI:
         Returns:
             list: List of nearby hospitals, or an empty list if none found or an error occurred.
         """
-        url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={latitude},{longitude}&radius={radius}&type=hospital&key={self.api_key}"
+        import requests
+        key = self._places_key(latitude, longitude, radius)
+        found, hospitals = self.places_cache.lookup(key)
+        if found:
+            return list(hospitals)
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            if data['status'] == 'OK':
-                hospitals = []
-                for result in data['results']:
-                    hospitals.append({
-                        "name": result['name'],
-                        "address": result['vicinity'],
-                        "latitude": result['geometry']['location']['lat'],
-                        "longitude": result['geometry']['location']['lng'],
-                        "place_id": result['place_id']
-                    })
-                return hospitals
-            else:
-                print(f"Places API error: {data['status']}")
-                return []
-        except requests.exceptions.RequestException as e:
+            with metrics.timer("places"):
+                data = self._get_json("place/nearbysearch/json",
+                                      {"location": f"{latitude},{longitude}", "radius": radius, "type": "hospital"})
+            return self._places_result(key, data)
+        except (requests.exceptions.RequestException, ValueError, CircuitOpenError) as e:
             print(f"Error during Places API request: {e}")
             return []
 
-# Instantiate the database and API
+    def _places_key(self, latitude, longitude, radius):
+        """
+        Returns the Places cache key: the coordinates rounded to coordinate_precision, and the radius.
+        """
+        return round(latitude, self.coordinate_precision), round(longitude, self.coordinate_precision), radius
+
+    def _places_result(self, key, data):
+        """
+        Extracts and caches the hospitals from a Places API response.
+
+        Returns:
+            list: The hospitals, or an empty list if the API failed.
+        """
+        if data['status'] in ('OK', 'ZERO_RESULTS'):
+            hospitals = []
+            for result in data['results']:
+                hospitals.append({
+                    "name": result['name'],
+                    "address": result['vicinity'],
+                    "latitude": result['geometry']['location']['lat'],
+                    "longitude": result['geometry']['location']['lng'],
+                    "place_id": result['place_id']
+                })
+            self.places_cache.set(key, tuple(hospitals))
+            return hospitals
+        else:
+            print(f"Places API error: {data['status']}")
+            return []
+
+    def stats(self):
+        """
+        Returns cache and circuit breaker statistics.
+
+        Returns:
+            dict: Geocode and Places cache statistics and the circuit breaker state.
+        """
+        return {
+            "geocode_cache": self.geocode_cache.stats(),
+            "places_cache": self.places_cache.stats(),
+            "breaker": self.breaker.stats(),
+        }
+
+    def close(self):
+        """
+        Closes the pooled HTTP connections.
+        """
+        session, self.session = self.session, None
+        if session is not None:
+            session.close()
+
+# Instantiate the database and API; no connection is opened until first use
 db = Database()
 api = ExternalAPI()
 
+# Runs the database and Places lookups of a hospital search concurrently
+_lookup_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("LOOKUP_THREADS", 16)),
+                                      thread_name_prefix="hospital-lookup")
+
+# Offline data pack of hospitals and place names, memory-mapped on first use.
+# With OFFLINE_MODE set, hospital searches never call the Places API.
+DATAPACK_PATH = os.environ.get("DATAPACK_PATH", DEFAULT_DATAPACK_PATH)
+OFFLINE_MODE = os.environ.get("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+_datapack = None
+_datapack_lock = threading.Lock()
+
+def get_datapack():
+    """
+    Returns the memory-mapped offline data pack, opening it on first use.
+
+    Returns:
+        DataPack: The data pack, or None if DATAPACK_PATH does not exist or cannot be read.
+    """
+    global _datapack
+    if _datapack is None and os.path.exists(DATAPACK_PATH):
+        with _datapack_lock:
+            if _datapack is None:
+                try:
+                    _datapack = DataPack(DATAPACK_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"Error opening data pack: {e}")
+    return _datapack
+
+def reload_datapack():
+    """
+    Re-opens the offline data pack, e.g. after it was rebuilt.
+
+    Returns:
+        DataPack: The data pack, or None if it is not available.
+    """
+    global _datapack
+    with _datapack_lock:
+        _datapack = None
+    return get_datapack()
+
+def geocode(address):
+    """
+    Converts an address or place name to geographic coordinates.
+
+    The offline gazetteer is consulted first; the Google Geocoding API is only
+    called for names it does not know, and never in offline mode.
+
+    Args:
+        address (str): The address or place name.
+
+    Returns:
+        tuple: Latitude and longitude, or None if the address could not be geocoded.
+    """
+    pack = get_datapack()
+    location = pack.geocode(address) if pack else None
+    if location is None and not OFFLINE_MODE:
+        location = api.get_geocode(address)
+    return location
+
+# Cache of health advice by diagnosis. Diagnoses without advice are cached for
+# a shorter time, so that advice added later (or a transient error) is picked up sooner.
+advice_cache = TTLCache(
+    max_size=int(os.environ.get("ADVICE_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("ADVICE_CACHE_TTL", 3600))
+)
+ADVICE_CACHE_NEGATIVE_TTL = float(os.environ.get("ADVICE_CACHE_NEGATIVE_TTL", 60))
+
+# Advice can be served entirely from memory: from the snapshot file at ADVICE_SNAPSHOT_PATH if it
+# exists (see python -m app.advice), or, with ADVICE_PRELOAD set, from the whole health_advice
+# table loaded in one query. The snapshot is reloaded every ADVICE_REFRESH_INTERVAL seconds.
+ADVICE_SNAPSHOT_PATH = os.environ.get("ADVICE_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+ADVICE_PRELOAD = os.environ.get("ADVICE_PRELOAD", "").lower() in ("1", "true", "yes")
+
+def load_advice_snapshot():
+    """
+    Loads all health advice from the snapshot file, or from the database if ADVICE_PRELOAD is set.
+
+    Returns:
+        AdviceSnapshot: The advice, or None if neither source is configured.
+    """
+    if os.path.exists(ADVICE_SNAPSHOT_PATH):
+        return read_snapshot(ADVICE_SNAPSHOT_PATH)
+    if ADVICE_PRELOAD:
+        return AdviceSnapshot.from_rows(db.load_advice(), source="database")
+    return None
+
+advice_store = AdviceStore(load_advice_snapshot, poll_interval=float(os.environ.get("ADVICE_REFRESH_INTERVAL", 300)))
+
+def _cache_advice(diagnosis, advice):
+    """
+    Stores advice for a diagnosis in the advice cache, using the negative TTL for missing advice.
+    """
+    advice_cache.set(diagnosis, advice, ttl=ADVICE_CACHE_NEGATIVE_TTL if advice is None else None)
+
 def get_health_advice(diagnosis):
     """
     Gets health advice based on the diagnosis.
 
+    Advice is served from the in-memory snapshot if one is configured. Otherwise results,
+    including missing advice, are served from the advice cache when possible.
+
     Args:
         diagnosis (str): The diagnosis.
 
     Returns:
         dict: Health advice from the database or a dummy advice.
     """
-    return db.get_advice(diagnosis)
+    snapshot = advice_store.get()
+    if snapshot is not None:
+        return snapshot.get(diagnosis)
+    found, advice = advice_cache.lookup(diagnosis)
+    if found:
+        return advice
+    advice = db.get_advice(diagnosis)
+    _cache_advice(diagnosis, advice)
+    return advice
+
+def get_health_advice_many(diagnoses):
+    """
+    Gets health advice for several diagnoses with at most one database query.
+
+    Advice is served from the in-memory snapshot if one is configured, and diagnoses
+    found in the advice cache are not queried again.
+
+    Args:
+        diagnoses (iterable): The diagnoses.
+
+    Returns:
+        dict: Health advice keyed by diagnosis; diagnoses without advice are left out.
+    """
+    snapshot = advice_store.get()
+    if snapshot is not None:
+        return snapshot.get_many(diagnoses)
+    advice = {}
+    missing = []
+    for diagnosis in set(diagnoses):
+        found, value = advice_cache.lookup(diagnosis)
+        if not found:
+            missing.append(diagnosis)
+        elif value is not None:
+            advice[diagnosis] = value
+    if missing:
+        fetched = db.get_advice_many(missing)
+        for diagnosis in missing:
+            value = fetched.get(str(diagnosis))
+            _cache_advice(diagnosis, value)
+            if value is not None:
+                advice[diagnosis] = value
+    return advice
+
+def warm_health_advice_cache(diagnoses):
+    """
+    Loads advice for every given diagnosis into the advice cache with one query.
+
+    Typically called at startup with the classes of the loaded model, so that
+    serving advice never needs a database round-trip. Nothing is cached if the query fails.
+
+    Args:
+        diagnoses (iterable): The diagnoses, e.g. the model's classes_.
+
+    Returns:
+        int: The number of diagnoses cached, or 0 if the query failed.
+    """
+    diagnoses = list(diagnoses)
+    try:
+        fetched = db.fetch_advice(diagnoses)
+    except Exception as e:
+        print(f"Error warming health advice cache: {e}")
+        return 0
+    for diagnosis in diagnoses:
+        _cache_advice(diagnosis, fetched.get(str(diagnosis)))
+    return len(diagnoses)
+
+def invalidate_health_advice(diagnosis=None):
+    """
+    Drops cached advice for one diagnosis, or for all diagnoses.
+
+    Args:
+        diagnosis (str, optional): The diagnosis to drop. Defaults to None (drop everything).
+
+    Returns:
+        int: The number of cache entries removed.
+    """
+    return advice_cache.invalidate(diagnosis)
+
+def parse_location(location):
+    """
+    Parses a "latitude,longitude" location.
+
+    Args:
+        location (str): The location.
+
+    Returns:
+        tuple: Latitude and longitude, or None if the location is not a coordinate pair.
+    """
+    try:
+        latitude, longitude = map(float, location.split(','))
+    except ValueError:
+        return None
+    return latitude, longitude
+
+def merge_hospitals(latitude, longitude, hospitals, places):
+    """
+    Adds Places API results to local hospitals, skipping those already known, and sorts by distance.
+
+    Args:
+        latitude (float): The latitude of the search location.
+        longitude (float): The longitude of the search location.
+        hospitals (list): Hospitals from the database or data pack, with their distance in kilometres.
+        places (list): Hospitals from the Places API.
+
+    Returns:
+        list: The merged hospitals sorted by distance in kilometres.
+    """
+    hospitals = list(hospitals)
+    if places:
+        distances = haversine_km(latitude, longitude,
+                                 [place["latitude"] for place in places],
+                                 [place["longitude"] for place in places])
+        known = [(normalize_address(h["name"]), h["latitude"], h["longitude"]) for h in hospitals]
+        for place, distance in zip(places, distances):
+            # Skip Places results that are already in the database
+            name = normalize_address(place["name"])
+            if any(name == known_name and haversine_km(place["latitude"], place["longitude"], [lat], [lng])[0] < 0.1
+                   for known_name, lat, lng in known):
+                continue
+            hospitals.append(dict(place, distance=round(float(distance), 2)))
+    hospitals.sort(key=lambda hospital: hospital["distance"])
+    return hospitals
 
 def find_nearby_hospitals(location):
     """
     Finds nearby medical institutions based on the location.
 
+    When the offline data pack is available it replaces the database lookup, and
+    place names are resolved through its gazetteer without any network access.
+
     Args:
-        location (str): The location (latitude,longitude).
+        location (str): The location (latitude,longitude), or a place name known to the offline data pack.
 
     Returns:
-        list: List of nearby medical institutions from
+        list: List of nearby medical institutions from the database (or data pack) and the Google Places API,
+              sorted by distance in kilometres, or an empty list if the location is invalid.
+    """
+    pack = get_datapack()
+    coordinates = parse_location(location)
+    if coordinates is None:
+        coordinates = pack.geocode(location) if pack else None
+        if coordinates is None:
+            print(f"Invalid location format: {location}")
+            return []
+    latitude, longitude = coordinates
+
+    # Query the local hospitals and the Places API at the same time
+    places_future = None
+    if not OFFLINE_MODE:
+        places_future = _lookup_executor.submit(api.find_nearby_hospitals, latitude, longitude)
+    if pack:
+        hospitals = pack.nearest(latitude, longitude)
+    else:
+        hospitals = db.find_hospitals(latitude, longitude)
+    places = places_future.result() if places_future else []
+    return merge_hospitals(latitude, longitude, hospitals, places)
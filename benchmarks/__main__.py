@@ -0,0 +1,104 @@
+"""
+Runs the benchmark suite or compares two reports.
+
+    python -m benchmarks run -o results.json [--quick]
+    python -m benchmarks compare baseline.json results.json [--tolerance 0.1]
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from benchmarks.common import compare_reports, environment, run_isolated, write_report
+from benchmarks.load_test import bench_load
+from benchmarks.model_bench import bench_model
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+def _float_list(value):
+    return [float(item) for item in value.split(",") if item]
+
+def run(args):
+    """
+    Runs the selected benchmarks, each group in a fresh process, and writes the report.
+    """
+    if args.quick:
+        args.vocab, args.classes, args.count, args.requests = [500], [5], 100, 100
+    config = {key: value for key, value in vars(args).items() if key not in ("func", "output")}
+    # The report may go to standard output, so anything else printed during the run goes to standard error
+    results = []
+    with contextlib.redirect_stdout(sys.stderr):
+        if "model" in args.suites:
+            for vocab_size in args.vocab:
+                for n_classes in args.classes:
+                    print(f"Benchmarking model with vocabulary {vocab_size} and {n_classes} classes", file=sys.stderr)
+                    results.extend(run_isolated(bench_model, vocab_size, n_classes, count=args.count, seed=args.seed))
+        if "http" in args.suites:
+            for mode in args.modes:
+                for db_latency in args.db_latency_ms:
+                    for maps_latency in args.maps_latency_ms:
+                        print(f"Load-testing via {mode} with {db_latency:g} ms database and {maps_latency:g} ms "
+                              f"Google Maps latency", file=sys.stderr)
+                        results.extend(run_isolated(bench_load, mode=mode, count=args.requests,
+                                                    concurrency=args.concurrency, db_latency=db_latency / 1000.0,
+                                                    maps_latency=maps_latency / 1000.0, seed=args.seed))
+    report = {"environment": environment(), "config": config,
+              "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "results": results}
+    write_report(report, args.output)
+    return 0
+
+def compare(args):
+    """
+    Prints the change of every metric between two reports; fails if any regressed beyond the tolerance.
+    """
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare_reports(baseline, current, tolerance=args.tolerance)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<70} {row['metric']:<12} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+              f"{row['change']:>+8.1%} {flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressions", file=sys.stderr)
+    return 1 if regressions else 0
+
+def main(argv=None):
+    """
+    Command-line entry point.
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="AI Checkup benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and write a JSON report.")
+    run_parser.add_argument("-o", "--output", default="-", help="Report path (default: standard output)")
+    run_parser.add_argument("--suites", type=lambda v: v.split(","), default=["model", "http"],
+                            help="Comma-separated suites to run: model,http")
+    run_parser.add_argument("--vocab", type=_int_list, default=[1000, 10000, 50000], help="Vocabulary sizes")
+    run_parser.add_argument("--classes", type=_int_list, default=[10, 100], help="Numbers of classes")
+    run_parser.add_argument("--count", type=int, default=1000, help="Measured predictions per model benchmark")
+    run_parser.add_argument("--modes", type=lambda v: v.split(","), default=["client", "server"],
+                            help="Load-test through the Flask test client and/or a real HTTP server")
+    run_parser.add_argument("--requests", type=int, default=1000, help="Measured requests per endpoint")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    run_parser.add_argument("--db-latency-ms", type=_float_list, default=[2.0], help="Injected database latencies")
+    run_parser.add_argument("--maps-latency-ms", type=_float_list, default=[50.0],
+                            help="Injected Google Maps latencies")
+    run_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    run_parser.add_argument("--quick", action="store_true", help="Small sizes for a smoke run")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare a report against a baseline.")
+    compare_parser.add_argument("baseline", help="Baseline report")
+    compare_parser.add_argument("current", help="New report")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1,
+                                help="Relative change tolerated before a metric is a regression (default: 0.1)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+def percentile(values, q):
+    """
+    Computes a percentile by linear interpolation between the closest ranks.
+
+    Args:
+        values (list): The values; need not be sorted.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process.
+
+    Returns:
+        float: Peak RSS in megabytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def summarize(name, latencies, elapsed, errors=0, **params):
+    """
+    Builds a benchmark result from per-operation latencies.
+
+    Args:
+        name (str): Benchmark name.
+        latencies (list): Latency of each operation, in seconds.
+        elapsed (float): Wall-clock time of the whole run, in seconds.
+        errors (int, optional): Number of failed operations. Defaults to 0.
+        **params: Parameters of the benchmark, recorded in the result.
+
+    Returns:
+        dict: Operation count, errors, throughput in operations per second, mean, p50 and p99 latency
+              in milliseconds, and the parameters.
+    """
+    return {
+        "name": name,
+        "params": params,
+        "count": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": 1000.0 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000.0 * percentile(latencies, 50),
+        "p99_ms": 1000.0 * percentile(latencies, 99),
+    }
+
+def time_calls(func, count, warmup=3):
+    """
+    Calls a function repeatedly and measures each call.
+
+    Args:
+        func (callable): Function taking the call index.
+        count (int): Number of measured calls.
+        warmup (int, optional): Number of unmeasured calls made first. Defaults to 3.
+
+    Returns:
+        tuple: List of call latencies in seconds, and the total elapsed time.
+    """
+    for i in range(warmup):
+        func(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        call_start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+def _isolated_target(conn, func, args, kwargs):
+    try:
+        # Diagnostics printed by the application must not end up in a report written to standard output
+        with contextlib.redirect_stdout(sys.stderr):
+            results = func(*args, **kwargs)
+        peak = peak_rss_mb()
+        for result in results:
+            result["peak_rss_mb"] = peak
+        conn.send((True, results))
+    except BaseException as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def run_isolated(func, *args, **kwargs):
+    """
+    Runs a benchmark function in a fresh interpreter, so that its peak RSS is its own.
+
+    Args:
+        func (callable): Importable function returning a list of result dicts.
+        *args: Positional arguments for func.
+        **kwargs: Keyword arguments for func.
+
+    Returns:
+        list: The results, each with the child's peak_rss_mb added.
+
+    Raises:
+        RuntimeError: If the benchmark failed.
+    """
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_isolated_target, args=(child_conn, func, args, kwargs))
+    process.start()
+    child_conn.close()
+    try:
+        ok, payload = parent_conn.recv()
+    except EOFError:
+        ok, payload = False, f"benchmark process exited with code {process.exitcode}"
+    process.join()
+    if not ok:
+        raise RuntimeError(f"{func.__name__} failed: {payload}")
+    return payload
+
+def environment():
+    """
+    Describes the machine and library versions a report was produced with.
+
+    Returns:
+        dict: Python, platform, CPU count and versions of the main libraries.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    libraries = {}
+    for package in ("numpy", "scikit-learn", "scipy", "flask", "joblib"):
+        try:
+            libraries[package] = version(package)
+        except PackageNotFoundError:
+            libraries[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "libraries": libraries,
+    }
+
+def write_report(report, path):
+    """
+    Writes a report as stable, diff-friendly JSON.
+
+    Args:
+        report (dict): The report.
+        path (str): The output path, or "-" for standard output.
+    """
+    text = json.dumps(report, indent=2, sort_keys=True) + "\n"
+    if path == "-":
+        sys.stdout.write(text)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+# Metrics compared between reports, and whether higher values are better
+COMPARED_METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+def compare_reports(baseline, current, tolerance=0.1):
+    """
+    Compares the results of two reports benchmark by benchmark.
+
+    Args:
+        baseline (dict): The stored baseline report.
+        current (dict): The new report.
+        tolerance (float, optional): Relative change tolerated before a metric counts as
+                                     a regression. Defaults to 0.1 (10%).
+
+    Returns:
+        list: One dict per benchmark and metric present in both reports, with the baseline and
+              current values, the relative change and whether it is a regression.
+    """
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in result or metric not in previous:
+                continue
+            old, new = previous[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            rows.append({"name": result["name"], "metric": metric, "baseline": old, "current": new,
+                         "change": change, "regression": worse > tolerance})
+    return rows
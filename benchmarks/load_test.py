@@ -0,0 +1,213 @@
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+from app import routes, utils
+from app.batching import InferenceBatcher
+from app.main import create_app
+from app.models import DiagnosisModel
+from app.registry import ModelRegistry
+from benchmarks.common import summarize
+from benchmarks.model_bench import make_corpus
+from benchmarks.standins import SIGNATURE_QUERY, MapsServer, create_database, database_connector
+
+# Center of the synthetic hospitals and search locations
+CENTER = (34.05, -118.25)
+
+@contextmanager
+def standin_app(db_latency=0.0, maps_latency=0.0, vocab_size=2000, n_classes=20, seed=0):
+    """
+    Builds the Flask application wired to local stand-ins for Postgres and Google Maps.
+
+    Args:
+        db_latency (float, optional): Time added to every database query, in seconds. Defaults to 0.
+        maps_latency (float, optional): Time added to every Google Maps response, in seconds. Defaults to 0.
+        vocab_size (int, optional): Vocabulary size of the served model. Defaults to 2000.
+        n_classes (int, optional): Number of diagnoses of the served model. Defaults to 20.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Yields:
+        Flask: The application.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir, ExitStack() as stack:
+        X, y = make_corpus(vocab_size, n_classes, seed=seed)
+        model = DiagnosisModel()
+        model.train(X, y)
+        model_path = os.path.join(tmpdir, "model.joblib")
+        model.save_model(model_path)
+
+        db_path = os.path.join(tmpdir, "standin.sqlite3")
+        create_database(db_path, sorted(set(y)), center=CENTER, seed=seed)
+        maps = MapsServer(latency=maps_latency)
+        stack.callback(maps.close)
+
+        database = utils.Database(connect=database_connector(db_path, db_latency), placeholder="?",
+                                  hospital_signature_query=SIGNATURE_QUERY)
+        stack.callback(database.close)
+        api = utils.ExternalAPI(api_key="benchmark", base_url=maps.url, retries=0)
+        stack.callback(api.close)
+        registry = ModelRegistry(model_path, poll_interval=0)
+        registry.warm_up(background=False)
+        batcher = InferenceBatcher(registry.get, max_batch_size=routes.batcher.max_batch_size,
+                                   max_wait_ms=routes.batcher.max_wait * 1000.0)
+        stack.callback(batcher.close)
+
+        for target, name, value in ((utils, "db", database), (utils, "api", api), (utils, "OFFLINE_MODE", False),
+                                    (utils, "get_datapack", lambda: None),
+                                    (routes, "registry", registry), (routes, "batcher", batcher)):
+            stack.enter_context(patch.object(target, name, value))
+        utils.invalidate_health_advice()
+        stack.callback(utils.invalidate_health_advice)
+        yield create_app(background_tasks=False)
+
+def make_payloads(endpoint, count, vocab_size=2000, n_classes=20, seed=0):
+    """
+    Generates reproducible request bodies for an endpoint.
+
+    Args:
+        endpoint (str): "/diagnose" or "/find_hospitals".
+        count (int): Number of requests.
+
+    Returns:
+        list: The JSON request bodies.
+    """
+    if endpoint == "/diagnose":
+        queries = make_corpus(vocab_size, n_classes, n_docs=count, seed=seed + 1)[0]
+        return [{"symptoms": symptoms, "top_k": 3} for symptoms in queries]
+    rng = random.Random(seed)
+    return [{"location": f"{CENTER[0] + rng.uniform(-0.3, 0.3):.5f},{CENTER[1] + rng.uniform(-0.3, 0.3):.5f}"}
+            for _ in range(count)]
+
+def drive(make_sender, payloads, concurrency):
+    """
+    Sends requests from several threads, each thread sending the next payload as soon as it is done.
+
+    Args:
+        make_sender (callable): Function called once per thread, returning a function that sends
+                                one payload and returns True on success. Exceptions count as failures.
+        payloads (list): The payloads to send.
+        concurrency (int): Number of sending threads.
+
+    Returns:
+        tuple: List of request latencies in seconds, number of failed requests, and the elapsed time.
+    """
+    index = itertools.count()
+    lock = threading.Lock()
+
+    def worker():
+        send = make_sender()
+        latencies, errors = [], 0
+        while True:
+            with lock:
+                i = next(index)
+            if i >= len(payloads):
+                return latencies, errors
+            start = time.perf_counter()
+            try:
+                ok = send(payloads[i])
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = [future.result() for future in [executor.submit(worker) for _ in range(concurrency)]]
+    elapsed = time.perf_counter() - start
+    return [latency for latencies, _ in outcomes for latency in latencies], sum(e for _, e in outcomes), elapsed
+
+def response_ok(endpoint, status_code, data):
+    """
+    Checks that a response is a real answer: a diagnosis, or at least one hospital.
+
+    Args:
+        endpoint (str): "/diagnose" or "/find_hospitals".
+        status_code (int): HTTP status of the response.
+        data (dict): Decoded JSON body, or None.
+
+    Returns:
+        bool: True if the request succeeded.
+    """
+    if status_code != 200 or not isinstance(data, dict):
+        return False
+    if endpoint == "/find_hospitals":
+        return bool(data.get("hospitals"))
+    return "diagnosis" in data
+
+@contextmanager
+def _senders(app, mode, endpoint):
+    """
+    Yields a sender factory posting to the endpoint through the test client or a real HTTP server.
+    """
+    if mode == "client":
+        def make_sender():
+            client = app.test_client()
+
+            def send(payload):
+                response = client.post(endpoint, json=payload)
+                return response_ok(endpoint, response.status_code, response.get_json(silent=True))
+            return send
+        yield make_sender
+        return
+
+    import requests
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, name="benchmark-server", daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}{endpoint}"
+    try:
+        def make_sender():
+            session = requests.Session()
+
+            def send(payload):
+                response = session.post(url, json=payload, timeout=30)
+                return response_ok(endpoint, response.status_code, response.json())
+            return send
+        yield make_sender
+    finally:
+        server.shutdown()
+        thread.join()
+
+def bench_load(mode="client", endpoints=("/diagnose", "/find_hospitals"), count=500, concurrency=8,
+               db_latency=0.0, maps_latency=0.0, seed=0):
+    """
+    Load-tests endpoints of the application wired to local stand-ins.
+
+    Args:
+        mode (str, optional): "client" to use the Flask test client, "server" to send real HTTP requests
+                              to a threaded local server. Defaults to "client".
+        endpoints (tuple, optional): Endpoints to test. Defaults to /diagnose and /find_hospitals.
+        count (int, optional): Number of measured requests per endpoint. Defaults to 500.
+        concurrency (int, optional): Number of concurrent clients. Defaults to 8.
+        db_latency (float, optional): Time added to every database query, in seconds. Defaults to 0.
+        maps_latency (float, optional): Time added to every Google Maps response, in seconds. Defaults to 0.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list: One result dict per endpoint.
+    """
+    results = []
+    with standin_app(db_latency=db_latency, maps_latency=maps_latency, seed=seed) as app:
+        for endpoint in endpoints:
+            params = {"mode": mode, "concurrency": concurrency, "db_latency_ms": db_latency * 1000.0,
+                      "maps_latency_ms": maps_latency * 1000.0}
+            name = f"http.{mode}{endpoint}[" + ",".join(f"{key}={value:g}" for key, value in params.items()
+                                                        if key != "mode") + "]"
+            with _senders(app, mode, endpoint) as make_sender:
+                # Warm up caches and indexes with requests that are not measured
+                drive(make_sender, make_payloads(endpoint, concurrency, seed=seed + 100), concurrency)
+                latencies, errors, elapsed = drive(make_sender, make_payloads(endpoint, count, seed=seed),
+                                                   concurrency)
+            results.append(summarize(name, latencies, elapsed, errors=errors, **params))
+    return results
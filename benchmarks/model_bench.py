@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import time
+from app.models import DiagnosisModel
+from benchmarks.common import summarize, time_calls
+
+def make_corpus(vocab_size, n_classes, n_docs=None, doc_length=12, seed=0):
+    """
+    Generates a reproducible synthetic symptom corpus.
+
+    Each class draws most of its words from its own slice of the vocabulary and the
+    rest from the whole vocabulary, so the classes are learnable but overlap.
+
+    Args:
+        vocab_size (int): Number of distinct words.
+        n_classes (int): Number of diagnoses.
+        n_docs (int, optional): Number of documents. Defaults to enough to use most of the vocabulary.
+        doc_length (int, optional): Words per document. Defaults to 12.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        tuple: List of documents and list of their labels.
+    """
+    rng = random.Random(seed)
+    if n_docs is None:
+        n_docs = max(20 * n_classes, vocab_size // 2)
+    words = [f"w{i}" for i in range(vocab_size)]
+    slice_size = max(1, vocab_size // n_classes)
+    X, y = [], []
+    for i in range(n_docs):
+        label = i % n_classes
+        own = words[label * slice_size:(label + 1) * slice_size] or words
+        doc = [rng.choice(own) if rng.random() < 0.6 else rng.choice(words) for _ in range(doc_length)]
+        X.append(" ".join(doc))
+        y.append(f"diagnosis_{label}")
+    return X, y
+
+def bench_model(vocab_size, n_classes, count=500, file_repeat=5, seed=0):
+    """
+    Micro-benchmarks DiagnosisModel.train, predict, predict_proba, save_model and load_model.
+
+    Args:
+        vocab_size (int): Vocabulary size of the synthetic corpus.
+        n_classes (int): Number of diagnoses.
+        count (int, optional): Number of measured predictions. Defaults to 500.
+        file_repeat (int, optional): Number of measured saves and loads. Defaults to 5.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        list: One result dict per benchmarked method.
+    """
+    X, y = make_corpus(vocab_size, n_classes, seed=seed)
+    model = DiagnosisModel()
+    start = time.perf_counter()
+    model.train(X, y)
+    train_seconds = time.perf_counter() - start
+    params = {"vocab_size": vocab_size, "n_classes": n_classes,
+              "fitted_vocab_size": len(model.model.named_steps["tfidf"].vocabulary_)}
+    suffix = f"[vocab={vocab_size},classes={n_classes}]"
+    queries = make_corpus(vocab_size, n_classes, n_docs=count, seed=seed + 1)[0]
+
+    results = [summarize("model.train" + suffix, [train_seconds], train_seconds, **params)]
+    latencies, elapsed = time_calls(lambda i: model.predict(queries[i % count]), count)
+    results.append(summarize("model.predict" + suffix, latencies, elapsed, **params))
+    latencies, elapsed = time_calls(lambda i: model.predict_proba(queries[i % count]), count)
+    results.append(summarize("model.predict_proba" + suffix, latencies, elapsed, **params))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "model.joblib")
+        latencies, elapsed = time_calls(lambda i: model.save_model(path), file_repeat, warmup=1)
+        results.append(summarize("model.save_model" + suffix, latencies, elapsed,
+                                 file_bytes=os.path.getsize(path), **params))
+        latencies, elapsed = time_calls(lambda i: model.load_model(path), file_repeat, warmup=1)
+        results.append(summarize("model.load_model" + suffix, latencies, elapsed, **params))
+    return results
@@ -0,0 +1,135 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class LatencyCursor:
+    """
+    DB-API cursor that waits a fixed time before every query, like a remote database.
+    """
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, query, params=()):
+        time.sleep(self._latency)
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class LatencyConnection:
+    """
+    DB-API connection whose cursors add latency to every query.
+    """
+    def __init__(self, conn, latency):
+        self._conn = conn
+        self._latency = latency
+
+    def cursor(self):
+        return LatencyCursor(self._conn.cursor(), self._latency)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+# Change marker of the hospitals table for Database(hospital_signature_query=...): SQLite has
+# no md5 or ordered string_agg, so the rows are concatenated in table order
+SIGNATURE_QUERY = ("SELECT COUNT(*), group_concat(name || '|' || address || '|' || latitude || '|' || longitude, "
+                   "char(10)) FROM hospitals")
+
+def create_database(path, diagnoses, n_hospitals=1000, center=(34.05, -118.25), spread=0.5, seed=0):
+    """
+    Creates a SQLite stand-in for the Postgres database with advice and hospitals tables.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        diagnoses (list): Diagnoses to create advice for.
+        n_hospitals (int, optional): Number of hospitals. Defaults to 1000.
+        center (tuple, optional): Latitude and longitude the hospitals are spread around.
+        spread (float, optional): Maximum offset from the center, in degrees. Defaults to 0.5.
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE health_advice (diagnosis TEXT PRIMARY KEY, advice TEXT, source TEXT)")
+        conn.execute("CREATE TABLE hospitals (name TEXT, address TEXT, latitude REAL, longitude REAL)")
+        conn.executemany("INSERT INTO health_advice VALUES (?, ?, ?)",
+                         [(diagnosis, f"Advice for {diagnosis}.", "WHO") for diagnosis in diagnoses])
+        conn.executemany("INSERT INTO hospitals VALUES (?, ?, ?, ?)",
+                         [(f"Hospital {i}", f"{i} Main St", center[0] + rng.uniform(-spread, spread),
+                           center[1] + rng.uniform(-spread, spread)) for i in range(n_hospitals)])
+    conn.close()
+
+def database_connector(path, latency=0.0):
+    """
+    Returns a connect function for the SQLite stand-in, usable by Database.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        latency (float, optional): Time added to every query, in seconds. Defaults to 0.
+
+    Returns:
+        callable: Function returning a new connection.
+    """
+    def connect():
+        return LatencyConnection(sqlite3.connect(path, check_same_thread=False), latency)
+    return connect
+
+class _MapsHandler(BaseHTTPRequestHandler):
+    """
+    Answers Geocoding and Places requests with synthetic results after the server's latency.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        time.sleep(self.server.latency)
+        if url.path.endswith("geocode/json"):
+            body = {"status": "OK", "results": [{"geometry": {"location": {"lat": 34.05, "lng": -118.25}}}]}
+        else:
+            latitude, longitude = map(float, query.get("location", ["0,0"])[0].split(","))
+            body = {"status": "OK", "results": [
+                {"name": f"Clinic {i}", "vicinity": f"{i} Side St", "place_id": f"p{i}",
+                 "geometry": {"location": {"lat": latitude + 0.001 * i, "lng": longitude}}}
+                for i in range(5)
+            ]}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class MapsServer:
+    """
+    Local stand-in for the Google Maps APIs with configurable latency.
+    """
+    def __init__(self, latency=0.0):
+        """
+        Starts the server on a free local port.
+
+        Args:
+            latency (float, optional): Time added to every response, in seconds. Defaults to 0.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _MapsHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, name="maps-standin", daemon=True).start()
+
+    def close(self):
+        """
+        Stops the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
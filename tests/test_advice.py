@@ -0,0 +1,161 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from app.advice import AdviceSnapshot, AdviceStore, read_snapshot, write_snapshot
+
+ADVICE = {
+    "cold": {"advice": "Drink plenty of fluids and rest.", "source": "WHO"},
+    "migraine": {"advice": "Rest in a dark room.", "source": "NHS"},
+}
+
+class AdviceSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "advice.json")
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def test_lookup(self):
+        """
+        Test looking up advice for one and for several diagnoses.
+        """
+        snapshot = AdviceSnapshot(ADVICE)
+        self.assertEqual(snapshot.get("cold"), ADVICE["cold"])
+        self.assertIsNone(snapshot.get("flu"))
+        self.assertEqual(snapshot.get_many(["cold", "flu", "cold"]), {"cold": ADVICE["cold"]})
+        self.assertEqual(len(snapshot), 2)
+        self.assertIn("migraine", snapshot)
+
+        # Returned advice is a copy; the snapshot cannot be changed through it
+        snapshot.get("cold")["advice"] = "changed"
+        self.assertEqual(snapshot.get("cold"), ADVICE["cold"])
+
+    def test_version(self):
+        """
+        Test that the version depends on the content only.
+        """
+        rows = [(diagnosis, value["advice"], value["source"]) for diagnosis, value in reversed(ADVICE.items())]
+        self.assertEqual(AdviceSnapshot.from_rows(rows, source="database").version, AdviceSnapshot(ADVICE).version)
+        changed = dict(ADVICE, flu={"advice": "Rest.", "source": "WHO"})
+        self.assertNotEqual(AdviceSnapshot(changed).version, AdviceSnapshot(ADVICE).version)
+
+    def test_snapshot_file(self):
+        """
+        Test writing and reading a snapshot file.
+        """
+        snapshot = AdviceSnapshot(ADVICE, source="database")
+        write_snapshot(snapshot, self.path)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        loaded = read_snapshot(self.path)
+        self.assertEqual(loaded.version, snapshot.version)
+        self.assertEqual(loaded.source, "database")
+        self.assertEqual(loaded.get_many(ADVICE), ADVICE)
+
+        with open(self.path, "w") as f:
+            json.dump({"format_version": 99, "advice": {}}, f)
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
+
+class AdviceStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Serve advice from a mutable source.
+        """
+        self.advice = dict(ADVICE)
+        self.loads = 0
+        self.store = AdviceStore(self.load, poll_interval=60, retry_interval=60)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.store.stop_watching()
+
+    def load(self):
+        self.loads += 1
+        if self.advice is None:
+            raise RuntimeError("database unavailable")
+        return AdviceSnapshot(self.advice)
+
+    def test_lazy_load_and_reload(self):
+        """
+        Test that the snapshot is loaded once and only swapped when the advice changed.
+        """
+        self.assertIsNone(self.store.current)
+        snapshot = self.store.get()
+        self.assertIs(self.store.get(), snapshot)
+        self.assertEqual(self.loads, 1)
+
+        self.assertFalse(self.store.reload())
+        self.assertIs(self.store.get(), snapshot)
+
+        self.advice["flu"] = {"advice": "Rest.", "source": "WHO"}
+        self.assertTrue(self.store.reload())
+        self.assertEqual(self.store.get().get("flu"), {"advice": "Rest.", "source": "WHO"})
+        self.assertIsNone(snapshot.get("flu"))
+        self.assertEqual(self.store.info()["swaps"], 1)
+
+    def test_failed_reload_keeps_snapshot(self):
+        """
+        Test that a failing source keeps the previous snapshot, and is not retried on every call.
+        """
+        snapshot = self.store.get()
+        self.advice = None
+        self.assertFalse(self.store.reload())
+        self.assertIs(self.store.get(), snapshot)
+        self.assertIn("database unavailable", self.store.info()["last_error"])
+
+        store = AdviceStore(self.load, retry_interval=60)
+        self.assertIsNone(store.get())
+        self.assertIsNone(store.get())
+        self.assertEqual(self.loads, 3)
+
+    def test_no_source(self):
+        """
+        Test that a store without a configured source serves nothing.
+        """
+        store = AdviceStore(lambda: None)
+        self.assertIsNone(store.get())
+        self.assertFalse(store.info()["loaded"])
+
+    def test_no_source_without_lock(self):
+        """
+        Test that, between load attempts, a store without advice is read without taking the lock.
+        """
+        store = AdviceStore(lambda: None, retry_interval=60)
+        self.assertIsNone(store.get())
+        store._lock = None  # Any use of the lock would now raise
+        self.assertIsNone(store.get())
+
+    def test_watch(self):
+        """
+        Test that the watcher swaps in changed advice.
+        """
+        self.store.get()
+        swapped = threading.Event()
+        load = self.store.load
+
+        def load_and_signal():
+            snapshot = load()
+            swapped.set()
+            return snapshot
+
+        self.store.load = load_and_signal
+        self.store.poll_interval = 0.01
+        self.advice["flu"] = {"advice": "Rest.", "source": "WHO"}
+        self.store.start_watching()
+        self.assertTrue(swapped.wait(5))
+        self.store.stop_watching()
+        self.assertIn("flu", self.store.get())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import unittest
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+from app import aio, utils
+from app.aio import AsyncDatabase, AsyncExternalAPI, find_nearby_hospitals_async
+from app.breaker import CircuitBreaker
+from tests.test_utils import MockMapsHandler
+
+# SQLite has no md5() or ordered string_agg(), so the tests fingerprint the hospitals table with group_concat()
+SQLITE_SIGNATURE_QUERY = ("SELECT COUNT(*), group_concat(name || '|' || address || '|' || latitude || '|' || longitude, "
+                          "char(10)) FROM hospitals")
+
+class SQLitePool:
+    """
+    Minimal asyncpg-style pool over SQLite, translating $n placeholders to ?n.
+    """
+    def __init__(self, uri):
+        self.conn = sqlite3.connect(uri, uri=True)
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        self.acquired += 1
+        yield self
+
+    async def fetch(self, query, *args):
+        return self.conn.execute(re.sub(r"\$(\d+)", r"?\1", query), args).fetchall()
+
+    async def close(self):
+        self.conn.close()
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        Create an AsyncDatabase backed by a shared in-memory SQLite database instead of PostgreSQL.
+        """
+        uri = f"file:test_aio_{id(self)}?mode=memory&cache=shared"
+        self.keepalive = sqlite3.connect(uri, uri=True)
+        self.keepalive.executescript("""
+            CREATE TABLE health_advice (diagnosis TEXT PRIMARY KEY, advice TEXT, source TEXT);
+            CREATE TABLE hospitals (name TEXT, address TEXT, latitude REAL, longitude REAL);
+            INSERT INTO health_advice VALUES ('cold', 'Drink plenty of fluids and rest.', 'WHO');
+            INSERT INTO health_advice VALUES ('migraine', 'Rest in a dark room.', 'NHS');
+            INSERT INTO hospitals VALUES ('Hospital A', '123 Main St', 34.0522, -118.2437);
+            INSERT INTO hospitals VALUES ('Hospital B', '1 Far Rd', 36.1699, -115.1398);
+        """)
+        self.keepalive.commit()
+
+        async def create_pool(min_size, max_size):
+            self.pool = SQLitePool(uri)
+            return self.pool
+
+        self.db = AsyncDatabase(create_pool=create_pool, hospital_refresh_interval=0,
+                                hospital_signature_query=SQLITE_SIGNATURE_QUERY)
+
+    async def asyncTearDown(self):
+        """
+        Close the pool and the in-memory database.
+        """
+        await self.db.close()
+        self.keepalive.close()
+
+    async def test_get_advice(self):
+        """
+        Test looking up advice for one and for several diagnoses.
+        """
+        self.assertEqual(await self.db.get_advice("cold"), {"advice": "Drink plenty of fluids and rest.", "source": "WHO"})
+        self.assertIsNone(await self.db.get_advice("Invalid Diagnosis"))
+        advice = await self.db.get_advice_many(["cold", "migraine", "cold", "Invalid Diagnosis"])
+        self.assertEqual(set(advice), {"cold", "migraine"})
+
+    async def test_find_hospitals_refresh(self):
+        """
+        Test hospital search and that changes to the table are picked up by the index.
+        """
+        hospitals = await self.db.find_hospitals(34.0522, -118.2437)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital B"])
+        self.keepalive.execute("INSERT INTO hospitals VALUES ('Hospital C', '456 Oak Ave', 34.0622, -118.2437)")
+        self.keepalive.commit()
+        hospitals = await self.db.find_hospitals(34.0522, -118.2437)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital C", "Hospital B"])
+
+    async def test_concurrent_index_load(self):
+        """
+        Test that concurrent searches share a single index load.
+        """
+        self.db.hospital_refresh_interval = 60
+        await asyncio.gather(*(self.db.find_hospitals(34.0, -118.0) for _ in range(20)))
+        # One signature query and one load
+        self.assertEqual(self.pool.acquired, 2)
+
+class TestAsyncExternalAPI(unittest.IsolatedAsyncioTestCase):
+
+    GEOCODE = {"status": "OK", "results": [{"geometry": {"location": {"lat": 34.0522, "lng": -118.2437}}}]}
+
+    def setUp(self):
+        """
+        Start a local mock Google Maps server.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockMapsHandler)
+        self.server.responses = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api = AsyncExternalAPI(api_key="test-key", base_url=f"http://127.0.0.1:{self.server.server_port}",
+                                    timeout=(1, 0.5), retries=2, backoff_factor=0,
+                                    breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    async def asyncTearDown(self):
+        """
+        Stop the mock server.
+        """
+        await self.api.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def test_get_geocode_cached(self):
+        """
+        Test geocoding and that normalized addresses are served from the cache.
+        """
+        self.server.responses.append((200, self.GEOCODE, 0))
+        self.assertEqual(await self.api.get_geocode("1 Main St, Los Angeles"), (34.0522, -118.2437))
+        self.assertEqual(await self.api.get_geocode("1 MAIN st,  los angeles"), (34.0522, -118.2437))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0][1]["key"], ["test-key"])
+
+    def test_shared_with_sync_client(self):
+        """
+        Test that the async client shares the response caches and circuit breaker of the sync client.
+        """
+        self.assertIs(aio.aio_api.geocode_cache, utils.api.geocode_cache)
+        self.assertIs(aio.aio_api.places_cache, utils.api.places_cache)
+        self.assertIs(aio.aio_api.breaker, utils.api.breaker)
+
+    async def test_retry_on_server_error(self):
+        """
+        Test that server errors are retried.
+        """
+        self.server.responses.extend([(503, {}, 0), (200, self.GEOCODE, 0)])
+        self.assertEqual(await self.api.get_geocode("Los Angeles"), (34.0522, -118.2437))
+        self.assertEqual(len(self.server.requests), 2)
+
+    async def test_timeout_and_circuit_breaker(self):
+        """
+        Test that slow responses time out and repeated failures open the circuit.
+        """
+        self.api.retries = 0
+        self.server.responses.extend([(200, self.GEOCODE, 1), (200, self.GEOCODE, 1)])
+        self.assertIsNone(await self.api.get_geocode("Los Angeles"))
+        self.assertIsNone(await self.api.get_geocode("Los Angeles"))
+        self.assertEqual(self.api.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(await self.api.find_nearby_hospitals(34.0522, -118.2437), [])
+        self.assertEqual(len(self.server.requests), 2)
+
+    async def test_cancelled_trial_releases_breaker(self):
+        """
+        Test that a half-open trial call cancelled by a deadline does not leave the circuit stuck.
+        """
+        timer = [0.0]
+        self.api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=lambda: timer[0])
+        self.api.breaker.record_failure()
+        timer[0] = 10
+        self.server.responses.append((200, self.GEOCODE, 1))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(self.api.get_geocode("Los Angeles"), 0.1)
+        self.assertEqual(self.api.breaker.state, CircuitBreaker.OPEN)
+
+        timer[0] = 20
+        self.server.responses.append((200, self.GEOCODE, 0))
+        self.assertEqual(await self.api.get_geocode("Los Angeles"), (34.0522, -118.2437))
+        self.assertEqual(self.api.breaker.state, CircuitBreaker.CLOSED)
+
+class FakeAsyncDatabase:
+    """
+    Async database returning a fixed hospital after an optional delay.
+    """
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.index = aio.HospitalIndex([{"name": "Hospital A", "address": "123 Main St",
+                                         "latitude": 34.0522, "longitude": -118.2437}])
+
+    async def get_hospital_index(self):
+        await asyncio.sleep(self.delay)
+        return self.index
+
+class FakeAsyncAPI:
+    """
+    Async Google Maps client answering after a delay.
+    """
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    async def get_geocode(self, address):
+        await asyncio.sleep(self.delay)
+        return 34.0522, -118.2437
+
+    async def find_nearby_hospitals(self, latitude, longitude):
+        await asyncio.sleep(self.delay)
+        return [{"name": "Hospital P", "address": "9 Side St", "latitude": 34.0622, "longitude": -118.2437,
+                 "place_id": "p"}]
+
+class TestFindNearbyHospitalsAsync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        Search without an offline data pack.
+        """
+        self.patches = [patch.object(aio, 'get_datapack', return_value=None),
+                        patch.object(aio, 'OFFLINE_MODE', False)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        for p in self.patches:
+            p.stop()
+
+    async def test_merges_local_and_places(self):
+        """
+        Test that local and Places results are merged and sorted by distance.
+        """
+        with patch.object(aio, 'aio_db', FakeAsyncDatabase()), patch.object(aio, 'aio_api', FakeAsyncAPI()):
+            hospitals = await find_nearby_hospitals_async("Los Angeles")
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital P"])
+
+    async def test_lookups_run_concurrently(self):
+        """
+        Test that the index load overlaps geocoding, and that many searches share one thread.
+        """
+        threads = threading.active_count()
+        with patch.object(aio, 'aio_db', FakeAsyncDatabase(delay=0.2)), patch.object(aio, 'aio_api', FakeAsyncAPI(delay=0.2)):
+            start = time.monotonic()
+            hospitals = await find_nearby_hospitals_async("Los Angeles")
+            # Geocoding and the index load overlap, then the lookup and Places: two delays, not three
+            self.assertLess(time.monotonic() - start, 0.55)
+            self.assertEqual(len(hospitals), 2)
+
+            start = time.monotonic()
+            results = await asyncio.gather(*(find_nearby_hospitals_async("Los Angeles") for _ in range(200)))
+            self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(all(len(hospitals) == 2 for hospitals in results))
+        self.assertEqual(threading.active_count(), threads)
+
+    async def test_deadline(self):
+        """
+        Test that slow Places results are dropped and a slow local lookup times out.
+        """
+        with patch.object(aio, 'aio_db', FakeAsyncDatabase()), patch.object(aio, 'aio_api', FakeAsyncAPI(delay=1)):
+            hospitals = await find_nearby_hospitals_async("34.0522,-118.2437", timeout=0.1)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A"])
+
+        with patch.object(aio, 'aio_db', FakeAsyncDatabase(delay=1)), patch.object(aio, 'aio_api', FakeAsyncAPI()):
+            with self.assertRaises(asyncio.TimeoutError):
+                await find_nearby_hospitals_async("34.0522,-118.2437", timeout=0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from unittest.mock import patch
+from app import aio, async_routes, routes
+from app.batching import InferenceBatcher
+from app.cache import TTLCache
+from app.main import create_async_app
+from app.models import DiagnosisModel
+from app.registry import ModelRegistry
+from app.utils import invalidate_health_advice
+
+class AsyncRoutesTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """
+        Serve a small trained model from a temporary directory.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        model_path = os.path.join(self.tmpdir.name, "model.joblib")
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat", "stomach pain nausea"], ["migraine", "cold", "gastritis"])
+        model.save_model(model_path)
+
+        async def no_advice(*args):
+            return None
+
+        async def no_advice_many(*args):
+            return {}
+
+        self.registry = ModelRegistry(model_path, poll_interval=0)
+        self.batcher = InferenceBatcher(self.registry.get, max_wait_ms=0)
+        diagnosis_cache = TTLCache(max_size=8)
+        self.patches = [patch.object(routes, 'diagnosis_cache', diagnosis_cache),
+                        patch.object(async_routes, 'diagnosis_cache', diagnosis_cache),
+                        patch.object(async_routes, 'registry', self.registry),
+                        patch.object(async_routes, 'batcher', self.batcher),
+                        patch.object(aio.aio_db, 'get_advice', no_advice),
+                        patch.object(aio.aio_db, 'get_advice_many', no_advice_many)]
+        for p in self.patches:
+            p.start()
+        invalidate_health_advice()
+        self.client = create_async_app(background_tasks=False).test_client()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        for p in self.patches:
+            p.stop()
+        self.batcher.close()
+        self.tmpdir.cleanup()
+
+    async def test_diagnose(self):
+        """
+        Test the diagnosis endpoint.
+        """
+        response = await self.client.post('/diagnose', json={"symptoms": "headache", "top_k": 2})
+        self.assertEqual(response.status_code, 200)
+        data = await response.get_json()
+        self.assertIn(data["diagnosis"], ["migraine", "cold", "gastritis"])
+        self.assertEqual(len(data["probabilities"]), 2)
+        self.assertEqual(data["advice"], routes.DEFAULT_ADVICE)
+
+    async def test_diagnosis_cache(self):
+        """
+        Test that rephrased symptoms are answered from the diagnosis cache.
+        """
+        # Results are cached once the model version is known
+        self.registry.get()
+        first = await (await self.client.post('/diagnose', json={"symptoms": "fever headache"})).get_json()
+        with patch.object(self.batcher, 'submit', side_effect=AssertionError("scored")):
+            response = await self.client.post('/diagnose', json={"symptoms": "Headache, fever."})
+            second = await response.get_json()
+        self.assertEqual(second, first)
+
+        response = await self.client.post('/diagnose/batch', json={"symptoms": ["headache  FEVER", "cough"]})
+        results = (await response.get_json())["results"]
+        self.assertEqual(results[0], first)
+        self.assertEqual(async_routes.diagnosis_cache.stats()["hits"], 2)
+
+    async def test_diagnose_batch(self):
+        """
+        Test the batch diagnosis endpoint.
+        """
+        response = await self.client.post('/diagnose/batch', json={"symptoms": ["headache", "cough"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len((await response.get_json())["results"]), 2)
+
+        response = await self.client.post('/diagnose/batch', json={"symptoms": "headache"})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.client.post('/diagnose/batch', json={"symptoms": ["headache"], "top_k": "2"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_records_forbidden(self):
+        """
+        Test that a user's history is not served or added to without the user's or the admin token.
+        """
+        with patch.dict(os.environ, {"RECORDS_SECRET": "secret", "ADMIN_TOKEN": "admin"}):
+            response = await self.client.get('/records/alice')
+            self.assertEqual(response.status_code, 403)
+            response = await self.client.get('/records/alice', headers={"X-User-Token": routes.user_token("bob")})
+            self.assertEqual(response.status_code, 403)
+
+            # Nor is a consultation added to it
+            with patch.object(async_routes, 'record_consultation') as record_consultation:
+                response = await self.client.post('/diagnose', json={"symptoms": "headache", "user_id": "alice"})
+                self.assertEqual(response.status_code, 403)
+                response = await self.client.post('/diagnose/batch', json={"symptoms": ["headache"], "user_id": "alice"})
+                self.assertEqual(response.status_code, 403)
+            record_consultation.assert_not_called()
+
+    async def test_find_hospitals_timeout(self):
+        """
+        Test that a hospital search missing its deadline returns 504.
+        """
+        async def slow_search(location):
+            raise asyncio.TimeoutError()
+
+        with patch.object(async_routes, 'find_nearby_hospitals_async', slow_search):
+            response = await self.client.post('/find_hospitals', json={"location": "34.0,-118.0"})
+        self.assertEqual(response.status_code, 504)
+
+if __name__ == '__main__':
+    unittest.main()
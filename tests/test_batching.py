@@ -0,0 +1,65 @@
+import unittest
+from app.batching import InferenceBatcher
+from app.models import DiagnosisModel
+
+class InferenceBatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.model = DiagnosisModel()
+        self.model.train(["headache fever", "cough sore throat", "stomach pain nausea"],
+                         ["migraine", "cold", "gastritis"])
+        self.batcher = InferenceBatcher(self.model, max_batch_size=4, max_wait_ms=50)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.batcher.close()
+
+    def test_predict_with_proba_matches_model(self):
+        """
+        Test that a batched prediction matches an unbatched one.
+        """
+        result = self.batcher.predict_with_proba("headache", top_k=2, timeout=5)
+        self.assertEqual(result, self.model.predict_with_proba("headache", top_k=2))
+
+    def test_concurrent_requests_are_batched(self):
+        """
+        Test that concurrent requests are scored together and each caller gets its own result.
+        """
+        symptoms = ["headache", "cough", "nausea", "fever"] * 2
+        futures = [self.batcher.submit(s) for s in symptoms]
+        results = [future.result(timeout=5) for future in futures]
+
+        for s, result in zip(symptoms, results):
+            self.assertEqual(result, self.model.predict_with_proba(s))
+
+        stats = self.batcher.stats()
+        self.assertEqual(stats["requests"], len(symptoms))
+        self.assertLessEqual(stats["max_batch_size"], 4)
+        self.assertLess(stats["batches"], len(symptoms))
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_scoring_error_is_raised_to_caller(self):
+        """
+        Test that an error while scoring is propagated to every caller in the batch.
+        """
+        untrained = InferenceBatcher(DiagnosisModel(), max_wait_ms=0)
+        try:
+            with self.assertRaises(Exception):
+                untrained.predict_with_proba("headache", timeout=5)
+        finally:
+            untrained.close()
+
+    def test_submit_after_close(self):
+        """
+        Test that the batcher rejects requests once closed.
+        """
+        self.batcher.close()
+        with self.assertRaises(RuntimeError):
+            self.batcher.submit("headache")
+
+if __name__ == '__main__':
+    unittest.main()
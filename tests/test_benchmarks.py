@@ -0,0 +1,111 @@
+import unittest
+import contextlib
+import io
+import json
+from unittest.mock import patch
+from benchmarks import __main__ as benchmarks_main
+from benchmarks.common import compare_reports, percentile, run_isolated, summarize
+from benchmarks.load_test import bench_load, make_payloads, response_ok, standin_app
+from benchmarks.model_bench import bench_model, make_corpus
+
+class BenchmarksTestCase(unittest.TestCase):
+
+    def test_percentile(self):
+        """
+        Test percentiles interpolated between ranks.
+        """
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertAlmostEqual(percentile(list(range(101)), 99), 99)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summarize(self):
+        """
+        Test that a result reports throughput and latency percentiles in milliseconds.
+        """
+        result = summarize("op", [0.001, 0.002, 0.003], 0.5, errors=1, size=10)
+        self.assertEqual(result["count"], 3)
+        self.assertEqual(result["errors"], 1)
+        self.assertAlmostEqual(result["throughput"], 6.0)
+        self.assertAlmostEqual(result["p50_ms"], 2.0)
+        self.assertEqual(result["params"], {"size": 10})
+
+    def test_compare_reports(self):
+        """
+        Test that only changes beyond the tolerance in the bad direction are regressions.
+        """
+        baseline = {"results": [{"name": "a", "throughput": 100.0, "p50_ms": 10.0, "p99_ms": 20.0},
+                                {"name": "gone", "throughput": 1.0}]}
+        current = {"results": [{"name": "a", "throughput": 80.0, "p50_ms": 9.0, "p99_ms": 21.0},
+                               {"name": "new", "throughput": 1.0}]}
+        rows = {row["metric"]: row for row in compare_reports(baseline, current, tolerance=0.1)}
+        self.assertEqual(set(rows), {"throughput", "p50_ms", "p99_ms"})
+        self.assertTrue(rows["throughput"]["regression"])
+        self.assertFalse(rows["p50_ms"]["regression"])
+        self.assertFalse(rows["p99_ms"]["regression"])
+
+    def test_make_corpus_reproducible(self):
+        """
+        Test that the synthetic corpus depends only on its seed.
+        """
+        self.assertEqual(make_corpus(100, 4, n_docs=20, seed=1), make_corpus(100, 4, n_docs=20, seed=1))
+        X, y = make_corpus(100, 4, n_docs=20)
+        self.assertEqual(len(set(y)), 4)
+
+    def test_bench_model_isolated(self):
+        """
+        Test the model micro-benchmarks in a separate process.
+        """
+        results = run_isolated(bench_model, 200, 3, count=10, file_repeat=1)
+        names = [result["name"].split("[")[0] for result in results]
+        self.assertEqual(names, ["model.train", "model.predict", "model.predict_proba",
+                                 "model.save_model", "model.load_model"])
+        self.assertTrue(all(result["peak_rss_mb"] > 0 for result in results))
+
+    def test_bench_load(self):
+        """
+        Test load-testing both endpoints through the test client against the stand-ins.
+        """
+        results = bench_load(mode="client", count=20, concurrency=4, db_latency=0.001, maps_latency=0.005)
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertEqual(result["count"], 20)
+            self.assertEqual(result["errors"], 0)
+            self.assertGreater(result["throughput"], 0)
+
+    def test_standin_hospitals(self):
+        """
+        Test that the stand-in application finds hospitals in the stand-in database, not only Places results.
+        """
+        with standin_app(vocab_size=200, n_classes=3) as app:
+            response = app.test_client().post('/find_hospitals', json=make_payloads('/find_hospitals', 1)[0])
+        hospitals = response.get_json()["hospitals"]
+        self.assertTrue(any("place_id" not in hospital for hospital in hospitals))
+
+    def test_response_ok(self):
+        """
+        Test that error responses and empty hospital lists count as failed requests.
+        """
+        self.assertTrue(response_ok("/diagnose", 200, {"diagnosis": "flu"}))
+        self.assertFalse(response_ok("/diagnose", 500, {"error": "Model not loaded"}))
+        self.assertTrue(response_ok("/find_hospitals", 200, {"hospitals": [{"name": "A"}]}))
+        self.assertFalse(response_ok("/find_hospitals", 200, {"hospitals": []}))
+        self.assertFalse(response_ok("/find_hospitals", 200, None))
+
+    def test_run_report_on_stdout(self):
+        """
+        Test that a report written to standard output is not mixed with application output.
+        """
+        def noisy_benchmark(func, *args, **kwargs):
+            print("Error retrieving hospitals: boom")
+            return [summarize(func.__name__, [0.001], 0.001)]
+
+        stdout = io.StringIO()
+        with patch.object(benchmarks_main, 'run_isolated', noisy_benchmark), contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(io.StringIO()):
+            benchmarks_main.main(["run", "--quick", "--suites", "http", "--modes", "client",
+                                  "--db-latency-ms", "0", "--maps-latency-ms", "0"])
+        report = json.loads(stdout.getvalue())
+        self.assertEqual([result["name"] for result in report["results"]], ["bench_load"])
+
+if __name__ == '__main__':
+    unittest.main()
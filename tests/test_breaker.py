@@ -0,0 +1,78 @@
+import unittest
+from app.breaker import CircuitBreaker, CircuitOpenError
+
+class FakeTimer:
+    """
+    Manually advanced clock for reset timeout tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.timer = FakeTimer()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=self.timer)
+
+    def test_opens_after_consecutive_failures(self):
+        """
+        Test that the breaker opens after the failure threshold and rejects calls.
+        """
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_half_open_trial(self):
+        """
+        Test that a single trial call is allowed after the reset timeout.
+        """
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.timer.now = 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        # A failed trial opens the breaker again
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        # A successful trial closes it
+        self.timer.now = 20
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.stats()["times_opened"], 2)
+
+    def test_abandoned_trial(self):
+        """
+        Test that a trial call that never reports back is abandoned after the trial timeout.
+        """
+        self.breaker.trial_timeout = 5
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.timer.now = 10
+        self.breaker.before_call()
+        self.timer.now = 14
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.timer.now = 15
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import json
+import os
+import tempfile
+from app.bulk_score import iter_chunks, score_file
+from app.models import DiagnosisModel
+
+class BulkScoreTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.model = DiagnosisModel()
+        self.model.train(["headache fever", "cough sore throat", "stomach pain nausea"],
+                         ["migraine", "cold", "gastritis"])
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, "raw", "reports.jsonl")
+        self.output_path = os.path.join(self.tmpdir.name, "processed", "reports.jsonl")
+        os.makedirs(os.path.dirname(self.input_path))
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def test_iter_chunks(self):
+        """
+        Test splitting lines into fixed-size chunks.
+        """
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+    def test_score_file(self):
+        """
+        Test scoring a JSONL file in chunks.
+        """
+        reports = [{"id": i, "symptoms": s} for i, s in enumerate(["headache", "cough", "nausea"] * 3)]
+        with open(self.input_path, "w") as f:
+            for report in reports:
+                f.write(json.dumps(report) + "\n")
+            f.write("\n")
+
+        count = score_file(self.model, self.input_path, self.output_path, chunk_size=2, top_k=1)
+        self.assertEqual(count, len(reports))
+
+        with open(self.output_path) as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual([r["id"] for r in results], [r["id"] for r in reports])
+        for result in results:
+            self.assertEqual(result["diagnosis"], self.model.predict(result["symptoms"]))
+            self.assertEqual(list(result["probabilities"]), [result["diagnosis"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from app.cache import TTLCache
+
+class FakeTimer:
+    """
+    Manually advanced clock for expiry tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TTLCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.timer = FakeTimer()
+        self.cache = TTLCache(max_size=2, ttl=10, timer=self.timer)
+
+    def test_hit_and_miss(self):
+        """
+        Test hits, misses and cached None values.
+        """
+        self.assertEqual(self.cache.lookup("a"), (False, None))
+        self.cache.set("a", 1)
+        self.cache.set("b", None)
+        self.assertEqual(self.cache.lookup("a"), (True, 1))
+        self.assertEqual(self.cache.lookup("b"), (True, None))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entry is evicted when full.
+        """
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """
+        Test that entries expire after the default or per-entry TTL.
+        """
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=1)
+        self.timer.now = 5
+        self.assertEqual(self.cache.lookup("b"), (False, None))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.timer.now = 10
+        self.assertEqual(self.cache.lookup("a"), (False, None))
+        self.assertEqual(self.cache.stats()["expirations"], 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        """
+        Test removing one entry or all entries.
+        """
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.assertEqual(self.cache.invalidate("a"), 1)
+        self.assertEqual(self.cache.invalidate("a"), 0)
+        self.assertEqual(self.cache.invalidate(), 1)
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
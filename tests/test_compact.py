@@ -0,0 +1,175 @@
+import unittest
+import json
+import os
+import tempfile
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from app.compact import CompactScorer, export_pipeline, is_compact_model
+from app.models import DiagnosisModel
+
+X_TRAIN = ["headache fever", "cough sore throat", "stomach pain nausea", "fever cough chills",
+           "Nausea, vomiting and diarrhoea", "sore throat fever", "severe headache light sensitivity"]
+Y_TRAIN = ["migraine", "cold", "gastritis", "flu", "gastritis", "cold", "migraine"]
+X_TEST = ["headache", "fever and cough", "Stomach pain!", "unknown words only", "", "café fièvre headache headache"]
+
+class CompactScorerTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "compact")
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def assert_reproduces(self, pipeline, X_train, y_train):
+        """
+        Fits a pipeline, exports it and checks that the compact scorer matches it.
+        """
+        pipeline.fit(X_train, y_train)
+        export_pipeline(pipeline, self.path)
+        scorer = CompactScorer(self.path)
+        np.testing.assert_allclose(scorer.predict_proba(X_TEST), pipeline.predict_proba(X_TEST), rtol=1e-10, atol=1e-12)
+        np.testing.assert_array_equal(scorer.predict(X_TEST), pipeline.predict(X_TEST))
+        np.testing.assert_array_equal(scorer.classes_, pipeline.classes_)
+        self.assertEqual(scorer.vocabulary_size, len(pipeline.steps[0][1].vocabulary_))
+
+    def test_default_pipeline(self):
+        """
+        Test the model's default TF-IDF + logistic regression pipeline.
+        """
+        self.assert_reproduces(DiagnosisModel().create_model(), X_TRAIN, Y_TRAIN)
+
+    def test_vectorizer_options(self):
+        """
+        Test n-grams, stop words, accent stripping and sublinear TF.
+        """
+        pipeline = Pipeline([
+            ('tfidf', TfidfVectorizer(ngram_range=(1, 3), stop_words="english", strip_accents="unicode",
+                                      sublinear_tf=True)),
+            ('clf', LogisticRegression(C=10))
+        ])
+        self.assert_reproduces(pipeline, X_TRAIN, Y_TRAIN)
+
+    def test_binary_and_char_analyzer(self):
+        """
+        Test a two-class model with a character analyzer and binary counts.
+        """
+        pipeline = Pipeline([
+            ('tfidf', TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), binary=True, norm="l1")),
+            ('clf', LogisticRegression())
+        ])
+        self.assert_reproduces(pipeline, X_TRAIN, ["urgent" if "fever" in x else "routine" for x in X_TRAIN])
+
+    def test_diagnosis_model_round_trip(self):
+        """
+        Test exporting a DiagnosisModel and loading it back as a compact model.
+        """
+        model = DiagnosisModel()
+        model.train(X_TRAIN, Y_TRAIN)
+        model.export_compact(self.path)
+        self.assertTrue(is_compact_model(self.path))
+
+        loaded = DiagnosisModel(model_path=self.path)
+        self.assertIsInstance(loaded.model, CompactScorer)
+        for symptoms in X_TEST:
+            diagnosis, probabilities = loaded.predict_with_proba(symptoms)
+            expected_diagnosis, expected_probabilities = model.predict_with_proba(symptoms)
+            self.assertEqual(diagnosis, expected_diagnosis)
+            np.testing.assert_allclose(list(probabilities.values()), list(expected_probabilities.values()))
+
+    def test_read_only(self):
+        """
+        Test that training a compact model is refused.
+        """
+        model = DiagnosisModel()
+        model.train(X_TRAIN, Y_TRAIN)
+        model.export_compact(self.path)
+
+        loaded = DiagnosisModel(model_path=self.path)
+        with self.assertRaises(TypeError):
+            loaded.train(X_TRAIN, Y_TRAIN)
+
+    def test_reexport_keeps_served_model(self):
+        """
+        Test that exporting over a served directory replaces it without changing the loaded scorer.
+        """
+        pipeline = DiagnosisModel().create_model()
+        pipeline.fit(X_TRAIN, Y_TRAIN)
+        export_pipeline(pipeline, self.path)
+        served = CompactScorer(self.path)
+        expected = served.predict_proba(X_TEST)
+
+        retrained = DiagnosisModel().create_model()
+        retrained.fit(X_TRAIN[:2] + ["rash itching skin"], Y_TRAIN[:2] + ["eczema"])
+        export_pipeline(retrained, self.path, dtype="int8", prune=0.1)
+        np.testing.assert_array_equal(served.predict_proba(X_TEST), expected)
+        self.assertIn("eczema", CompactScorer(self.path).classes_)
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ["compact"])
+
+    def test_quantized_coefficients(self):
+        """
+        Test float32 and int8 coefficient storage.
+        """
+        pipeline = DiagnosisModel().create_model()
+        pipeline.fit(X_TRAIN, Y_TRAIN)
+        expected = pipeline.predict_proba(X_TEST)
+
+        stats = export_pipeline(pipeline, self.path, dtype="float32")
+        self.assertEqual(stats["coefficient_bytes"], pipeline.steps[-1][1].coef_.nbytes // 2)
+        np.testing.assert_allclose(CompactScorer(self.path).predict_proba(X_TEST), expected, rtol=1e-5)
+
+        stats = export_pipeline(pipeline, self.path, dtype="int8")
+        self.assertLess(stats["coefficient_bytes"], pipeline.steps[-1][1].coef_.nbytes // 4)
+        scorer = CompactScorer(self.path)
+        self.assertEqual(scorer.coefficients["dtype"], "int8")
+        np.testing.assert_allclose(scorer.predict_proba(X_TEST), expected, atol=0.01)
+        np.testing.assert_array_equal(scorer.predict(X_TEST), pipeline.predict(X_TEST))
+
+        with self.assertRaises(ValueError):
+            export_pipeline(pipeline, self.path, dtype="float16")
+
+    def test_pruned_coefficients(self):
+        """
+        Test that pruned models score like the pipeline with the small coefficients zeroed.
+        """
+        pipeline = DiagnosisModel().create_model()
+        pipeline.fit(X_TRAIN, Y_TRAIN)
+        stats = export_pipeline(pipeline, self.path, prune=0.1)
+        self.assertFalse(os.path.exists(os.path.join(self.path, "coef_t.npy")))
+
+        clf = pipeline.steps[-1][1]
+        clf.coef_[np.abs(clf.coef_) < 0.1] = 0.0
+        self.assertEqual(stats["coefficients"], np.count_nonzero(clf.coef_))
+        self.assertEqual(stats["empty_terms"], int((~clf.coef_.any(axis=0)).sum()))
+        scorer = CompactScorer(self.path)
+        np.testing.assert_allclose(scorer.predict_proba(X_TEST), pipeline.predict_proba(X_TEST), rtol=1e-10, atol=1e-12)
+
+        # Pruning and quantization combined
+        export_pipeline(pipeline, self.path, dtype="int8", prune=0.1)
+        np.testing.assert_array_equal(CompactScorer(self.path).predict(X_TEST), pipeline.predict(X_TEST))
+
+    def test_format_version_1(self):
+        """
+        Test that directories written before coefficient compression still load.
+        """
+        pipeline = DiagnosisModel().create_model()
+        pipeline.fit(X_TRAIN, Y_TRAIN)
+        export_pipeline(pipeline, self.path)
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["format_version"] = 1
+        del meta["coefficients"]
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        np.testing.assert_allclose(CompactScorer(self.path).predict_proba(X_TEST), pipeline.predict_proba(X_TEST))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import random
+import tempfile
+from app.datapack import DataPack, build_datapack, normalize_place_name
+from app.geo import haversine_km
+
+class DataPackTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Build a data pack from random hospitals and a small gazetteer.
+        """
+        rng = random.Random(0)
+        self.hospitals = [
+            {"name": f"Hôpital {i}", "address": f"{i} Rue Principale",
+             "latitude": rng.uniform(-60, 60), "longitude": rng.uniform(-180, 180)}
+            for i in range(300)
+        ]
+        self.places = [
+            {"name": "Nairobi", "latitude": "-1.2864", "longitude": "36.8172"},
+            {"name": "Los Angeles, CA", "latitude": "34.0522", "longitude": "-118.2437"},
+            {"name": "القاهرة", "latitude": "30.0444", "longitude": "31.2357"},
+            {"name": "nairobi", "latitude": "0", "longitude": "0"},
+        ]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "processed", "offline.pack")
+        self.counts = build_datapack(self.hospitals, self.places, self.path)
+        self.pack = DataPack(self.path)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        del self.pack
+        self.tmpdir.cleanup()
+
+    def test_counts(self):
+        """
+        Test that every hospital and distinct place name is written.
+        """
+        self.assertEqual(self.counts, (300, 3))
+        self.assertEqual(len(self.pack), 300)
+        self.assertEqual(self.pack.place_count, 3)
+
+    def test_nearest_matches_brute_force(self):
+        """
+        Test that nearest hospitals match a full scan, including the string fields.
+        """
+        for latitude, longitude in [(0, 0), (59, 179), (-10, -170)]:
+            distances = haversine_km(latitude, longitude,
+                                     [h["latitude"] for h in self.hospitals], [h["longitude"] for h in self.hospitals])
+            expected = [h for _, h in sorted(zip(distances, self.hospitals), key=lambda item: item[0])][:5]
+            results = self.pack.nearest(latitude, longitude, k=5)
+            self.assertEqual([h["name"] for h in results], [h["name"] for h in expected])
+            self.assertEqual(results[0]["address"], expected[0]["address"])
+
+    def test_nearest_within_radius(self):
+        """
+        Test that a radius limits the results.
+        """
+        results = self.pack.nearest(0, 0, k=None, radius_km=1500)
+        self.assertTrue(results)
+        self.assertTrue(all(h["distance"] <= 1500 for h in results))
+        self.assertEqual(self.pack.nearest(0, 0, k=0), [])
+
+    def test_geocode(self):
+        """
+        Test gazetteer lookups of normalized place names.
+        """
+        self.assertEqual(self.pack.geocode("  NAIROBI "), (-1.2864, 36.8172))
+        self.assertEqual(self.pack.geocode("los angeles ca"), (34.0522, -118.2437))
+        self.assertEqual(self.pack.geocode("القاهرة"), (30.0444, 31.2357))
+        self.assertIsNone(self.pack.geocode("Atlantis"))
+        self.assertEqual(normalize_place_name("Los  Angeles, CA"), "los angeles ca")
+
+    def test_invalid_file(self):
+        """
+        Test that a file that is not a data pack is rejected.
+        """
+        path = os.path.join(self.tmpdir.name, "bogus.pack")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            DataPack(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import gzip
+import json
+import os
+import tempfile
+import numpy as np
+from flask import Flask, jsonify, request
+from app import encoding
+from app.encoding import AssetCache, compress, dumps, filter_probabilities, negotiate_encoding
+
+class EncodingTestCase(unittest.TestCase):
+    def test_dumps(self):
+        """
+        Test that NumPy values are serialized compactly, keeping key order.
+        """
+        data = {"cold": np.float64(0.75), "flu": np.float64(0.25), "counts": np.array([1, 2])}
+        self.assertEqual(json.loads(dumps(data)), {"cold": 0.75, "flu": 0.25, "counts": [1, 2]})
+        self.assertEqual(list(json.loads(dumps(data))), ["cold", "flu", "counts"])
+        self.assertNotIn(b" ", dumps(data))
+
+    def test_filter_probabilities(self):
+        """
+        Test top-k and threshold filtering of a probability map.
+        """
+        probabilities = {"cold": 0.6, "flu": 0.3, "migraine": 0.1}
+        self.assertIs(filter_probabilities(probabilities), probabilities)
+        self.assertEqual(filter_probabilities(probabilities, top_k=2), {"cold": 0.6, "flu": 0.3})
+        self.assertEqual(filter_probabilities(probabilities, min_probability=0.2), {"cold": 0.6, "flu": 0.3})
+        self.assertEqual(filter_probabilities(probabilities, top_k=1, min_probability=0.2), {"cold": 0.6})
+
+    def test_negotiate_encoding(self):
+        """
+        Test content encoding negotiation.
+        """
+        self.assertEqual(negotiate_encoding(None), "identity")
+        self.assertEqual(negotiate_encoding("deflate"), "identity")
+        self.assertEqual(negotiate_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=0"), "identity")
+        self.assertEqual(negotiate_encoding("*"), "br" if encoding.brotli else "gzip")
+        self.assertEqual(negotiate_encoding("br;q=1.0, gzip;q=0.5"), "br" if encoding.brotli else "gzip")
+
+    def test_compress(self):
+        """
+        Test that gzip output is deterministic and round-trips.
+        """
+        body = b'{"diagnosis":"cold"}' * 100
+        self.assertEqual(gzip.decompress(compress(body, "gzip")), body)
+        self.assertEqual(compress(body, "gzip"), compress(body, "gzip"))
+        self.assertIs(compress(body, "identity"), body)
+
+class AssetCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Serve a small web client from a temporary directory.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.page = "<html><body>" + "<p>AI Checkup</p>" * 200 + "</body></html>"
+        with open(os.path.join(self.tmpdir.name, "index.html"), "w") as f:
+            f.write(self.page)
+        self.assets = AssetCache(self.tmpdir.name)
+
+        app = Flask(__name__)
+        encoding.init_app(app)
+
+        @app.route('/<path:name>')
+        def asset(name):
+            return self.assets.response(name, request) or ("Not found", 404)
+
+        @app.route('/report')
+        def report():
+            return jsonify({"probabilities": {f"diagnosis {i}": np.float64(1 / (i + 1)) for i in range(100)}})
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def test_etag(self):
+        """
+        Test that an unchanged page is answered with 304 Not Modified.
+        """
+        response = self.client.get('/index.html')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), self.page)
+        etag = response.headers["ETag"]
+
+        response = self.client.get('/index.html', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        # A changed file is reread and gets a new ETag
+        with open(os.path.join(self.tmpdir.name, "index.html"), "w") as f:
+            f.write(self.page + "\n")
+        response = self.client.get('/index.html', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_precompressed(self):
+        """
+        Test that the compressed variant is served to clients that accept it, with its own ETag.
+        """
+        plain = self.client.get('/index.html')
+        response = self.client.get('/index.html', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(gzip.decompress(response.data).decode(), self.page)
+        self.assertNotEqual(response.headers["ETag"], plain.headers["ETag"])
+
+    def test_path_traversal(self):
+        """
+        Test that files outside the directory are not served.
+        """
+        self.assertIsNone(self.assets.get("../" + os.path.basename(__file__)))
+        self.assertIsNone(self.assets.get("missing.html"))
+        self.assertEqual(self.client.get('/missing.html').status_code, 404)
+
+    def test_compressed_json(self):
+        """
+        Test that large JSON responses are compressed for clients that accept it.
+        """
+        plain = self.client.get('/report')
+        self.assertNotIn("Content-Encoding", plain.headers)
+        response = self.client.get('/report', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertEqual(list(json.loads(plain.data)["probabilities"])[:2], ["diagnosis 0", "diagnosis 1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import random
+from app.geo import HospitalIndex, geohash, haversine_km
+
+class HospitalIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        rng = random.Random(0)
+        self.hospitals = [
+            {"name": f"Hospital {i}", "address": f"{i} Main St",
+             "latitude": rng.uniform(-60, 60), "longitude": rng.uniform(-180, 180)}
+            for i in range(200)
+        ]
+        self.index = HospitalIndex(self.hospitals, rebuild_threshold=4)
+
+    def brute_force(self, hospitals, latitude, longitude):
+        """
+        Returns hospital names sorted by haversine distance by scanning every hospital.
+        """
+        distances = haversine_km(latitude, longitude,
+                                 [h["latitude"] for h in hospitals], [h["longitude"] for h in hospitals])
+        return [h["name"] for _, h in sorted(zip(distances, hospitals), key=lambda item: item[0])]
+
+    def test_haversine_km(self):
+        """
+        Test the haversine distance between two known cities.
+        """
+        # London to Paris is about 344 km
+        distance = haversine_km(51.5074, -0.1278, [48.8566], [2.3522])[0]
+        self.assertAlmostEqual(distance, 343.5, delta=1)
+
+    def test_geohash(self):
+        """
+        Test geohash cells against known values.
+        """
+        self.assertEqual(geohash(57.64911, 10.40744, precision=11), "u4pruydqqvj")
+        self.assertEqual(geohash(42.6, -5.6), "ezs42")
+        self.assertTrue(geohash(51.5074, -0.1278, precision=7).startswith(geohash(51.5074, -0.1278, precision=4)))
+
+    def test_nearest_matches_brute_force(self):
+        """
+        Test that k-nearest results match a full scan and are sorted by distance.
+        """
+        results = self.index.nearest(10, 20, k=5)
+        self.assertEqual([h["name"] for h in results], self.brute_force(self.hospitals, 10, 20)[:5])
+        distances = [h["distance"] for h in results]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_within_radius(self):
+        """
+        Test that radius queries return exactly the hospitals within the radius.
+        """
+        results = self.index.within(10, 20, 2000)
+        expected = [h for h in self.hospitals if haversine_km(10, 20, [h["latitude"]], [h["longitude"]])[0] <= 2000]
+        self.assertEqual({h["name"] for h in results}, {h["name"] for h in expected})
+        self.assertTrue(all(h["distance"] <= 2000 for h in results))
+
+    def test_incremental_updates(self):
+        """
+        Test that added and removed hospitals are reflected with and without a rebuild.
+        """
+        nearest = self.index.nearest(10, 20, k=1)[0]
+        added = {"name": "New Clinic", "address": "1 New Rd", "latitude": 10, "longitude": 20}
+        self.index.add(added)
+        self.index.remove(nearest)
+        results = self.index.nearest(10, 20, k=2)
+        self.assertEqual(results[0]["name"], "New Clinic")
+        self.assertEqual(results[0]["distance"], 0)
+        self.assertNotIn(nearest["name"], [h["name"] for h in results])
+        self.assertEqual(len(self.index), len(self.hospitals))
+
+        # Enough changes to trigger a rebuild
+        hospitals = [h for h in self.hospitals if h["name"] != nearest["name"]][10:] + [added]
+        self.index.sync(hospitals)
+        self.assertEqual(len(self.index), len(hospitals))
+        self.assertEqual([h["name"] for h in self.index.nearest(10, 20, k=5)],
+                         self.brute_force(hospitals, 10, 20)[:5])
+
+    def test_empty_index(self):
+        """
+        Test queries against an empty index.
+        """
+        self.assertEqual(HospitalIndex().nearest(10, 20), [])
+        self.assertEqual(self.index.nearest(10, 20, k=0), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import json
+import os
+import tempfile
+from app.language import SymptomPreprocessor, load_lexicons, normalize_text, tokenize
+
+class SymptomPreprocessorTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Compile a preprocessor with the built-in lexicons.
+        """
+        self.preprocessor = SymptomPreprocessor()
+
+    def test_normalize_text(self):
+        """
+        Test full-width folding, case folding and Arabic diacritic and letter unification.
+        """
+        self.assertEqual(normalize_text("ＨＥＡＤＡＣＨＥ"), "headache")
+        self.assertEqual(normalize_text("أَلَم"), "الم")
+
+    def test_tokenize(self):
+        """
+        Test that tokens are split by script and Han runs are kept together.
+        """
+        self.assertEqual(tokenize("fever头痛，صداع!"), [("fever", "latin"), ("头痛", "han"), ("صداع", "arabic")])
+
+    def test_detect(self):
+        """
+        Test language identification of a batch of texts.
+        """
+        texts = [normalize_text(text) for text in
+                 ["I have had a headache since yesterday", "Tengo dolor de cabeza desde ayer",
+                  "J'ai mal à la tête depuis hier", "أعاني من صداع", "我头痛", "", "123"]]
+        self.assertEqual(self.preprocessor.detect(texts), ["en", "es", "fr", "ar", "zh", "en", "en"])
+
+    def test_transform(self):
+        """
+        Test that phrases are mapped to canonical English terms and other tokens are kept.
+        """
+        texts, languages = self.preprocessor.transform_with_languages([
+            "Tengo dolor de cabeza y fiebre",
+            "J'ai mal a la tete et de la fièvre",
+            "I keep throwing up",
+            "أعاني من الصداع وألم في البطن",
+            "我头痛，还有点恶心",
+        ])
+        self.assertEqual(texts, ["tengo headache y fever", "j ai headache et de la fever", "i keep vomiting",
+                                 "اعاني من headache stomach pain", "我 headache 还 有 点 nausea"])
+        self.assertEqual(languages, ["es", "fr", "en", "ar", "zh"])
+        self.assertEqual(self.preprocessor.transform([]), [])
+
+    def test_everyday_words(self):
+        """
+        Test that everyday words are kept in their ordinary sense, and words of other languages are not rewritten.
+        """
+        texts = self.preprocessor.transform(["My nose runs and I am tired of this cough",
+                                             "I have the runs and feel tired", "I have a toux"])
+        self.assertEqual(texts, ["my nose runs and i am tired of this cough", "i have diarrhea and fatigue",
+                                 "i have a toux"])
+
+    def test_load_lexicons(self):
+        """
+        Test that lexicon files add terms to the built-in lexicons.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "lexicon.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"es": {"gripe": "influenza"}, "de": {"kopfschmerzen": "headache"}}, f)
+            preprocessor = SymptomPreprocessor(lexicons=load_lexicons(path))
+        self.assertEqual(preprocessor.transform(["gripe y fiebre", "Kopfschmerzen"]), ["influenza y fever", "headache"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import tempfile
+import time
+from flask import Flask, jsonify
+from app import metrics as metrics_module
+from app.metrics import Counter, Histogram, Metrics, SamplingProfiler
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_histogram(self):
+        """
+        Test that observations land in cumulative buckets with their sum and count.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, stage="score")
+        name, kind, _, samples = histogram.collect()
+        self.assertEqual((name, kind), ("latency_seconds", "histogram"))
+        buckets = [(labels["le"], value) for suffix, labels, value in samples if suffix == "_bucket"]
+        self.assertEqual(buckets, [("0.1", 1), ("1.0", 2), ("+Inf", 3)])
+        self.assertEqual(histogram.count(stage="score"), 3)
+
+    def test_timer_and_render(self):
+        """
+        Test that stage timers record durations and errors, and that collectors are rendered.
+        """
+        metrics = Metrics()
+        with metrics.timer("score"):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.timer("geocode"):
+                raise ValueError("boom")
+        metrics.add_collector(lambda: [("cache_hit_ratio", "gauge", "Hit rate.", [({"cache": "advice"}, 0.5)]),
+                                       ("model_swaps", "counter", "Swaps.", [({}, 2)])])
+
+        text = metrics.render()
+        self.assertIn('aicheckup_stage_seconds_count{stage="score"} 1', text)
+        self.assertIn('aicheckup_stage_errors_total{stage="geocode"} 1', text)
+        self.assertIn('# TYPE aicheckup_stage_errors counter', text)
+        self.assertIn('# TYPE model_swaps counter', text)
+        self.assertIn('model_swaps_total 2', text)
+        self.assertIn('# TYPE cache_hit_ratio gauge', text)
+        self.assertIn('cache_hit_ratio{cache="advice"} 0.5', text)
+
+    def test_label_escaping(self):
+        """
+        Test that label values are escaped.
+        """
+        counter = Counter("requests", "Requests.", ("path",))
+        counter.inc(path='a"b')
+        metrics = Metrics()
+        metrics._metrics = [counter]
+        self.assertIn('requests_total{path="a\\"b"} 1', metrics.render())
+
+class InitAppTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Create a Flask app with a slow endpoint and a profiler dumping every request.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.profiler = SamplingProfiler(threshold=0.05, interval=0.001, output_dir=self.tmpdir.name)
+        app = Flask(__name__)
+
+        @app.route('/slow')
+        def slow():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+            return jsonify({"ok": True})
+
+        @app.route('/fast')
+        def fast():
+            return jsonify({"ok": True})
+
+        metrics_module.init_app(app, profiler=self.profiler)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def test_request_metrics(self):
+        """
+        Test that request latency, status and serialization time are recorded.
+        """
+        requests = metrics_module.metrics.requests.value(endpoint="fast", status=200)
+        serialized = metrics_module.metrics.stage_seconds.count(stage="serialize")
+        self.client.get('/fast')
+        self.assertEqual(metrics_module.metrics.requests.value(endpoint="fast", status=200), requests + 1)
+        self.assertGreater(metrics_module.metrics.stage_seconds.count(stage="serialize"), serialized)
+
+    def test_slow_request_profile(self):
+        """
+        Test that only slow requests are dumped as folded stacks.
+        """
+        self.client.get('/fast')
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+        self.client.get('/slow')
+        files = os.listdir(self.tmpdir.name)
+        self.assertEqual(len(files), 1)
+        with open(os.path.join(self.tmpdir.name, files[0])) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any("slow (test_metrics.py" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+if __name__ == '__main__':
+    unittest.main()
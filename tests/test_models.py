@@ -1,5 +1,7 @@
 import unittest
 import os
+import tempfile
+import joblib
 from app.models import DiagnosisModel
 
 class DiagnosisModelTestCase(unittest.TestCase):
@@ -55,6 +57,45 @@ class DiagnosisModelTestCase(unittest.TestCase):
         self.assertIsInstance(probabilities, dict)
         self.assertTrue(all(isinstance(value, float) for value in probabilities.values()))
 
+    def test_predict_with_proba(self):
+        """
+        Test single-pass prediction of the diagnosis and probabilities.
+        """
+        self.model.train(self.X_train, self.y_train)
+        diagnosis, probabilities = self.model.predict_with_proba("headache")
+        self.assertEqual(diagnosis, self.model.predict("headache"))
+        self.assertEqual(probabilities, self.model.predict_proba("headache"))
+        self.assertEqual(next(iter(probabilities)), diagnosis)
+
+        diagnosis, probabilities = self.model.predict_with_proba("headache", top_k=2)
+        self.assertEqual(len(probabilities), 2)
+        self.assertIn(diagnosis, probabilities)
+
+    def test_predict_batch(self):
+        """
+        Test prediction of several inputs in one vectorized call.
+        """
+        self.model.train(self.X_train, self.y_train)
+        symptoms = ["headache", "cough", "nausea"]
+        results = self.model.predict_batch(symptoms, top_k=1)
+        self.assertEqual(len(results), 3)
+        for s, (diagnosis, probabilities) in zip(symptoms, results):
+            self.assertEqual(diagnosis, self.model.predict(s))
+            self.assertEqual(list(probabilities), [diagnosis])
+
+    def test_multilingual_symptoms(self):
+        """
+        Test that symptoms in other languages are diagnosed like their English equivalents.
+        """
+        self.model.train(self.X_train, self.y_train)
+        for symptoms in ["Tengo dolor de cabeza y fiebre", "J'ai mal à la tête", "صداع وحمى", "我头痛发烧"]:
+            self.assertEqual(self.model.predict(symptoms), "migraine")
+        self.assertEqual(self.model.predict("I keep throwing up, tummy ache"), "gastritis")
+
+        raw = DiagnosisModel(preprocess=False)
+        raw.train(self.X_train, self.y_train)
+        self.assertEqual(raw.preprocess(["Tengo fiebre"]), ["Tengo fiebre"])
+
     def test_save_and_load_model(self):
         """
         Test saving and loading the model.
@@ -66,4 +107,22 @@ class DiagnosisModelTestCase(unittest.TestCase):
         prediction = loaded_model.predict("headache")
         self.assertIsInstance(prediction, str)
 
+    def test_preprocess_setting_is_saved(self):
+        """
+        Test that a loaded model preprocesses its inputs only if it was trained on preprocessed text.
+        """
+        self.model.train(self.X_train, self.y_train)
+        raw = DiagnosisModel(preprocess=False)
+        raw.train(self.X_train, self.y_train)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.model.save_model(os.path.join(tmpdir, "model.joblib"))
+            raw.save_model(os.path.join(tmpdir, "raw.joblib"))
+            joblib.dump(raw.model, os.path.join(tmpdir, "legacy.joblib"))
+            self.model.export_compact(os.path.join(tmpdir, "compact"))
+
+            self.assertIsNotNone(DiagnosisModel(model_path=os.path.join(tmpdir, "model.joblib")).preprocessor)
+            self.assertIsNotNone(DiagnosisModel(model_path=os.path.join(tmpdir, "compact")).preprocessor)
+            self.assertIsNone(DiagnosisModel(model_path=os.path.join(tmpdir, "raw.joblib")).preprocessor)
+            self.assertIsNone(DiagnosisModel(model_path=os.path.join(tmpdir, "legacy.joblib")).preprocessor)
+
     # Add more tests for models.py if needed
@@ -0,0 +1,122 @@
+import unittest
+import sqlite3
+import threading
+from app.pool import ConnectionPool, PoolTimeout
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.connections = []
+        self.pool = ConnectionPool(self.connect, max_connections=2, timeout=0.2, health_check_interval=0)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.pool.close()
+
+    def connect(self):
+        """
+        Opens an in-memory SQLite connection standing in for PostgreSQL.
+        """
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connections.append(conn)
+        return conn
+
+    def test_connections_are_reused(self):
+        """
+        Test that a returned connection is reused by the next checkout.
+        """
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT 1")
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT 1")
+        self.assertEqual(len(self.connections), 1)
+        stats = self.pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_pool_is_bounded(self):
+        """
+        Test that the pool never opens more than max_connections and times out when exhausted.
+        """
+        with self.pool.connection(), self.pool.connection():
+            with self.assertRaises(PoolTimeout):
+                with self.pool.connection():
+                    pass
+        stats = self.pool.stats()
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """
+        Test that a thread waiting for a connection is woken when one is returned.
+        """
+        self.pool.timeout = 5
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with self.pool.connection():
+                acquired.set()
+                release.wait(5)
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        acquired.wait(5)
+        threading.Timer(0.05, release.set).start()
+        with self.pool.connection():
+            pass
+        for thread in threads:
+            thread.join(5)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_time_max"], 0)
+        self.assertLessEqual(len(self.connections), 2)
+
+    def test_dead_connection_is_replaced(self):
+        """
+        Test that a connection closed while idle is detected and replaced.
+        """
+        with self.pool.connection() as conn:
+            first = conn
+        first.close()
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT 1")
+            self.assertEqual(cur.fetchall(), [(1,)])
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(self.pool.stats()["reconnects"], 1)
+
+    def test_dispose(self):
+        """
+        Test that disposing closes idle connections and the pool keeps working.
+        """
+        with self.pool.connection() as conn:
+            first = conn
+        self.pool.dispose()
+        self.assertEqual(self.pool.stats()["open"], 0)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            first.execute("SELECT 1")
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT 1")
+        self.assertEqual(len(self.connections), 2)
+
+    def test_failed_connect_releases_slot(self):
+        """
+        Test that a failing connect does not leak a pool slot.
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect("/nonexistent/dir/db.sqlite"), max_connections=1, timeout=0)
+        for _ in range(2):
+            with self.assertRaises(sqlite3.OperationalError):
+                with pool.connection():
+                    pass
+        self.assertEqual(pool.stats()["open"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
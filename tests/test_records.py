@@ -0,0 +1,116 @@
+import unittest
+import sqlite3
+from unittest.mock import patch
+from app.records import HealthRecordStore, new_record_id
+from app.utils import Database
+
+class HealthRecordStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Create a HealthRecordStore backed by a shared in-memory SQLite database instead of PostgreSQL.
+        """
+        uri = f"file:test_records_{id(self)}?mode=memory&cache=shared"
+        self.keepalive = sqlite3.connect(uri, uri=True)
+        self.db = Database(connect=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+                           max_connections=2, timeout=1, placeholder="?")
+        self.store = HealthRecordStore(self.db, batch_size=10, flush_interval=0.01)
+
+    def tearDown(self):
+        """
+        Stop the writer, close the pool and the in-memory database.
+        """
+        self.store.close(timeout=1)
+        self.db.close()
+        self.keepalive.close()
+
+    def record(self, user_id, symptoms, timestamp):
+        return self.store.record(user_id, symptoms, "cold", {"cold": 0.9, "flu": 0.1},
+                                 {"advice": "Rest.", "source": "WHO"}, model_version="abc", timestamp=timestamp)
+
+    def test_record_id_order(self):
+        """
+        Test that record ids sort in time order and do not collide.
+        """
+        self.assertLess(new_record_id(999_999), new_record_id(1_000_000))
+        self.assertLess(new_record_id(1), new_record_id(10**16))
+        self.assertNotEqual(new_record_id(1000), new_record_id(1000))
+
+        ids = [self.record("alice", "cough", 1000.0) for _ in range(3)]
+        self.assertEqual(sorted(ids), ids)
+
+    def test_history(self):
+        """
+        Test writing records in batches and reading a user's history page by page, newest first.
+        """
+        for i in range(25):
+            self.record("alice", f"cough {i}", 1000.0 + i)
+        self.record("bob", "headache", 1010.0)
+        self.store.flush()
+
+        stats = self.store.stats()
+        self.assertEqual(stats["written"], 26)
+        self.assertLess(stats["batches"], 26)
+
+        records, cursor = self.store.history("alice", limit=10)
+        self.assertEqual([record["symptoms"] for record in records], [f"cough {i}" for i in range(24, 14, -1)])
+        self.assertEqual(records[0]["probabilities"], {"cold": 0.9, "flu": 0.1})
+        self.assertEqual(records[0]["advice"], {"advice": "Rest.", "source": "WHO"})
+        self.assertEqual(records[0]["model_version"], "abc")
+        self.assertEqual(records[0]["recorded_at"], 1024.0)
+
+        seen = records
+        while cursor is not None:
+            records, cursor = self.store.history("alice", limit=10, before=cursor)
+            seen += records
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({record["record_id"] for record in seen}), 25)
+        self.assertEqual([record["symptoms"] for record in self.store.history("bob")[0]], ["headache"])
+        self.assertEqual(self.store.history("carol"), ([], None))
+
+    def test_history_uses_index(self):
+        """
+        Test that reading a page of history is a range scan of the primary key index.
+        """
+        self.store.ensure_schema()
+        plan = self.keepalive.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM health_records WHERE user_id = ? AND record_id < ? "
+            "ORDER BY record_id DESC LIMIT 10", ("alice", "f")).fetchall()
+        self.assertIn("USING INDEX", plan[0][-1])
+        self.assertNotIn("TEMP B-TREE", " ".join(row[-1] for row in plan))
+
+    def test_queue_full(self):
+        """
+        Test that records are dropped rather than blocking when the queue is full.
+        """
+        store = HealthRecordStore(self.db, max_queue=1)
+        with patch.object(store, '_run'):
+            self.assertIsNotNone(store.record("alice", "cough", "cold", {}, {}))
+            self.assertIsNone(store.record("alice", "cough", "cold", {}, {}))
+        self.assertEqual(store.stats()["dropped"], 1)
+
+    def test_write_error(self):
+        """
+        Test that a failing batch is counted and does not stop the writer.
+        """
+        with patch.object(self.store, 'ensure_schema', side_effect=sqlite3.OperationalError("disk I/O error")):
+            self.record("alice", "cough", 1000.0)
+            self.store.flush()
+        self.assertEqual(self.store.stats()["failed"], 1)
+
+        self.record("alice", "fever", 1001.0)
+        self.store.flush()
+        self.assertEqual([record["symptoms"] for record in self.store.history("alice")[0]], ["fever"])
+
+    def test_close(self):
+        """
+        Test that closing drains queued records and stops accepting new ones.
+        """
+        store = HealthRecordStore(self.db, flush_interval=10)
+        store.record("alice", "cough", "cold", {}, {})
+        store.close(timeout=5)
+        self.assertEqual(store.stats()["written"], 1)
+        with self.assertRaises(RuntimeError):
+            store.record("alice", "cough", "cold", {}, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import os
+import tempfile
+import time
+from app.models import DiagnosisModel
+from app.registry import ModelRegistry
+
+class ModelRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup before each test.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmpdir.name, "model.joblib")
+        self.registry = ModelRegistry(self.model_path, poll_interval=0.05, retry_interval=0)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.registry.stop_watching()
+        self.tmpdir.cleanup()
+
+    def save_model(self, labels):
+        """
+        Trains a small model with the given labels and saves it to the registry's path.
+        """
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat", "stomach pain nausea"], labels)
+        model.save_model(self.model_path)
+        # Make sure the file signature changes even on filesystems with coarse timestamps
+        stat = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000 * (self.registry._swaps + 1)))
+
+    def test_lazy_load(self):
+        """
+        Test that nothing is loaded until first use, and that a failed load is retried.
+        """
+        self.assertFalse(self.registry.info()["loaded"])
+        self.assertIsNone(self.registry.get())
+        self.assertIsNotNone(self.registry.info()["last_error"])
+
+        self.save_model(["migraine", "cold", "gastritis"])
+        model = self.registry.get()
+        self.assertIsNotNone(model)
+        self.assertIs(self.registry.get(), model)
+        info = self.registry.info()
+        self.assertTrue(info["loaded"])
+        self.assertEqual(len(info["version"]), 12)
+        self.assertIsNone(info["last_error"])
+
+    def test_warm_up(self):
+        """
+        Test loading in a background thread.
+        """
+        self.save_model(["migraine", "cold", "gastritis"])
+        self.registry.warm_up(background=True).join(10)
+        self.assertTrue(self.registry.info()["loaded"])
+
+    def test_hot_swap(self):
+        """
+        Test that a new model version is validated and swapped in, keeping the old one usable.
+        """
+        self.save_model(["migraine", "cold", "gastritis"])
+        old_model = self.registry.get()
+        old_version = self.registry.version
+        swapped = []
+        self.registry.add_listener(swapped.append)
+
+        self.assertFalse(self.registry.check_for_update())
+        self.save_model(["migraine", "flu", "gastritis"])
+        self.assertTrue(self.registry.check_for_update())
+
+        self.assertIsNot(self.registry.get(), old_model)
+        self.assertNotEqual(self.registry.version, old_version)
+        self.assertEqual(swapped, [self.registry.get()])
+        self.assertEqual(self.registry.info()["swaps"], 1)
+        self.assertIn(old_model.predict("cough"), ["migraine", "cold", "gastritis"])
+
+    def test_invalid_model_is_not_swapped_in(self):
+        """
+        Test that a model file that fails to load keeps the current model in service.
+        """
+        self.save_model(["migraine", "cold", "gastritis"])
+        model = self.registry.get()
+        with open(self.model_path, "wb") as f:
+            f.write(b"not a model")
+        self.assertFalse(self.registry.check_for_update())
+        self.assertIs(self.registry.get(), model)
+        self.assertIsNotNone(self.registry.info()["last_error"])
+
+    def test_watcher(self):
+        """
+        Test that the watcher thread picks up a new model file.
+        """
+        self.save_model(["migraine", "cold", "gastritis"])
+        version = self.registry.get() and self.registry.version
+        self.registry.start_watching()
+        self.save_model(["migraine", "flu", "gastritis"])
+        deadline = time.monotonic() + 10
+        while self.registry.version == version and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertNotEqual(self.registry.version, version)
+
+if __name__ == '__main__':
+    unittest.main()
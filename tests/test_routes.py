@@ -0,0 +1,290 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+from app import routes, utils
+from app.advice import AdviceSnapshot, AdviceStore, read_snapshot, write_snapshot
+from app.batching import InferenceBatcher
+from app.cache import TTLCache
+from app.main import create_app
+from app.models import DiagnosisModel
+from app.records import HealthRecordStore
+from app.surveillance import HOSPITAL_SEARCH, DiagnosisAggregator
+from app.registry import ModelRegistry
+from app.utils import Database, invalidate_health_advice
+
+class RoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Serve a small trained model from a temporary directory.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = model_path = os.path.join(self.tmpdir.name, "model.joblib")
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat", "stomach pain nausea"], ["migraine", "cold", "gastritis"])
+        model.save_model(model_path)
+
+        # Advice is served from a snapshot file, without a database
+        self.snapshot_path = os.path.join(self.tmpdir.name, "advice.json")
+        write_snapshot(AdviceSnapshot({"gastritis": {"advice": "Eat small meals.", "source": "NHS"}}), self.snapshot_path)
+        self.advice_store = AdviceStore(lambda: read_snapshot(self.snapshot_path), poll_interval=0)
+
+        self.registry = ModelRegistry(model_path, poll_interval=0)
+        self.batcher = InferenceBatcher(self.registry.get, max_wait_ms=0)
+        self.patches = [patch.object(routes, 'registry', self.registry), patch.object(routes, 'batcher', self.batcher),
+                        patch.object(routes, 'diagnosis_cache', TTLCache(max_size=8)),
+                        patch.object(routes, 'surveillance', DiagnosisAggregator()),
+                        patch.object(utils, 'advice_store', self.advice_store),
+                        patch.object(routes, 'advice_store', self.advice_store)]
+        for p in self.patches:
+            p.start()
+        invalidate_health_advice()
+        self.client = create_app().test_client()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        for p in self.patches:
+            p.stop()
+        self.batcher.close()
+        self.tmpdir.cleanup()
+
+    def test_diagnose(self):
+        """
+        Test the diagnosis endpoint.
+        """
+        response = self.client.post('/diagnose', json={"symptoms": "headache", "top_k": 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIn(data["diagnosis"], ["migraine", "cold", "gastritis"])
+        self.assertEqual(len(data["probabilities"]), 2)
+        self.assertEqual(data["advice"], routes.DEFAULT_ADVICE)
+
+    def test_diagnose_batch(self):
+        """
+        Test the batch diagnosis endpoint.
+        """
+        response = self.client.post('/diagnose/batch', json={"symptoms": ["headache", "cough"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["results"]), 2)
+
+        response = self.client.post('/diagnose/batch', json={"symptoms": "headache"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_min_probability(self):
+        """
+        Test that less probable diagnoses are left out of the response, keeping the most probable first.
+        """
+        data = self.client.post('/diagnose', json={"symptoms": "headache"}).get_json()
+        probabilities = list(data["probabilities"].values())
+        self.assertEqual(len(probabilities), 3)
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+
+        # A threshold between the two most probable diagnoses keeps only the diagnosis
+        threshold = (probabilities[0] + probabilities[1]) / 2
+        data = self.client.post('/diagnose', json={"symptoms": "headache", "min_probability": threshold}).get_json()
+        self.assertEqual(list(data["probabilities"]), [data["diagnosis"]])
+
+        response = self.client.post('/diagnose/batch', json={"symptoms": ["headache"], "min_probability": threshold})
+        self.assertEqual(len(response.get_json()["results"][0]["probabilities"]), 1)
+
+        # Invalid display options are rejected
+        for options in ({"top_k": "2"}, {"top_k": -1}, {"top_k": True}, {"min_probability": "0.5"},
+                        {"min_probability": 1.5}):
+            response = self.client.post('/diagnose', json={"symptoms": "headache", **options})
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/diagnose/batch', json={"symptoms": ["headache"], **options})
+            self.assertEqual(response.status_code, 400)
+
+    def test_advice_snapshot(self):
+        """
+        Test that advice is served from the snapshot and replaced after a reload notification.
+        """
+        data = self.client.post('/diagnose', json={"symptoms": "stomach pain nausea"}).get_json()
+        self.assertEqual(data["advice"], {"advice": "Eat small meals.", "source": "NHS"})
+
+        write_snapshot(AdviceSnapshot({"gastritis": {"advice": "Avoid spicy food.", "source": "WHO"}}), self.snapshot_path)
+        self.assertEqual(self.client.post('/admin/advice/reload').status_code, 403)
+        with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            response = self.client.post('/admin/advice/reload', headers={"X-Admin-Token": "secret"})
+            self.assertTrue(response.get_json()["reloaded"])
+            info = self.client.get('/admin/advice', headers={"X-Admin-Token": "secret"}).get_json()
+        self.assertEqual(info["entries"], 1)
+        self.assertEqual(info["swaps"], 1)
+
+        data = self.client.post('/diagnose/batch', json={"symptoms": ["stomach pain nausea"]}).get_json()
+        self.assertEqual(data["results"][0]["advice"], {"advice": "Avoid spicy food.", "source": "WHO"})
+
+    def test_diagnosis_cache(self):
+        """
+        Test that rephrased symptoms are answered from the diagnosis cache without scoring.
+        """
+        first = self.client.post('/diagnose', json={"symptoms": "fever headache", "top_k": 2}).get_json()
+        with patch.object(self.batcher, 'predict_with_proba', side_effect=AssertionError("scored")):
+            second = self.client.post('/diagnose', json={"symptoms": "Headache, FEVER!", "top_k": 2}).get_json()
+        self.assertEqual(second, first)
+        self.assertEqual(routes.diagnosis_cache.stats()["hits"], 1)
+
+        # top_k only shapes the response, so the cached result serves it too
+        with patch.object(self.batcher, 'predict_with_proba', side_effect=AssertionError("scored")):
+            response = self.client.post('/diagnose', json={"symptoms": "fever headache", "top_k": 1})
+            self.assertEqual(len(response.get_json()["probabilities"]), 1)
+
+    def test_diagnosis_cache_word_order(self):
+        """
+        Test that texts the model reads differently because of word order do not share a cache entry.
+        """
+        # The Spanish phrase "dolor de cabeza" is preprocessed to "headache", "cabeza de dolor" is not
+        model = self.registry.get()
+        first, second = "dolor de cabeza", "cabeza de dolor"
+        expected = [model.predict(first), model.predict(second)]
+        self.assertNotEqual(expected[0], expected[1])
+        self.client.post('/diagnose', json={"symptoms": first})
+        self.assertEqual(self.client.post('/diagnose', json={"symptoms": second}).get_json()["diagnosis"], expected[1])
+
+        # Models using word pairs see "fever headache" and "headache fever" differently
+        bigram = DiagnosisModel()
+        bigram.model = bigram.create_model(tfidf__ngram_range=(1, 2))
+        self.assertTrue(bigram.order_sensitive)
+        self.assertFalse(model.order_sensitive)
+        self.assertNotEqual(routes.diagnosis_cache_key("fever headache", bigram, "v1"),
+                            routes.diagnosis_cache_key("headache fever", bigram, "v1"))
+        self.assertEqual(routes.diagnosis_cache_key("fever headache", model, "v1"),
+                         routes.diagnosis_cache_key("Headache, fever", model, "v1"))
+
+    def test_diagnosis_cache_batch(self):
+        """
+        Test that the batch endpoint scores each distinct uncached report once.
+        """
+        self.client.post('/diagnose', json={"symptoms": "cough"})
+        model = self.registry.get()
+        with patch.object(model, 'predict_batch', wraps=model.predict_batch) as predict_batch:
+            response = self.client.post('/diagnose/batch', json={"symptoms": ["cough", "fever headache", "Headache fever"]})
+        predict_batch.assert_called_once_with(["fever headache"])
+        results = response.get_json()["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[1], results[2])
+
+    def test_diagnosis_cache_model_swap(self):
+        """
+        Test that results of a replaced model are not served.
+        """
+        self.client.post('/diagnose', json={"symptoms": "headache"})
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat"], ["flu", "bronchitis"])
+        model.save_model(self.model_path)
+        self.assertTrue(self.registry.check_for_update())
+
+        data = self.client.post('/diagnose', json={"symptoms": "headache"}).get_json()
+        self.assertIn(data["diagnosis"], ["flu", "bronchitis"])
+        self.assertEqual(routes.diagnosis_cache.stats()["hits"], 0)
+
+    def test_diagnosis_cache_stats(self):
+        """
+        Test that diagnosis cache statistics require the admin token.
+        """
+        self.assertEqual(self.client.get('/admin/diagnosis_cache').status_code, 403)
+        with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            response = self.client.get('/admin/diagnosis_cache', headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hit_rate", response.get_json())
+
+    def test_health_records(self):
+        """
+        Test that consultations of identified users are recorded and returned by the history endpoint.
+        """
+        db = Database(connect=lambda: sqlite3.connect(os.path.join(self.tmpdir.name, "records.db"), check_same_thread=False),
+                      placeholder="?")
+        store = HealthRecordStore(db, flush_interval=0)
+        with patch.object(routes, 'health_records', store), patch.dict(os.environ, {"RECORDS_SECRET": "secret"}):
+            headers = {"X-User-Token": routes.user_token("alice")}
+            self.client.post('/diagnose', json={"symptoms": "headache"})
+            self.client.post('/diagnose', json={"symptoms": "stomach pain nausea", "user_id": "alice", "top_k": 1},
+                             headers=headers)
+            self.client.post('/diagnose/batch', json={"symptoms": ["cough", "sore throat"], "user_id": "alice"},
+                             headers=headers)
+
+            # Consultations are only recorded with the user's token
+            response = self.client.post('/diagnose', json={"symptoms": "fever", "user_id": "alice"})
+            self.assertEqual(response.status_code, 403)
+            response = self.client.post('/diagnose/batch', json={"symptoms": ["fever"], "user_id": "alice"},
+                                        headers={"X-User-Token": routes.user_token("bob")})
+            self.assertEqual(response.status_code, 403)
+            store.flush()
+
+            # History is only served with the user's token
+            self.assertEqual(self.client.get('/records/alice').status_code, 403)
+            headers = {"X-User-Token": routes.user_token("bob")}
+            self.assertEqual(self.client.get('/records/alice', headers=headers).status_code, 403)
+
+            headers = {"X-User-Token": routes.user_token("alice")}
+            response = self.client.get('/records/alice?limit=2', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            self.assertEqual([record["symptoms"] for record in data["records"]], ["sore throat", "cough"])
+            self.assertEqual(data["records"][0]["model_version"], self.registry.version)
+
+            data = self.client.get(f'/records/alice?limit=2&before={data["next"]}', headers=headers).get_json()
+            self.assertEqual(len(data["records"]), 1)
+            self.assertEqual(data["records"][0]["diagnosis"], "gastritis")
+            # The record keeps every probability, whatever the response showed
+            self.assertEqual(len(data["records"][0]["probabilities"]), 3)
+            self.assertEqual(data["records"][0]["advice"], {"advice": "Eat small meals.", "source": "NHS"})
+            self.assertIsNone(data["next"])
+
+            self.assertEqual(self.client.get('/records/alice?limit=0', headers=headers).status_code, 400)
+        self.assertEqual(store.stats()["written"], 3)
+        store.close()
+        db.close()
+
+    def test_surveillance(self):
+        """
+        Test that diagnoses and hospital searches are counted by region.
+        """
+        self.client.post('/diagnose', json={"symptoms": "stomach pain nausea", "location": "34.0522,-118.2437"})
+        self.client.post('/diagnose/batch', json={"symptoms": ["stomach pain", "nausea"], "location": "34.06,-118.25"})
+        self.client.post('/diagnose', json={"symptoms": "stomach pain nausea"})
+        with patch.object(routes, 'find_nearby_hospitals', return_value=[]):
+            self.client.post('/find_hospitals', json={"location": "34.0522,-118.2437"})
+
+        self.assertEqual(self.client.get('/admin/surveillance').status_code, 403)
+        with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}):
+            headers = {"X-Admin-Token": "secret"}
+            data = self.client.get('/admin/surveillance?signal=gastritis&cell=9q5', headers=headers).get_json()
+            self.assertEqual(data["total"], 5)
+            self.assertEqual(data["signals"]["gastritis"]["count"], 4)
+            self.assertEqual(data["signals"][HOSPITAL_SEARCH]["count"], 1)
+            self.assertEqual(data["count"], 3)
+            self.assertEqual(self.client.get('/admin/surveillance?window=soon', headers=headers).status_code, 400)
+
+    def test_model_info(self):
+        """
+        Test the model information endpoint.
+        """
+        self.client.post('/diagnose', json={"symptoms": "headache"})
+        data = self.client.get('/model').get_json()
+        self.assertTrue(data["loaded"])
+        self.assertIsNotNone(data["version"])
+
+    def test_metrics(self):
+        """
+        Test that the metrics endpoint reports stage timings and the served model.
+        """
+        self.client.post('/diagnose', json={"symptoms": "headache"})
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        for stage in ("vectorize", "score", "serialize"):
+            self.assertIn(f'aicheckup_stage_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn(f'aicheckup_model_info{{version="{self.registry.version}"', text)
+        self.assertIn('aicheckup_cache_hit_ratio{cache="advice"}', text)
+        self.assertIn('aicheckup_cache_hit_ratio{cache="diagnosis"}', text)
+        self.assertIn('aicheckup_requests_total{endpoint="routes.diagnose",status="200"}', text)
+        self.assertIn('# TYPE aicheckup_health_records counter', text)
+        self.assertIn('aicheckup_health_records_total{outcome="written"}', text)
+        self.assertIn('aicheckup_response_bytes_count{endpoint="routes.diagnose",encoding="identity"}', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+from app import serve
+from app.batching import InferenceBatcher
+from app.models import DiagnosisModel
+from app.registry import ModelRegistry
+from app.surveillance import DiagnosisAggregator
+from app.utils import Database, ExternalAPI, advice_cache, invalidate_health_advice
+
+class ServeTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Patch the served model, database and API with local test doubles.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        model_path = os.path.join(self.tmpdir.name, "model.joblib")
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat"], ["migraine", "cold"])
+        model.save_model(model_path)
+
+        uri = f"file:serve_{id(self)}?mode=memory&cache=shared"
+        self.keeper = sqlite3.connect(uri, uri=True)
+        self.keeper.executescript("""
+            CREATE TABLE health_advice (diagnosis TEXT PRIMARY KEY, advice TEXT, source TEXT);
+            INSERT INTO health_advice VALUES ('migraine', 'Rest in a dark room.', 'NHS');
+            CREATE TABLE hospitals (name TEXT, address TEXT, latitude REAL, longitude REAL);
+            INSERT INTO hospitals VALUES ('General', '1 Main St', 35.0, 139.0);
+        """)
+        self.db = Database(connect=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False), placeholder="?",
+                           hospital_signature_query=None)
+        self.api = ExternalAPI(api_key="test")
+        self.registry = ModelRegistry(model_path, poll_interval=0)
+        self.batcher = InferenceBatcher(self.registry.get)
+        self.patches = [patch.object(serve, 'db', self.db), patch.object(serve, 'api', self.api),
+                        patch.object(serve, 'registry', self.registry), patch.object(serve, 'batcher', self.batcher),
+                        patch.object(serve, 'surveillance', DiagnosisAggregator()),
+                        patch('app.utils.db', self.db), patch.object(serve, 'get_datapack', return_value=None),
+                        patch.object(serve, 'reload_datapack', return_value=None)]
+        for p in self.patches:
+            p.start()
+        invalidate_health_advice()
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        for p in self.patches:
+            p.stop()
+        invalidate_health_advice()
+        self.db.close()
+        self.keeper.close()
+        self.tmpdir.cleanup()
+
+    def test_default_options(self):
+        """
+        Test that worker and thread counts are read from the environment.
+        """
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "3", "WORKER_THREADS": "8", "BIND": "127.0.0.1:9000"}):
+            options = serve.default_options()
+        self.assertEqual(options["workers"], 3)
+        self.assertEqual(options["threads"], 8)
+        self.assertEqual(options["bind"], "127.0.0.1:9000")
+
+    def test_server_config(self):
+        """
+        Test that the server preloads the app, uses threaded workers and installs the lifecycle hooks.
+        """
+        server = serve.ServerApplication({"workers": 2, "threads": 3})
+        self.assertTrue(server.cfg.preload_app)
+        self.assertEqual(server.cfg.workers, 2)
+        self.assertEqual(server.cfg.threads, 3)
+        self.assertEqual(server.cfg.worker_class_str, "gthread")
+        self.assertIs(server.cfg.post_fork, serve.post_fork)
+        self.assertIs(server.cfg.worker_exit, serve.worker_exit)
+        self.assertIs(server.cfg.on_reload, serve.on_reload)
+
+    def test_preload(self):
+        """
+        Test that preloading loads shared state and leaves no connection open before forking.
+        """
+        report = serve.preload()
+        self.assertEqual(report, {"model": True, "advice": 2, "hospital_index": True, "datapack": False})
+        self.assertTrue(self.registry.info()["loaded"])
+        self.assertEqual(len(advice_cache), 2)
+        self.assertEqual(len(self.db.get_hospital_index().nearest(35.0, 139.0)), 1)
+        self.assertEqual(self.db.pool_stats()["open"], 0)
+
+    def test_on_reload(self):
+        """
+        Test that a reload in the parent swaps in a new model file and leaves no connection open.
+        """
+        serve.preload()
+        version = self.registry.info()["version"]
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat", "rash itching"], ["migraine", "cold", "eczema"])
+        model.save_model(self.registry.model_path)
+
+        serve.on_reload(None)
+        self.assertNotEqual(self.registry.info()["version"], version)
+        self.assertIn("eczema", self.registry.get().model.classes_)
+        self.assertEqual(self.db.pool_stats()["open"], 0)
+
+    def test_worker_exit(self):
+        """
+        Test that a worker closes its batcher and database connections on exit.
+        """
+        self.db.load_hospitals()
+        serve.worker_exit(None, None)
+        self.assertEqual(self.db.pool_stats()["open"], 0)
+        with self.assertRaises(RuntimeError):
+            self.batcher.submit("headache")
+
+if __name__ == '__main__':
+    unittest.main()
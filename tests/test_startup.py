@@ -0,0 +1,66 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+from app import startup as startup_module
+from app.startup import StartupReport, load_environment
+
+def imported_modules(statement):
+    """
+    Runs an import statement in a fresh interpreter and returns the modules it loaded.
+    """
+    code = f"import sys, json; {statement}; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return set(json.loads(output))
+
+class StartupTestCase(unittest.TestCase):
+    def test_import_without_side_effects(self):
+        """
+        Test that importing the routes loads no .env, database driver, HTTP client or scikit-learn.
+        """
+        modules = imported_modules("import app.routes")
+        for package in ("dotenv", "psycopg2", "requests", "sklearn", "scipy", "joblib"):
+            self.assertNotIn(package, modules)
+
+        modules = imported_modules("import app.main")
+        self.assertNotIn("app.routes", modules)
+        self.assertNotIn("app.utils", modules)
+
+    def test_load_environment(self):
+        """
+        Test that .env is loaded once, without overriding variables that are already set.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, ".env")
+            with open(path, "w") as f:
+                f.write("AICHECKUP_TEST_A=from-file\nAICHECKUP_TEST_B=from-file\n")
+            with patch.object(startup_module, '_environment_loaded', False), \
+                    patch.dict(os.environ, {"AICHECKUP_TEST_B": "set"}):
+                self.assertTrue(load_environment(path))
+                self.assertFalse(load_environment(path))
+                self.assertEqual(os.environ["AICHECKUP_TEST_A"], "from-file")
+                self.assertEqual(os.environ["AICHECKUP_TEST_B"], "set")
+
+    def test_report(self):
+        """
+        Test that stages are timed in order with the heavy packages they imported.
+        """
+        report = StartupReport()
+        with patch.dict(sys.modules):
+            sys.modules.pop("joblib", None)
+            with report.stage("import joblib"):
+                import joblib  # noqa: F401
+            with report.stage("nothing"):
+                pass
+        data = report.to_dict()
+        self.assertEqual([stage["stage"] for stage in data["stages"]], ["import joblib", "nothing"])
+        self.assertIn("joblib", data["stages"][0]["packages"])
+        self.assertEqual(data["stages"][1]["modules"], 0)
+        self.assertAlmostEqual(data["total_seconds"], sum(stage["seconds"] for stage in data["stages"]), places=5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from app.surveillance import HOSPITAL_SEARCH, CountMinSketch, DiagnosisAggregator, HyperLogLog
+
+# Los Angeles and London
+LOS_ANGELES = (34.0522, -118.2437)
+LONDON = (51.5074, -0.1278)
+
+class SketchTestCase(unittest.TestCase):
+    def test_count_min_sketch(self):
+        """
+        Test that count-min estimates never undercount and stay close with few collisions.
+        """
+        sketch = CountMinSketch(width=256, depth=4)
+        for i in range(200):
+            for _ in range(i % 5 + 1):
+                sketch.add(f"key{i}")
+        for i in range(200):
+            self.assertGreaterEqual(sketch.estimate(f"key{i}"), i % 5 + 1)
+        self.assertLessEqual(sum(sketch.estimate(f"key{i}") - (i % 5 + 1) for i in range(200)), 200)
+        self.assertEqual(sketch.add("key0", 10), sketch.estimate("key0"))
+        sketch.clear()
+        self.assertEqual(sketch.estimate("key0"), 0)
+
+    def test_hyperloglog(self):
+        """
+        Test distinct counts for small and large cardinalities, and merging.
+        """
+        small = HyperLogLog(p=8)
+        for i in range(20):
+            small.add(f"cell{i % 10}")
+        self.assertAlmostEqual(small.count(), 10, delta=1)
+
+        large = HyperLogLog(p=10)
+        for i in range(20000):
+            large.add(f"cell{i}")
+        self.assertAlmostEqual(large.count(), 20000, delta=20000 * 0.1)
+
+        other = HyperLogLog(p=8)
+        for i in range(10, 20):
+            other.add(f"cell{i}")
+        small.merge(other)
+        self.assertAlmostEqual(small.count(), 20, delta=2)
+
+class DiagnosisAggregatorTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Count into a one-hour window of one-minute buckets on a fake clock.
+        """
+        self.now = 1_000_000.0
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.aggregator = DiagnosisAggregator(bucket_seconds=60, num_buckets=60, top_k=4,
+                                              path=os.path.join(self.tmpdir.name, "surveillance-{pid}.json"),
+                                              timer=lambda: self.now)
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.aggregator.stop_flushing()
+        self.tmpdir.cleanup()
+
+    def test_counts_by_region(self):
+        """
+        Test counts by signal and by geohash cell at any precision.
+        """
+        for _ in range(5):
+            self.aggregator.observe("flu", *LOS_ANGELES)
+        self.aggregator.observe("flu", *LONDON)
+        self.aggregator.observe("cold", *LONDON)
+        self.aggregator.observe("flu")
+        self.aggregator.observe(HOSPITAL_SEARCH, *LOS_ANGELES)
+
+        la = self.aggregator.cell(*LOS_ANGELES)
+        self.assertEqual(la, "9q5ct")
+        self.assertEqual(self.aggregator.count(), 9)
+        self.assertEqual(self.aggregator.count("flu"), 7)
+        self.assertEqual(self.aggregator.count("flu", la), 5)
+        self.assertEqual(self.aggregator.count("flu", "9q"), 5)
+        self.assertEqual(self.aggregator.count("cold", la), 0)
+        self.assertEqual(self.aggregator.count(cell=la), 6)
+        self.assertEqual(self.aggregator.count(HOSPITAL_SEARCH), 1)
+
+        summary = self.aggregator.summary()
+        self.assertEqual(summary["total"], 9)
+        self.assertEqual(summary["signals"]["flu"], {"count": 7, "cells": 2})
+        self.assertEqual(summary["hotspots"][0], {"signal": "flu", "cell": la, "count": 5})
+
+    def test_sliding_window(self):
+        """
+        Test that counts leave the window as time passes.
+        """
+        self.aggregator.observe("flu", *LONDON)
+        self.now += 600
+        self.aggregator.observe("flu", *LONDON)
+        self.assertEqual(self.aggregator.count("flu"), 2)
+        self.assertEqual(self.aggregator.count("flu", window=300), 1)
+        self.assertEqual(self.aggregator.summary(window=60)["total"], 1)
+
+        self.now += 3300
+        self.assertEqual(self.aggregator.count("flu"), 1)
+        self.now += 600
+        self.assertEqual(self.aggregator.count("flu"), 0)
+        self.assertEqual(self.aggregator.summary()["signals"], {})
+
+    def test_bounded_memory(self):
+        """
+        Test that signals and hotspots beyond the limits are still counted, without growing the buckets.
+        """
+        aggregator = DiagnosisAggregator(max_signals=2, top_k=2, timer=lambda: self.now)
+        for i in range(10):
+            for _ in range(i + 1):
+                aggregator.observe(f"diagnosis{i}", 10.0 * i, 10.0 * i)
+        bucket = aggregator._bucket(int(self.now // 60))
+        self.assertEqual(len(bucket.diagnoses), 2)
+        self.assertEqual(len(bucket.hotspots), 2)
+        self.assertGreaterEqual(aggregator.count("diagnosis9"), 10)
+        self.assertEqual([hotspot["signal"] for hotspot in aggregator.summary()["hotspots"]],
+                         ["diagnosis9", "diagnosis8"])
+
+    def test_flush(self):
+        """
+        Test writing the summary to the process's file.
+        """
+        self.aggregator.observe("flu", *LONDON)
+        path = self.aggregator.flush()
+        self.assertEqual(os.path.basename(path), f"surveillance-{os.getpid()}.json")
+        with open(path) as f:
+            summary = json.load(f)
+        self.assertEqual(summary["signals"]["flu"]["count"], 1)
+        self.assertEqual(summary["generated_at"], self.now)
+
+        # Stopping the flushing thread writes the latest counts
+        self.aggregator.flush_interval = 60
+        self.aggregator.start_flushing()
+        self.aggregator.observe("flu", *LONDON)
+        self.aggregator.stop_flushing()
+        with open(path) as f:
+            self.assertEqual(json.load(f)["signals"]["flu"]["count"], 2)
+
+    def test_missing_signal(self):
+        """
+        Test that a signal that did not occur counts zero, even if the sketch has collisions.
+        """
+        aggregator = DiagnosisAggregator(width=1, depth=1, timer=lambda: self.now)
+        aggregator.observe("flu", *LONDON)
+        self.assertEqual(aggregator.count("flu"), 1)
+        self.assertEqual(aggregator.count("measles"), 0)
+
+    def test_combined(self):
+        """
+        Test that the counts written by other processes are merged with the live counts.
+        """
+        other = DiagnosisAggregator(bucket_seconds=60, num_buckets=60, top_k=4, max_signals=1,
+                                    timer=lambda: self.now)
+        other.observe("flu", *LONDON)
+        other.observe("measles", *LONDON)
+        self.now += 60
+        other.observe("flu", *LOS_ANGELES)
+        other_path = other.flush(os.path.join(self.tmpdir.name, f"surveillance-{os.getppid()}.json"))
+
+        self.aggregator.observe("measles", *LONDON)
+        self.aggregator.flush()
+        counts = self.aggregator.combined()
+        self.assertEqual(counts.summary()["total"], 4)
+        self.assertEqual(counts.count("flu"), 2)
+        self.assertEqual(counts.count("flu", window=60), 1)
+        self.assertEqual(counts.count("measles"), 2)
+        self.assertEqual(counts.count("flu", cell="gcp"), 1)
+        self.assertEqual(counts.summary()["signals"]["flu"]["cells"], 2)
+
+        # Files of other configurations, or unreadable, are skipped
+        with open(other_path, "w") as f:
+            f.write("{")
+        self.assertEqual(self.aggregator.combined().summary()["total"], 1)
+        self.assertEqual(DiagnosisAggregator(width=16).combined([self.aggregator.flush()]).summary()["total"], 0)
+
+    def test_stale_files(self):
+        """
+        Test that files of exited processes, or not written for several flush intervals, are deleted.
+        """
+        other = DiagnosisAggregator(bucket_seconds=60, num_buckets=60, top_k=4, timer=lambda: self.now)
+        other.observe("flu", *LONDON)
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        exited = other.flush(os.path.join(self.tmpdir.name, f"surveillance-{process.pid}.json"))
+        silent = other.flush(os.path.join(self.tmpdir.name, f"surveillance-{os.getppid()}.json"))
+        self.aggregator.flush_interval = 60
+        os.utime(silent, (time.time() - 181, time.time() - 181))
+
+        self.assertEqual(self.aggregator.combined().summary()["total"], 0)
+        self.assertFalse(os.path.exists(exited))
+        self.assertFalse(os.path.exists(silent))
+
+        # A process deletes its own file when it exits
+        path = self.aggregator.flush()
+        self.aggregator.discard_flushed()
+        self.assertFalse(os.path.exists(path))
+        self.aggregator.discard_flushed()
+
+if __name__ == '__main__':
+    unittest.main()
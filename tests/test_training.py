@@ -0,0 +1,136 @@
+import unittest
+import json
+import os
+import tempfile
+from app.models import DiagnosisModel
+from app.compact import CompactScorer
+from app.training import (collect_classes, compress_model_file, iter_labelled_chunks, search_file,
+                          train_streaming_file, update_model_file)
+
+CONSULTATIONS = [
+    ("headache fever", "migraine"), ("severe headache", "migraine"), ("throbbing headache nausea", "migraine"),
+    ("cough sore throat", "cold"), ("runny nose cough", "cold"), ("sore throat sneezing", "cold"),
+    ("stomach pain nausea", "gastritis"), ("stomach ache vomiting", "gastritis"), ("burning stomach pain", "gastritis"),
+]
+
+class TrainingTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        Write a small JSONL corpus.
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.corpus = self.write_corpus("corpus.jsonl", CONSULTATIONS * 5)
+        self.model_path = os.path.join(self.tmpdir.name, "model.joblib")
+
+    def tearDown(self):
+        """
+        Cleanup after each test.
+        """
+        self.tmpdir.cleanup()
+
+    def write_corpus(self, name, consultations):
+        """
+        Writes consultations as JSONL and returns the path.
+        """
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            for symptoms, diagnosis in consultations:
+                f.write(json.dumps({"symptoms": symptoms, "diagnosis": diagnosis}) + "\n")
+        return path
+
+    def test_iter_labelled_chunks(self):
+        """
+        Test reading the corpus in bounded chunks.
+        """
+        chunks = list(iter_labelled_chunks(self.corpus, chunk_size=20))
+        self.assertEqual([len(X) for X, _ in chunks], [20, 20, 5])
+        self.assertEqual(collect_classes(self.corpus), ["cold", "gastritis", "migraine"])
+
+    def test_train_streaming_file(self):
+        """
+        Test training a streaming model chunk by chunk.
+        """
+        model = train_streaming_file(self.corpus, self.model_path, chunk_size=7, epochs=5, n_features=2 ** 12)
+        self.assertTrue(os.path.exists(self.model_path))
+        self.assertEqual(model.predict("headache"), "migraine")
+        self.assertEqual(model.predict("sore throat"), "cold")
+        diagnosis, probabilities = DiagnosisModel(model_path=self.model_path).predict_with_proba("stomach pain")
+        self.assertEqual(diagnosis, "gastritis")
+        self.assertAlmostEqual(sum(probabilities.values()), 1.0)
+
+    def test_update_model_file(self):
+        """
+        Test folding new consultations into an existing model.
+        """
+        train_streaming_file(self.corpus, self.model_path, epochs=5, n_features=2 ** 12)
+        new = self.write_corpus("new.jsonl", [("itchy rash", "gastritis")] * 30)
+        before = DiagnosisModel(model_path=self.model_path).predict_proba("itchy rash")["gastritis"]
+        update_model_file(self.model_path, new)
+        after = DiagnosisModel(model_path=self.model_path).predict_proba("itchy rash")["gastritis"]
+        self.assertGreater(after, before)
+        self.assertFalse([name for name in os.listdir(os.path.dirname(self.model_path)) if ".tmp" in name])
+
+        # Compact models are read-only
+        compact_path = os.path.join(os.path.dirname(self.model_path), "compact")
+        model = DiagnosisModel()
+        model.train(["headache fever", "cough sore throat"], ["migraine", "cold"])
+        model.export_compact(compact_path)
+        with self.assertRaises(ValueError):
+            update_model_file(compact_path, new)
+
+    def test_partial_train_rejects_unknown_classes(self):
+        """
+        Test that incremental updates cannot introduce new diagnoses or target non-streaming models.
+        """
+        model = DiagnosisModel()
+        with self.assertRaises(ValueError):
+            model.partial_train(["headache"], ["migraine"])
+
+        model.model = model.create_streaming_model(n_features=2 ** 10)
+        with self.assertRaises(ValueError):
+            model.partial_train(["headache"], ["migraine"])
+        model.partial_train(["headache"], ["migraine"], classes=["migraine", "cold"])
+        with self.assertRaises(ValueError):
+            model.partial_train(["rash"], ["eczema"])
+
+    def test_search_file(self):
+        """
+        Test the parallel hyperparameter search, its leaderboard and the saved best model.
+        """
+        leaderboard_path = os.path.join(self.tmpdir.name, "leaderboard.json")
+        grid = {"tfidf__ngram_range": [(1, 1), (1, 2)], "clf__C": [1.0, 10.0], "clf__class_weight": [None]}
+        leaderboard = search_file(self.corpus, self.model_path, leaderboard_path, grid=grid, n_splits=3, n_jobs=2)
+
+        self.assertEqual(len(leaderboard), 4)
+        self.assertEqual([entry["rank"] for entry in leaderboard], [1, 2, 3, 4])
+        scores = [entry["mean_f1_macro"] for entry in leaderboard]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        with open(leaderboard_path) as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+        model = DiagnosisModel(model_path=self.model_path)
+        best = leaderboard[0]["params"]
+        self.assertEqual(model.model.get_params()["clf__C"], best["clf__C"])
+        self.assertEqual(model.predict("headache"), "migraine")
+
+    def test_compress_model_file(self):
+        """
+        Test exporting a quantized, pruned model and its accuracy-delta report.
+        """
+        model = DiagnosisModel()
+        model.train(*zip(*CONSULTATIONS))
+        model.save_model(self.model_path)
+        output_path = os.path.join(self.tmpdir.name, "compact")
+        report_path = os.path.join(self.tmpdir.name, "report.json")
+
+        report = compress_model_file(self.model_path, self.corpus, output_path, report_path, dtype="int8", prune=0.05)
+        self.assertEqual(report["examples"], len(CONSULTATIONS) * 5)
+        self.assertLess(report["compressed"]["coefficient_bytes"], report["original"]["coefficient_bytes"])
+        self.assertEqual(report["delta"]["agreement"], 1.0)
+        self.assertAlmostEqual(report["delta"]["accuracy"], 0.0)
+        with open(report_path) as f:
+            self.assertEqual(json.load(f)["dtype"], "int8")
+        self.assertIsInstance(DiagnosisModel(model_path=output_path).model, CompactScorer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,32 @@
 import unittest
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch
-from app.utils import get_health_advice, find_nearby_hospitals, Database, ExternalAPI
+from app.advice import AdviceStore
+from app.breaker import CircuitBreaker
+from app import utils
+from app.datapack import DataPack, build_datapack
+from app.utils import (get_health_advice, get_health_advice_many, find_nearby_hospitals, Database, ExternalAPI,
+                       advice_cache, invalidate_health_advice, normalize_symptoms, warm_health_advice_cache)
+
+# SQLite has no md5() or ordered string_agg(), so the tests fingerprint the hospitals table with group_concat()
+SQLITE_SIGNATURE_QUERY = ("SELECT COUNT(*), group_concat(name || '|' || address || '|' || latitude || '|' || longitude, "
+                          "char(10)) FROM hospitals")
 
 class TestUtils(unittest.TestCase):
 
+    def setUp(self):
+        """
+        Start each test with an empty advice cache.
+        """
+        invalidate_health_advice()
+
     @patch.object(Database, 'get_advice')
     def test_get_health_advice_success(self, mock_get_advice):
         """
@@ -38,6 +61,76 @@ class TestUtils(unittest.TestCase):
         # Assert that the function returns None
         self.assertIsNone(advice)
 
+    @patch.object(Database, 'get_advice_many')
+    def test_get_health_advice_many(self, mock_get_advice_many):
+        """
+        Test get_health_advice_many function with several diagnoses.
+        """
+        # Mock the database response
+        mock_get_advice_many.return_value = {"cold": {"advice": "Drink plenty of fluids and rest.", "source": "WHO"}}
+
+        # Call the function with duplicate and unknown diagnoses
+        advice = get_health_advice_many(["cold", "cold", "Invalid Diagnosis"])
+
+        # Assert that the database was queried once for the distinct diagnoses
+        mock_get_advice_many.assert_called_once()
+        self.assertEqual(sorted(mock_get_advice_many.call_args[0][0]), ["Invalid Diagnosis", "cold"])
+        self.assertEqual(advice, {"cold": {"advice": "Drink plenty of fluids and rest.", "source": "WHO"}})
+
+        # A second call is served from the cache, including the missing advice
+        self.assertEqual(get_health_advice_many(["cold", "Invalid Diagnosis"]), advice)
+        mock_get_advice_many.assert_called_once()
+
+    @patch.object(Database, 'get_advice')
+    def test_get_health_advice_cached(self, mock_get_advice):
+        """
+        Test that advice, including missing advice, is served from the cache until invalidated.
+        """
+        mock_get_advice.side_effect = lambda diagnosis: {"advice": "Rest.", "source": "WHO"} if diagnosis == "cold" else None
+        hits = advice_cache.stats()["hits"]
+
+        for _ in range(3):
+            self.assertEqual(get_health_advice("cold"), {"advice": "Rest.", "source": "WHO"})
+            self.assertIsNone(get_health_advice("Invalid Diagnosis"))
+        self.assertEqual(mock_get_advice.call_count, 2)
+        self.assertEqual(advice_cache.stats()["hits"] - hits, 4)
+
+        self.assertEqual(invalidate_health_advice("cold"), 1)
+        get_health_advice("cold")
+        self.assertEqual(mock_get_advice.call_count, 3)
+
+    @patch.object(Database, 'get_advice')
+    @patch.object(Database, 'fetch_advice')
+    def test_warm_health_advice_cache(self, mock_fetch_advice, mock_get_advice):
+        """
+        Test that warming the cache removes database lookups for every warmed diagnosis.
+        """
+        mock_fetch_advice.return_value = {"cold": {"advice": "Rest.", "source": "WHO"}}
+
+        self.assertEqual(warm_health_advice_cache(["cold", "migraine"]), 2)
+        self.assertEqual(get_health_advice("cold"), {"advice": "Rest.", "source": "WHO"})
+        self.assertIsNone(get_health_advice("migraine"))
+        mock_get_advice.assert_not_called()
+
+    @patch.object(Database, 'fetch_advice')
+    def test_warm_health_advice_cache_error(self, mock_fetch_advice):
+        """
+        Test that nothing is cached when the warm-up query fails.
+        """
+        mock_fetch_advice.side_effect = RuntimeError("database unavailable")
+
+        self.assertEqual(warm_health_advice_cache(["cold"]), 0)
+        self.assertEqual(len(advice_cache), 0)
+
+    def test_normalize_symptoms(self):
+        """
+        Test that case, punctuation, spacing and word order do not change the normalized text.
+        """
+        self.assertEqual(normalize_symptoms("fever headache"), "fever headache")
+        self.assertEqual(normalize_symptoms("  Headache, FEVER!"), "fever headache")
+        self.assertEqual(normalize_symptoms("Kopfschmerzen; Übelkeit"), "kopfschmerzen übelkeit")
+        self.assertEqual(normalize_symptoms("..."), "")
+
     @patch.object(ExternalAPI, 'find_nearby_hospitals')
     @patch.object(Database, 'find_hospitals')
     def test_find_nearby_hospitals_success(self, mock_find_hospitals_db, mock_find_hospitals_api):
@@ -60,10 +153,59 @@ class TestUtils(unittest.TestCase):
         mock_find_hospitals_db.assert_called_once_with(34.0522, -118.2437)
         mock_find_hospitals_api.assert_called_once_with(34.0522, -118.2437)
 
-        # Assert that the function returns the expected list of hospitals
+        # Assert that the function returns the expected list of hospitals, sorted by distance
         self.assertEqual(len(hospitals), 2)
         self.assertEqual(hospitals[0]["name"], "Hospital A")
         self.assertEqual(hospitals[1]["name"], "Hospital B")
+        self.assertEqual(hospitals[0]["distance"], 0)
+        self.assertGreater(hospitals[1]["distance"], 0)
+
+    @patch.object(ExternalAPI, 'find_nearby_hospitals')
+    @patch.object(Database, 'find_hospitals')
+    def test_find_nearby_hospitals_merges_duplicates(self, mock_find_hospitals_db, mock_find_hospitals_api):
+        """
+        Test that Places results already in the database are not listed twice.
+        """
+        mock_find_hospitals_db.return_value = [
+            {"name": "Hospital A", "address": "123 Main St", "latitude": 34.0522, "longitude": -118.2437, "distance": 0.0}
+        ]
+        mock_find_hospitals_api.return_value = [
+            {"name": "hospital a", "address": "123 Main St", "latitude": 34.0523, "longitude": -118.2437, "place_id": "a"},
+            {"name": "Hospital B", "address": "456 Oak Ave", "latitude": 34.0532, "longitude": -118.2447, "place_id": "b"}
+        ]
+
+        hospitals = find_nearby_hospitals("34.0522,-118.2437")
+
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital B"])
+        self.assertNotIn("place_id", hospitals[0])
+
+    @patch.object(ExternalAPI, 'get_geocode')
+    @patch.object(ExternalAPI, 'find_nearby_hospitals')
+    @patch.object(Database, 'find_hospitals')
+    def test_find_nearby_hospitals_offline(self, mock_find_hospitals_db, mock_find_hospitals_api, mock_get_geocode):
+        """
+        Test that the offline data pack answers searches by coordinates or place name without the database or network.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "offline.pack")
+            build_datapack(
+                [{"name": "Hospital A", "address": "123 Main St", "latitude": 34.0522, "longitude": -118.2437},
+                 {"name": "Hospital B", "address": "456 Oak Ave", "latitude": 34.1522, "longitude": -118.2437}],
+                [{"name": "Los Angeles", "latitude": 34.0522, "longitude": -118.2437}],
+                path)
+            pack = DataPack(path)
+            with patch.object(utils, 'get_datapack', return_value=pack), patch.object(utils, 'OFFLINE_MODE', True):
+                by_coordinates = find_nearby_hospitals("34.0522,-118.2437")
+                by_name = find_nearby_hospitals("los angeles")
+                self.assertEqual(utils.geocode("Los Angeles"), (34.0522, -118.2437))
+                self.assertIsNone(utils.geocode("Atlantis"))
+            del pack
+
+        self.assertEqual([h["name"] for h in by_coordinates], ["Hospital A", "Hospital B"])
+        self.assertEqual(by_name, by_coordinates)
+        mock_find_hospitals_db.assert_not_called()
+        mock_find_hospitals_api.assert_not_called()
+        mock_get_geocode.assert_not_called()
 
     @patch.object(ExternalAPI, 'find_nearby_hospitals')
     @patch.object(Database, 'find_hospitals')
@@ -81,5 +223,201 @@ class TestUtils(unittest.TestCase):
         # Assert that the function returns an empty list
         self.assertEqual(hospitals, [])
 
+class TestDatabase(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Create a Database backed by a shared in-memory SQLite database instead of PostgreSQL.
+        """
+        uri = f"file:test_utils_{id(self)}?mode=memory&cache=shared"
+        self.keepalive = sqlite3.connect(uri, uri=True)
+        self.keepalive.executescript("""
+            CREATE TABLE health_advice (diagnosis TEXT PRIMARY KEY, advice TEXT, source TEXT);
+            CREATE TABLE hospitals (name TEXT, address TEXT, latitude REAL, longitude REAL);
+            INSERT INTO health_advice VALUES ('cold', 'Drink plenty of fluids and rest.', 'WHO');
+            INSERT INTO health_advice VALUES ('migraine', 'Rest in a dark room.', 'NHS');
+            INSERT INTO hospitals VALUES ('Hospital A', '123 Main St', 34.0522, -118.2437);
+            INSERT INTO hospitals VALUES ('Hospital B', '1 Far Rd', 36.1699, -115.1398);
+            INSERT INTO hospitals VALUES ('Hospital C', '456 Oak Ave', 34.0622, -118.2437);
+        """)
+        self.keepalive.commit()
+        self.db = Database(connect=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+                           max_connections=2, timeout=1, placeholder="?", hospital_refresh_interval=0,
+                           hospital_signature_query=SQLITE_SIGNATURE_QUERY)
+
+    def tearDown(self):
+        """
+        Close the pool and the in-memory database.
+        """
+        self.db.close()
+        self.keepalive.close()
+
+    def test_get_advice(self):
+        """
+        Test looking up advice through a pooled connection.
+        """
+        self.assertEqual(self.db.get_advice("cold"), {"advice": "Drink plenty of fluids and rest.", "source": "WHO"})
+        self.assertIsNone(self.db.get_advice("Invalid Diagnosis"))
+
+    def test_get_advice_many(self):
+        """
+        Test looking up advice for several diagnoses in one query.
+        """
+        advice = self.db.get_advice_many(["cold", "migraine", "cold", "Invalid Diagnosis"])
+        self.assertEqual(set(advice), {"cold", "migraine"})
+        self.assertEqual(self.db.get_advice_many([]), {})
+
+    def test_load_advice_snapshot(self):
+        """
+        Test loading the whole advice table in one query and serving it without the database.
+        """
+        with patch.object(utils, 'db', self.db), patch.object(utils, 'ADVICE_PRELOAD', True), \
+                patch.object(utils, 'ADVICE_SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), "missing.json")), \
+                patch.object(utils, 'advice_store', AdviceStore(utils.load_advice_snapshot)):
+            self.assertEqual(get_health_advice("migraine"), {"advice": "Rest in a dark room.", "source": "NHS"})
+            with patch.object(Database, 'get_advice_many', side_effect=AssertionError("queried")):
+                self.assertEqual(set(get_health_advice_many(["cold", "flu"])), {"cold"})
+            self.assertEqual(self.db.pool_stats()["checkouts"], 1)
+            self.assertEqual(utils.advice_store.info()["source"], "database")
+
+    def test_find_hospitals(self):
+        """
+        Test listing hospitals through a pooled connection.
+        """
+        hospitals = self.db.find_hospitals(34.0522, -118.2437)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital C", "Hospital B"])
+        self.assertEqual(hospitals[0]["distance"], 0)
+        self.assertAlmostEqual(hospitals[1]["distance"], 1.11, places=2)
+
+        hospitals = self.db.find_hospitals(34.0522, -118.2437, limit=1)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A"])
+
+        hospitals = self.db.find_hospitals(34.0522, -118.2437, radius_km=10)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A", "Hospital C"])
+
+    def test_find_hospitals_refresh(self):
+        """
+        Test that changes to the hospitals table are picked up by the index.
+        """
+        self.db.find_hospitals(34.0522, -118.2437)
+        self.keepalive.execute("DELETE FROM hospitals WHERE name = 'Hospital A'")
+        self.keepalive.execute("INSERT INTO hospitals VALUES ('Hospital D', '789 Pine St', 34.0523, -118.2437)")
+        self.keepalive.commit()
+
+        hospitals = self.db.find_hospitals(34.0522, -118.2437)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital D", "Hospital C", "Hospital B"])
+
+        # Edits that keep the row count and coordinates are picked up too
+        self.keepalive.execute("UPDATE hospitals SET name = 'Hospital E' WHERE name = 'Hospital C'")
+        self.keepalive.commit()
+        hospitals = self.db.find_hospitals(34.0522, -118.2437)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital D", "Hospital E", "Hospital B"])
+
+    def test_pool_stats(self):
+        """
+        Test that connections are checked out per query and reused.
+        """
+        self.db.get_advice("cold")
+        self.db.get_advice("migraine")
+        stats = self.db.pool_stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["open"], 1)
+
+class MockMapsHandler(BaseHTTPRequestHandler):
+    """
+    Serves canned Google Maps responses queued on the server.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append((url.path, parse_qs(url.query)))
+        status, body, delay = self.server.responses.pop(0) if self.server.responses else (200, {"status": "OK", "results": []}, 0)
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestExternalAPI(unittest.TestCase):
+
+    GEOCODE = {"status": "OK", "results": [{"geometry": {"location": {"lat": 34.0522, "lng": -118.2437}}}]}
+    PLACES = {"status": "OK", "results": [
+        {"name": "Hospital A", "vicinity": "123 Main St", "place_id": "a",
+         "geometry": {"location": {"lat": 34.0522, "lng": -118.2437}}}
+    ]}
+
+    def setUp(self):
+        """
+        Start a local mock Google Maps server.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockMapsHandler)
+        self.server.responses = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api = ExternalAPI(api_key="test-key", base_url=f"http://127.0.0.1:{self.server.server_port}",
+                               timeout=(1, 0.5), retries=2, backoff_factor=0,
+                               breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    def tearDown(self):
+        """
+        Stop the mock server.
+        """
+        self.api.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_geocode_cached(self):
+        """
+        Test geocoding and that normalized addresses are served from the cache.
+        """
+        self.server.responses.append((200, self.GEOCODE, 0))
+        self.assertEqual(self.api.get_geocode("1 Main St, Los Angeles"), (34.0522, -118.2437))
+        self.assertEqual(self.api.get_geocode("  1 MAIN st,   los angeles "), (34.0522, -118.2437))
+        self.assertEqual(len(self.server.requests), 1)
+        path, params = self.server.requests[0]
+        self.assertEqual(path, "/geocode/json")
+        self.assertEqual(params["address"], ["1 Main St, Los Angeles"])
+        self.assertEqual(params["key"], ["test-key"])
+
+    def test_find_nearby_hospitals_cached(self):
+        """
+        Test Places search and that nearby coordinates share a cache entry.
+        """
+        self.server.responses.append((200, self.PLACES, 0))
+        hospitals = self.api.find_nearby_hospitals(34.05221, -118.24369)
+        self.assertEqual([h["name"] for h in hospitals], ["Hospital A"])
+        self.assertEqual(self.api.find_nearby_hospitals(34.05219, -118.24371), hospitals)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.api.stats()["places_cache"]["hits"], 1)
+
+    def test_retry_on_server_error(self):
+        """
+        Test that server errors are retried.
+        """
+        self.server.responses.extend([(503, {}, 0), (200, self.GEOCODE, 0)])
+        self.assertEqual(self.api.get_geocode("Los Angeles"), (34.0522, -118.2437))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_timeout_and_circuit_breaker(self):
+        """
+        Test that slow responses time out and repeated failures open the circuit.
+        """
+        self.api._get_session().adapters["http://"].max_retries.total = 0
+        self.server.responses.extend([(200, self.GEOCODE, 1), (200, self.GEOCODE, 1)])
+        start = time.monotonic()
+        self.assertIsNone(self.api.get_geocode("Los Angeles"))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsNone(self.api.get_geocode("Los Angeles"))
+        self.assertEqual(self.api.breaker.state, CircuitBreaker.OPEN)
+
+        # Further requests are rejected without reaching the server
+        requests_made = len(self.server.requests)
+        self.assertEqual(self.api.find_nearby_hospitals(34.0522, -118.2437), [])
+        self.assertEqual(len(self.server.requests), requests_made)
+
 if __name__ == '__main__':
     unittest.main()